@@ -0,0 +1,165 @@
+import time
+import socket
+import threading
+
+try:
+    import fcntl
+    import termios
+except ImportError: # Windows: tanpa SIOCOUTQ, sisa buffer kirim diperkirakan dari SO_SNDBUF.
+    fcntl = termios = None
+
+import stream_metrics
+
+# --- AUTOTUNE BITRATE VIDEO ---
+# VIDEO_BITRATE_KBPS menjadi batas atas. Bitrate yang dipakai dipilih dari tangga BITRATE_LADDER_KBPS:
+#   - Sebelum siaran: jika BANDWIDTH_PROBE_TARGET ("host:port", misal sink TCP lokal atau server
+#     sendiri) diisi, uplink diukur dengan mengirim data selama BANDWIDTH_PROBE_SEC detik, lalu
+#     dipilih anak tangga tertinggi yang muat di PROBE_HEADROOM dari hasil ukur (dikurangi audio).
+#   - Selama siaran: kecepatan realtime dihitung dari pertambahan out_time progres FFmpeg. Dengan -re,
+#     soket RTMP yang penuh (backpressure uplink) maupun encoder yang kewalahan sama-sama terlihat
+#     sebagai speed < 1.0x. Jika itu berlangsung selama WINDOW_SEC, bitrate turun satu anak tangga dan
+#     FFmpeg di-restart (dilanjutkan dari keyframe di posisi terakhir). Setelah STEP_UP_AFTER_SEC
+#     stabil, bitrate naik lagi satu anak tangga, paling tinggi sampai hasil probe awal.
+PROBE_HEADROOM = 0.7
+PROBE_CHUNK_SIZE = 64 * 1024
+PROBE_CONNECT_TIMEOUT_SEC = 5
+WINDOW_SEC = 30
+GRACE_SEC = 15 # Sampel setelah restart diabaikan selama ini (FFmpeg -re masih mengejar).
+SPEED_DOWN_THRESHOLD = 0.95
+SPEED_UP_THRESHOLD = 0.99
+STEP_UP_AFTER_SEC = 600
+MONITOR_INTERVAL_SEC = 5
+
+
+def _parse_target(target):
+    host, _, port = target.strip().removeprefix("tcp://").rstrip('/').rpartition(':')
+    return host.strip("[]"), int(port)
+
+
+def _unsent_bytes(sock):
+    """Byte yang masih antre di buffer kirim (belum terkirim/di-ACK), atau None jika tidak bisa dibaca."""
+    if fcntl is None or not hasattr(termios, "TIOCOUTQ"):
+        return None
+    try:
+        return int.from_bytes(fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, b"\0\0\0\0"), "little", signed=True)
+    except OSError:
+        return None
+
+
+def probe_uplink(target, duration):
+    """
+    Mengukur throughput upload (kbps) ke sink TCP target ("host:port") selama duration detik.
+    Byte yang masih di buffer kirim saat pengukuran berakhir tidak dihitung. None jika gagal.
+    """
+    try:
+        host, port = _parse_target(target)
+        sock = socket.create_connection((host, port), timeout=PROBE_CONNECT_TIMEOUT_SEC)
+    except (OSError, ValueError):
+        return None
+    payload = bytes(PROBE_CHUNK_SIZE)
+    sent = 0
+    with sock:
+        sock.settimeout(0.5)
+        started = time.monotonic()
+        deadline = started + duration
+        while time.monotonic() < deadline:
+            try:
+                sent += sock.send(payload)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+        elapsed = time.monotonic() - started
+        unsent = _unsent_bytes(sock)
+        if unsent is None:
+            unsent = min(sent, sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF))
+    delivered = max(0, sent - unsent)
+    return delivered * 8 / 1000 / elapsed if elapsed > 0 and delivered else None
+
+
+def build_ladder(ladder, ceiling_kbps):
+    """Tangga bitrate menurun dengan VIDEO_BITRATE_KBPS sebagai anak tangga teratas."""
+    return [ceiling_kbps] + sorted({int(r) for r in ladder if r < ceiling_kbps}, reverse=True)
+
+
+def pick_index(ladder, measured_kbps, audio_kbps):
+    """Indeks anak tangga tertinggi yang muat di uplink terukur (anak tangga terbawah jika tidak ada)."""
+    if measured_kbps is None:
+        return 0
+    budget = measured_kbps * PROBE_HEADROOM - audio_kbps
+    return next((i for i, rung in enumerate(ladder) if rung <= budget), len(ladder) - 1)
+
+
+def new_tuner(ladder, ceiling_kbps, measured_kbps=None, audio_kbps=0):
+    rungs = build_ladder(ladder, ceiling_kbps)
+    index = pick_index(rungs, measured_kbps, audio_kbps)
+    return {"ladder": rungs, "index": index, "probe_index": index, "measured_kbps": measured_kbps,
+            "last_change": time.time(), "last_start": time.time(), "lock": threading.Lock()}
+
+
+def current_kbps(tuner):
+    return tuner["ladder"][tuner["index"]]
+
+
+def note_restart(tuner):
+    """Dipanggil setiap FFmpeg dijalankan: out_time mulai dari nol lagi, sampel lama tidak dibandingkan."""
+    tuner["last_start"] = time.time()
+
+
+def set_ceiling(tuner, ceiling_kbps, ladder):
+    """Membangun ulang tangga setelah VIDEO_BITRATE_KBPS diubah; bitrate saat ini dipertahankan jika muat."""
+    with tuner["lock"]:
+        current = current_kbps(tuner)
+        rungs = build_ladder(ladder, ceiling_kbps)
+        tuner["ladder"] = rungs
+        tuner["index"] = next((i for i, rung in enumerate(rungs) if rung <= current), len(rungs) - 1)
+        tuner["probe_index"] = min(tuner["probe_index"], len(rungs) - 1)
+        tuner["last_change"] = time.time()
+
+
+def realtime_speed(samples):
+    """Kecepatan realtime dari pertambahan out_time terhadap waktu dinding (bukan speed kumulatif FFmpeg)."""
+    points = [(s["ts"], s["out_time_s"]) for s in samples if s.get("out_time_s") is not None]
+    if len(points) < 2 or points[-1][0] - points[0][0] <= 0:
+        return None
+    return (points[-1][1] - points[0][1]) / (points[-1][0] - points[0][0])
+
+
+def evaluate(tuner, samples, now=None):
+    """Mengembalikan (indeks_baru, alasan, speed) jika bitrate perlu diubah, atau None."""
+    now = now if now is not None else time.time()
+    since = max(tuner["last_change"], tuner["last_start"]) + GRACE_SEC
+    samples = [s for s in samples if s["ts"] >= since]
+    if not samples or samples[-1]["ts"] - samples[0]["ts"] < WINDOW_SEC * 0.8:
+        return None
+    speed = realtime_speed(samples)
+    if speed is None:
+        return None
+    if speed < SPEED_DOWN_THRESHOLD and tuner["index"] < len(tuner["ladder"]) - 1:
+        return tuner["index"] + 1, "slow", speed
+    if (speed >= SPEED_UP_THRESHOLD and tuner["index"] > tuner["probe_index"]
+            and now - tuner["last_change"] >= STEP_UP_AFTER_SEC):
+        return tuner["index"] - 1, "recovered", speed
+    return None
+
+
+def start_monitor(tuner, on_change):
+    """
+    Thread pemantau: setiap MONITOR_INTERVAL_SEC mengevaluasi progres WINDOW_SEC terakhir dan memanggil
+    on_change(kbps, alasan, speed) saat anak tangga berubah. Mengembalikan threading.Event untuk berhenti.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(MONITOR_INTERVAL_SEC):
+            decision = evaluate(tuner, stream_metrics.recent_samples(WINDOW_SEC))
+            if decision is None:
+                continue
+            index, reason, speed = decision
+            with tuner["lock"]:
+                tuner["index"] = index
+                tuner["last_change"] = time.time()
+            on_change(current_kbps(tuner), reason, speed)
+
+    threading.Thread(target=loop, name="bitrate-autotune", daemon=True).start()
+    return stop
@@ -0,0 +1,137 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+
+# --- PENYIMPANAN VIDEO BERBASIS ISI (CONTENT-ADDRESSED) ---
+# Isi setiap upload disimpan sekali di VIDEOS_DIR/.objects/<sha256><ext>. Nama yang dilihat
+# pengguna di VIDEOS_DIR hanyalah alias (symlink relatif) ke objek tersebut. Upload ulang
+# dengan isi yang sama hanya menambah alias; karena cache probe, job transcode, mezzanine,
+# dan cache encode semuanya memakai realpath, hasilnya langsung dipakai ulang.
+OBJECTS_DIR_NAME = ".objects"
+INCOMING_SUFFIX = ".incoming"
+
+
+class HashingWriter:
+    """Objek file tulis yang menghitung SHA-256 dari byte yang melewatinya."""
+
+    def __init__(self, file_obj):
+        self._file = file_obj
+        self._hash = hashlib.sha256()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.update_hash(data)
+        return self._file.write(data)
+
+    def update_hash(self, data):
+        """Menambahkan byte ke hash tanpa menulisnya (misal isi file yang sudah ada saat melanjutkan unduhan)."""
+        self._hash.update(data)
+        self.bytes_written += len(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def get_objects_dir(videos_dir):
+    path = os.path.join(videos_dir, OBJECTS_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_incoming_path(videos_dir, key=None):
+    """
+    Path sementara untuk upload yang sedang diterima, di filesystem yang sama dengan objek.
+    Dengan key (misal file_unique_id Telegram) path-nya tetap, sehingga unduhan bisa dilanjutkan.
+    """
+    name = key if key and re.fullmatch(r"[A-Za-z0-9_-]{1,128}", key) else uuid.uuid4().hex
+    return os.path.join(get_objects_dir(videos_dir), f"{name}{INCOMING_SUFFIX}")
+
+
+def remove_stale_incoming(videos_dir, max_age_seconds):
+    """Menghapus file sementara upload yang tidak dilanjutkan lebih lama dari max_age_seconds."""
+    objects_dir = get_objects_dir(videos_dir)
+    now = time.time()
+    for f in os.listdir(objects_dir):
+        path = os.path.join(objects_dir, f)
+        if f.endswith(INCOMING_SUFFIX) and now - os.path.getmtime(path) > max_age_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def is_object_path(path, videos_dir):
+    return os.path.dirname(os.path.realpath(path)) == os.path.realpath(get_objects_dir(videos_dir))
+
+
+def find_object(videos_dir, digest):
+    """Mengembalikan path objek dengan hash tersebut (ekstensi apa pun), atau None."""
+    objects_dir = get_objects_dir(videos_dir)
+    for f in os.listdir(objects_dir):
+        if os.path.splitext(f)[0] == digest and not f.endswith(INCOMING_SUFFIX):
+            return os.path.join(objects_dir, f)
+    return None
+
+
+def store_object(incoming_path, digest, extension, videos_dir):
+    """
+    Memindahkan file sementara menjadi objek untuk hash tersebut (rename atomik).
+    Jika objek sudah ada, file sementara dibuang. Mengembalikan (path objek, True jika duplikat).
+    """
+    existing = find_object(videos_dir, digest)
+    if existing:
+        os.remove(incoming_path)
+        return existing, True
+    object_path = os.path.join(get_objects_dir(videos_dir), f"{digest}{extension.lower()}")
+    os.replace(incoming_path, object_path)
+    return object_path, False
+
+
+def find_aliases(videos_dir, object_path):
+    """Semua alias di VIDEOS_DIR yang menunjuk ke objek."""
+    object_real = os.path.realpath(object_path)
+    return [entry.path for entry in os.scandir(videos_dir)
+            if entry.is_symlink() and os.path.realpath(entry.path) == object_real]
+
+
+def create_alias(object_path, videos_dir, filename):
+    """
+    Membuat alias bernama filename untuk objek. Jika alias dengan nama itu sudah menunjuk ke objek
+    yang sama, alias tersebut dipakai; jika nama sudah dipakai file lain, diberi akhiran _1, _2, ...
+    Ekstensi alias mengikuti filename (dipakai streamer untuk mengenali file video).
+    """
+    base_name, ext = os.path.splitext(os.path.basename(filename))
+    candidate = os.path.join(videos_dir, f"{base_name}{ext}")
+    counter = 1
+    while os.path.lexists(candidate):
+        if os.path.realpath(candidate) == os.path.realpath(object_path):
+            return candidate
+        candidate = os.path.join(videos_dir, f"{base_name}_{counter}{ext}")
+        counter += 1
+    os.symlink(os.path.relpath(object_path, videos_dir), candidate)
+    return candidate
+
+
+def remove_alias(alias_path, videos_dir):
+    """
+    Menghapus alias; objeknya ikut dihapus jika tidak ada alias lain yang memakainya.
+    File biasa (upload lama sebelum penyimpanan berbasis isi) langsung dihapus.
+    Mengembalikan path objek/file yang benar-benar dihapus, atau None jika isi masih dipakai alias lain.
+    """
+    if not os.path.islink(alias_path):
+        os.remove(alias_path)
+        return alias_path
+    object_path = os.path.realpath(alias_path)
+    os.unlink(alias_path)
+    if not is_object_path(object_path, videos_dir) or find_aliases(videos_dir, object_path):
+        return None
+    try:
+        os.remove(object_path)
+    except FileNotFoundError:
+        pass
+    return object_path
@@ -0,0 +1,96 @@
+import re
+
+# --- KLASIFIKASI KEGAGALAN FFMPEG ---
+# Setelah FFmpeg keluar dengan error, ekor log run tersebut dicocokkan dengan pola di bawah
+# untuk menentukan kategori kegagalan. Setiap kategori punya kebijakan retry sendiri sehingga
+# error yang tidak bisa pulih (kunci salah, file hilang, codec tidak didukung) tidak
+# menghabiskan percobaan ulang. Dipakai oleh streamer.py (keputusan retry) dan
+# telegram_bot.py (deskripsi untuk pengguna).
+
+# Urutan penting: kategori yang lebih spesifik dicek lebih dulu.
+FAILURE_PATTERNS = [
+    ("auth_rejected", re.compile(
+        r"403 Forbidden|401 Unauthorized|NetStream\.Publish\.(BadName|Rejected|Denied)|"
+        r"NetConnection\.Connect\.Rejected|Authentication failed|invalid stream key|publish.*(denied|rejected)",
+        re.IGNORECASE)),
+    # Dipisah menjadi input_missing / file_access di classify_failure (lihat _file_error_category).
+    ("file_error", re.compile(r"No such file or directory|Permission denied", re.IGNORECASE)),
+    ("encoder_error", re.compile(
+        r"Unknown encoder|Encoder not found|Error while opening encoder|Could not open encoder|"
+        r"Error initializing output stream|Incompatible pixel format|codec not currently supported in container|"
+        r"Could not find tag for codec|Error while filtering|Invalid argument.*(encoder|codec)",
+        re.IGNORECASE)),
+    ("resource", re.compile(r"Cannot allocate memory|No space left on device|Too many open files|Out of memory",
+                            re.IGNORECASE)),
+    ("network", re.compile(
+        r"Connection refused|Connection reset|Connection timed out|Broken pipe|Network is unreachable|"
+        r"No route to host|Name or service not known|Temporary failure in name resolution|Failed to resolve|"
+        r"Cannot open connection|Server returned 5\d\d|Error number -10054|Input/output error|"
+        r"Failed to update header|Error writing trailer",
+        re.IGNORECASE)),
+    ("input_corrupt", re.compile(
+        r"Invalid data found when processing input|moov atom not found|Error while decoding stream|"
+        r"Invalid NAL unit|non-existing PPS|corrupt (decoded )?frame|Packet corrupt|Truncating packet",
+        re.IGNORECASE)),
+]
+
+# FFmpeg memakai teks yang sama untuk file input, file output (cache encode, log), dan soket. Hanya
+# baris yang menyebut file input (atau input FFmpeg 6+: "Error opening input", "[in#0 ...]") yang
+# dianggap input_missing dan tidak di-retry; sisanya file_access yang masih boleh dicoba ulang.
+INPUT_ERROR_PATTERN = re.compile(r"Error opening input|\[in#\d+", re.IGNORECASE)
+
+# max_retries: batas percobaan ulang untuk kategori ini (None = ikuti RETRY_LIMIT).
+# min_delay: jeda minimum (detik) sebelum percobaan ulang.
+FAILURE_POLICIES = {
+    "auth_rejected": {"max_retries": 0, "min_delay": 0},
+    "input_missing": {"max_retries": 0, "min_delay": 0},
+    "file_access": {"max_retries": 3, "min_delay": 10},
+    "encoder_error": {"max_retries": 0, "min_delay": 0},
+    "input_corrupt": {"max_retries": 1, "min_delay": 0},
+    "resource": {"max_retries": 2, "min_delay": 30},
+    "network": {"max_retries": None, "min_delay": 5},
+    "stall": {"max_retries": None, "min_delay": 5},
+    "unknown": {"max_retries": None, "min_delay": 0},
+}
+
+FAILURE_DESCRIPTIONS = {
+    "auth_rejected": "Kunci streaming ditolak server (periksa kunci atau status live di YouTube Studio)",
+    "input_missing": "File video tidak ditemukan atau tidak bisa dibaca",
+    "file_access": "FFmpeg gagal membuka file/soket output (izin akses atau path tujuan)",
+    "encoder_error": "Encoder/codec FFmpeg gagal (periksa preset, codec, atau format video)",
+    "input_corrupt": "File video rusak atau tidak bisa di-decode",
+    "resource": "Sumber daya sistem habis (memori, disk, atau file handle)",
+    "network": "Gangguan jaringan ke server RTMP",
+    "stall": "FFmpeg macet tanpa progres",
+    "unknown": "Kesalahan FFmpeg tidak dikenal",
+}
+
+
+def _file_error_category(line, input_path):
+    if (input_path and input_path in line) or INPUT_ERROR_PATTERN.search(line):
+        return "input_missing"
+    return "file_access"
+
+
+def classify_failure(log_text, input_path=None):
+    """
+    Mengembalikan (kategori, baris_log) untuk ekor log satu run FFmpeg.
+    Baris yang dikembalikan adalah baris terakhir yang cocok dengan pola kategori tersebut.
+    input_path (argumen -i) membedakan file input yang hilang dari error akses output.
+    """
+    lines = [line.strip() for line in log_text.splitlines() if line.strip()]
+    for category, pattern in FAILURE_PATTERNS:
+        for line in reversed(lines):
+            if pattern.search(line):
+                if category == "file_error":
+                    category = _file_error_category(line, input_path)
+                return category, line[-300:]
+    return "unknown", (lines[-1][-300:] if lines else None)
+
+
+def get_policy(category):
+    return FAILURE_POLICIES.get(category, FAILURE_POLICIES["unknown"])
+
+
+def describe_failure(category):
+    return FAILURE_DESCRIPTIONS.get(category, category)
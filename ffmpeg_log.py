@@ -0,0 +1,98 @@
+import os
+import gzip
+import shutil
+import logging
+import threading
+from logging.handlers import RotatingFileHandler
+
+# --- LOG FFMPEG BERGULIR ---
+# stderr FFmpeg tidak lagi ditulis langsung ke file, tetapi dipompa lewat logger dengan
+# RotatingFileHandler: file dipotong per LOG_MAX_BYTES, disimpan LOG_BACKUP_COUNT segmen lama
+# (opsional di-gzip). Bot membaca log dari akhir file (tail_lines) tanpa memuat seluruh isinya.
+TAIL_BLOCK_SIZE = 64 * 1024
+TAIL_MAX_SCAN_BYTES = 4 * 1024 * 1024
+
+# FFmpeg dijalankan dengan '-loglevel level+info' sehingga setiap baris memuat tag level.
+LEVEL_TAGS = {
+    "error": ("[error]", "[fatal]", "[panic]"),
+    "warning": ("[warning]", "[error]", "[fatal]", "[panic]"),
+}
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def open_rotating_log(path, max_bytes, backup_count, compress=True):
+    """Mengembalikan logger yang menulis ke path dengan rotasi ukuran/jumlah (segmen lama .N atau .N.gz)."""
+    log = logging.getLogger(f"ffmpeg_log.{os.path.abspath(path)}")
+    if log.handlers:
+        return log
+    handler = RotatingFileHandler(path, maxBytes=max(0, int(max_bytes)), backupCount=max(0, int(backup_count)),
+                                  encoding="utf-8")
+    if compress:
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return log
+
+
+def start_stderr_pump(pipe, log, tail=None, prefix=""):
+    """
+    Menyalin setiap baris stderr FFmpeg ke log (dan ke deque tail, jika ada) di thread terpisah.
+    prefix ditambahkan di depan setiap baris log, misal untuk membedakan proses relay.
+    """
+    def pump():
+        for raw_line in pipe:
+            line = raw_line.decode("utf-8", errors="replace").rstrip() if isinstance(raw_line, bytes) else raw_line.rstrip()
+            if not line:
+                continue
+            log.info(f"{prefix}{line}")
+            if tail is not None:
+                tail.append(line)
+
+    thread = threading.Thread(target=pump, name="ffmpeg-stderr", daemon=True)
+    thread.start()
+    return thread
+
+
+def _line_matches(line, level=None, keyword=None):
+    if level and not any(tag in line for tag in LEVEL_TAGS.get(level, (f"[{level}]",))):
+        return False
+    if keyword and keyword.lower() not in line.lower():
+        return False
+    return True
+
+
+def tail_lines(path, max_lines=40, level=None, keyword=None, max_scan_bytes=TAIL_MAX_SCAN_BYTES):
+    """
+    Mengembalikan maksimal max_lines baris terakhir yang cocok dengan filter level/kata kunci.
+    File dibaca mundur per blok dari akhir, dan berhenti setelah max_scan_bytes.
+    """
+    matched = []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        scanned = 0
+        partial = b""
+        while position > 0 and len(matched) < max_lines and scanned < max_scan_bytes:
+            size = min(TAIL_BLOCK_SIZE, position)
+            position -= size
+            scanned += size
+            f.seek(position)
+            lines = (f.read(size) + partial).split(b"\n")
+            # Baris pertama blok bisa terpotong; simpan untuk digabung dengan blok sebelumnya.
+            partial = lines.pop(0) if position > 0 else b""
+            for raw_line in reversed(lines):
+                line = raw_line.decode("utf-8", errors="replace").rstrip()
+                if line and _line_matches(line, level, keyword):
+                    matched.append(line)
+                    if len(matched) >= max_lines:
+                        break
+    matched.reverse()
+    return matched
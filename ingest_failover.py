@@ -0,0 +1,147 @@
+import time
+import socket
+import threading
+from urllib.parse import urlsplit
+
+# --- FAILOVER INGEST RTMP ---
+# STREAM_URL adalah ingest utama, BACKUP_STREAM_URLS berisi ingest cadangan (misal
+# rtmp://b.rtmp.youtube.com/live2?backup=1), diurutkan dari yang paling diutamakan.
+# Kesehatan tiap ingest dicatat dari hasil percobaan FFmpeg: setelah INGEST_FAILOVER_AFTER kegagalan
+# koneksi beruntun, siaran pindah ke ingest berikutnya yang belum bermasalah tanpa memakai jatah
+# RETRY_LIMIT. Sebelum FFmpeg dijalankan, ingest aktif dicek dengan koneksi TCP singkat sehingga
+# ingest yang mati dilewati dalam hitungan detik. Selama memakai cadangan, ingest utama dicek
+# berkala (watch_primary) dan siaran kembali ke utama begitu utama bisa dihubungi lagi.
+PROBE_TIMEOUT_SEC = 3
+SWITCH_DELAY_SEC = 1 # Jeda sebelum mencoba ingest lain (bukan backoff penuh).
+# Percobaan yang gagal sebelum sempat mengirim selama ini dianggap gagal tersambung ke ingest.
+CONNECT_FAILURE_MAX_STREAMED_SEC = 10
+CONNECT_FAILURE_CATEGORIES = ("network", "stall")
+DEFAULT_PORTS = {"rtmp": 1935, "rtmps": 443}
+
+
+def join_key(base_url, stream_key):
+    """URL ingest lengkap: '{key}' di base_url diganti kunci, jika tidak ada kunci ditambahkan di akhir."""
+    base_url = base_url.strip()
+    if "{key}" in base_url:
+        return base_url.replace("{key}", stream_key)
+    return f"{base_url.rstrip('/')}/{stream_key}"
+
+
+def new_pool(base_urls, stream_key, switch_after=2, recheck_sec=60):
+    """Daftar ingest untuk satu tujuan; indeks 0 adalah ingest utama."""
+    endpoints = [{"index": i, "label": "utama" if i == 0 else f"cadangan-{i}", "url": join_key(base, stream_key),
+                  "failures": 0, "last_failure": None, "last_ok": None}
+                 for i, base in enumerate(base_urls)]
+    return {"endpoints": endpoints, "active": 0, "switch_after": max(1, switch_after),
+            "recheck_sec": recheck_sec, "lock": threading.Lock()}
+
+
+def active(pool):
+    return pool["endpoints"][pool["active"]]
+
+
+def probe(url, timeout=PROBE_TIMEOUT_SEC):
+    """True jika host:port ingest menerima koneksi TCP dalam timeout detik."""
+    parts = urlsplit(url)
+    if not parts.hostname:
+        return False
+    try:
+        port = parts.port or DEFAULT_PORTS.get(parts.scheme, 1935)
+        with socket.create_connection((parts.hostname, port), timeout=timeout):
+            return True
+    except (OSError, ValueError):
+        return False
+
+
+def is_connect_failure(category, streamed):
+    """Kegagalan yang dihitung untuk kesehatan ingest: gangguan jaringan/macet sebelum siaran sempat berjalan."""
+    return category in CONNECT_FAILURE_CATEGORIES and streamed < CONNECT_FAILURE_MAX_STREAMED_SEC
+
+
+def _activate(pool, endpoint, reason, emit_event, name):
+    previous = active(pool)
+    pool["active"] = endpoint["index"]
+    emit_event("ingest", name=name, active=endpoint["label"], previous=previous["label"], reason=reason)
+    return endpoint
+
+
+def record_success(pool):
+    """Menandai ingest aktif sehat (siaran berjalan cukup lama atau selesai normal)."""
+    with pool["lock"]:
+        endpoint = active(pool)
+        endpoint["failures"] = 0
+        endpoint["last_ok"] = time.time()
+
+
+def record_failure(pool, emit_event, name="utama"):
+    """
+    Mencatat kegagalan koneksi ke ingest aktif. Jika sudah switch_after kali beruntun, pindah ke ingest
+    berikutnya. Mengembalikan (endpoint_baru, gratis) atau None jika tidak pindah; gratis = True jika
+    ingest tujuan belum bermasalah, sehingga perpindahan tidak perlu memakai jatah percobaan ulang.
+    """
+    with pool["lock"]:
+        endpoint = active(pool)
+        endpoint["failures"] += 1
+        endpoint["last_failure"] = time.time()
+        if len(pool["endpoints"]) < 2 or endpoint["failures"] < pool["switch_after"]:
+            return None
+        count = len(pool["endpoints"])
+        others = [pool["endpoints"][(pool["active"] + step) % count] for step in range(1, count)]
+        healthy = [e for e in others if e["failures"] < pool["switch_after"]]
+        target = healthy[0] if healthy else others[0]
+        return _activate(pool, target, "connect_failures", emit_event, name), bool(healthy)
+
+
+def ensure_reachable(pool, emit_event, name="utama"):
+    """
+    Mengecek ingest aktif sebelum FFmpeg dijalankan. Jika tidak bisa dihubungi, langsung ditandai
+    bermasalah dan ingest lain yang bisa dihubungi dipilih. Mengembalikan endpoint baru atau None.
+    Jika tidak ada satu pun yang bisa dihubungi, ingest aktif dibiarkan (FFmpeg tetap mencoba).
+    """
+    if len(pool["endpoints"]) < 2 or probe(active(pool)["url"]):
+        return None
+    with pool["lock"]:
+        endpoint = active(pool)
+        endpoint["failures"] = max(endpoint["failures"] + 1, pool["switch_after"])
+        endpoint["last_failure"] = time.time()
+        count = len(pool["endpoints"])
+        others = [pool["endpoints"][(pool["active"] + step) % count] for step in range(1, count)]
+    for candidate in others:
+        if probe(candidate["url"]):
+            with pool["lock"]:
+                return _activate(pool, candidate, "unreachable", emit_event, name)
+    return None
+
+
+def return_to_primary(pool, emit_event, name="utama"):
+    """Mengaktifkan kembali ingest utama (dipanggil setelah watch_primary melihat utama pulih)."""
+    with pool["lock"]:
+        if pool["active"] == 0:
+            return None
+        primary = pool["endpoints"][0]
+        primary["failures"] = 0
+        return _activate(pool, primary, "primary_recovered", emit_event, name)
+
+
+def watch_primary(pool, recovered):
+    """
+    Thread yang, selama ingest cadangan aktif, mengecek ingest utama setiap recheck_sec detik
+    (dan tidak lebih cepat dari recheck_sec sejak kegagalan terakhirnya). Jika utama bisa dihubungi,
+    event recovered di-set. Mengembalikan threading.Event untuk menghentikan pemantauan.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(pool["recheck_sec"]):
+            primary = pool["endpoints"][0]
+            if pool["active"] == 0 or recovered.is_set():
+                continue
+            if time.time() - (primary["last_failure"] or 0) < pool["recheck_sec"]:
+                continue
+            if probe(primary["url"]):
+                recovered.set()
+            else:
+                primary["last_failure"] = time.time()
+
+    threading.Thread(target=loop, name="ingest-primary-watch", daemon=True).start()
+    return stop
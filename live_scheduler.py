@@ -0,0 +1,151 @@
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, time as dtime
+
+# --- JADWAL LIVE PERSISTEN ---
+# Jadwal disimpan sebagai dict biasa di BOT_STATE["schedules"] (ikut tersimpan di state_store),
+# sehingga tetap ada setelah bot restart. Dua jenis jadwal:
+#   - "once": satu aksi ("start"/"stop") pada waktu tertentu (epoch).
+#   - "window": jendela live berulang, mulai jam START dan berhenti jam END setiap hari
+#     atau pada hari tertentu (weekdays, 0 = Senin). END <= START berarti berhenti besok.
+# Semua jam ditafsirkan dalam zona waktu TIMEZONE. Modul ini hanya menghitung waktu;
+# eksekusi dan job_queue ada di telegram_bot.py.
+
+# Jadwal "start" sekali jalan yang terlewat saat bot mati hanya dijalankan jika terlambat kurang dari ini.
+# Jadwal "stop" yang terlewat selalu dijalankan (agar siaran tidak berjalan melebihi jadwal).
+START_CATCHUP_GRACE_SECONDS = 15 * 60
+
+WEEKDAY_NAMES = {"sen": 0, "sel": 1, "rab": 2, "kam": 3, "jum": 4, "sab": 5, "min": 6}
+WEEKDAY_LABELS = ["Sen", "Sel", "Rab", "Kam", "Jum", "Sab", "Min"]
+ACTION_LABELS = {"start": "Mulai", "stop": "Berhenti"}
+
+DURATION_PATTERN = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?$")
+CLOCK_PATTERN = re.compile(r"^(\d{1,2}):(\d{2})$")
+
+
+def parse_clock(text):
+    """'HH:MM' -> 'HH:MM' yang dinormalisasi. Memunculkan ValueError jika tidak valid."""
+    match = CLOCK_PATTERN.match(text.strip())
+    if not match:
+        raise ValueError(f"format jam '{text}' tidak valid, gunakan HH:MM")
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ValueError("jam atau menit di luar rentang valid (0-23, 0-59)")
+    return f"{hours:02d}:{minutes:02d}"
+
+
+def parse_duration(text):
+    """'30m', '1h', '2h30m' -> detik, atau None jika bukan format durasi."""
+    match = DURATION_PATTERN.match(text.strip().lower())
+    if not match or not any(match.groups()):
+        return None
+    return (int(match.group(1) or 0) * 60 + int(match.group(2) or 0)) * 60
+
+
+def parse_weekdays(text):
+    """'sen,rab,jum' atau 'sen-jum' -> daftar indeks hari (0 = Senin)."""
+    days = set()
+    for part in text.lower().split(","):
+        bounds = [p.strip()[:3] for p in part.split("-")]
+        if any(b not in WEEKDAY_NAMES for b in bounds) or len(bounds) > 2:
+            raise ValueError(f"hari '{part}' tidak dikenal, gunakan {', '.join(WEEKDAY_NAMES)}")
+        first, last = WEEKDAY_NAMES[bounds[0]], WEEKDAY_NAMES[bounds[-1]]
+        day = first
+        while True:
+            days.add(day)
+            if day == last:
+                break
+            day = (day + 1) % 7
+    return sorted(days)
+
+
+def resolve_time(text, tz, now=None):
+    """Durasi ('30m') atau jam ('23:00', berikutnya dalam zona tz) -> epoch."""
+    now = now if now is not None else time.time()
+    seconds = parse_duration(text)
+    if seconds is not None:
+        if seconds <= 0:
+            raise ValueError("durasi harus positif")
+        return now + seconds
+    hours, minutes = map(int, parse_clock(text).split(":"))
+    now_dt = datetime.fromtimestamp(now, tz)
+    target = now_dt.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+    if target <= now_dt:
+        target = datetime.combine(target.date() + timedelta(days=1), target.timetz())
+    return target.timestamp()
+
+
+def new_once(slot_id, action, run_at):
+    return {"id": uuid.uuid4().hex[:6], "kind": "once", "slot_id": slot_id, "action": action,
+            "run_at": run_at, "created_at": time.time()}
+
+
+def new_window(slot_id, start, end, weekdays=None):
+    if parse_clock(start) == parse_clock(end):
+        raise ValueError("jam mulai dan jam berhenti tidak boleh sama")
+    return {"id": uuid.uuid4().hex[:6], "kind": "window", "slot_id": slot_id,
+            "start": parse_clock(start), "end": parse_clock(end), "weekdays": weekdays,
+            "last_fired": None, "created_at": time.time()}
+
+
+def _window_edges(entry, tz, around):
+    """Semua tepi jendela (epoch, aksi) di sekitar waktu around, urut waktu."""
+    start_clock = dtime(*map(int, entry["start"].split(":")))
+    end_clock = dtime(*map(int, entry["end"].split(":")))
+    base = datetime.fromtimestamp(around, tz).date()
+    edges = []
+    for offset in range(-8, 9):
+        day = base + timedelta(days=offset)
+        if entry.get("weekdays") is not None and day.weekday() not in entry["weekdays"]:
+            continue
+        start_dt = datetime.combine(day, start_clock, tzinfo=tz)
+        end_day = day if end_clock > start_clock else day + timedelta(days=1)
+        end_dt = datetime.combine(end_day, end_clock, tzinfo=tz)
+        edges.append((start_dt.timestamp(), "start"))
+        edges.append((end_dt.timestamp(), "stop"))
+    edges.sort()
+    return edges
+
+
+def next_run(entry, tz, now=None):
+    """(epoch, aksi) berikutnya setelah now, atau None jika jadwal sekali jalan sudah lewat."""
+    now = now if now is not None else time.time()
+    if entry["kind"] == "once":
+        return (entry["run_at"], entry["action"]) if entry["run_at"] > now else None
+    return next(((ts, action) for ts, action in _window_edges(entry, tz, now) if ts > now), None)
+
+
+def missed_action(entry, tz, now=None):
+    """
+    Aksi yang terlewat (saat bot mati, atau sebelum jadwal dibuat) dan masih perlu dijalankan sekarang:
+    (epoch, aksi) atau None. Untuk jendela, hanya tepi terakhir sebelum now yang relevan (berada di dalam
+    jendela -> start, di luar -> stop), dan hanya jika tepi itu belum pernah dijalankan. Jendela yang
+    dibuat saat sedang terbuka langsung dimulai; tepi stop sebelum jadwal dibuat diabaikan agar siaran
+    yang dimulai manual tidak dihentikan oleh jadwal yang belum ada saat itu.
+    """
+    now = now if now is not None else time.time()
+    if entry["kind"] == "once":
+        if entry["run_at"] > now:
+            return None
+        late = now - entry["run_at"]
+        if entry["action"] == "start" and late > START_CATCHUP_GRACE_SECONDS:
+            return None
+        return entry["run_at"], entry["action"]
+    past = [(ts, action) for ts, action in _window_edges(entry, tz, now) if ts <= now]
+    if not past:
+        return None
+    ts, action = past[-1]
+    if ts <= (entry.get("last_fired") or 0):
+        return None
+    if action == "stop" and ts <= (entry.get("created_at") or 0):
+        return None
+    return ts, action
+
+
+def describe(entry, tz):
+    if entry["kind"] == "once":
+        when = datetime.fromtimestamp(entry["run_at"], tz).strftime('%Y-%m-%d %H:%M')
+        return f"{ACTION_LABELS[entry['action']]} sekali pada {when}"
+    days = "setiap hari" if entry.get("weekdays") is None else ", ".join(WEEKDAY_LABELS[d] for d in entry["weekdays"])
+    return f"Jendela live {entry['start']}-{entry['end']} ({days})"
@@ -0,0 +1,226 @@
+import os
+import json
+import tempfile
+import subprocess
+import threading
+
+# --- CACHE METADATA FFPROBE ---
+# Dipakai bersama oleh streamer.py dan telegram_bot.py. File cache diletakkan di
+# direktori skrip ini agar kedua proses (yang bisa berjalan dengan cwd berbeda)
+# membaca dan menulis file yang sama.
+PROBE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "probe_cache.json")
+
+# Durasi awal file (detik) yang dibaca paketnya untuk memperkirakan GOP.
+GOP_SAMPLE_SECONDS = 10
+
+_cache_lock = threading.Lock()
+_memory_cache = None
+
+
+def _cache_key(filepath):
+    """Membuat kunci cache dari (realpath, size, mtime_ns) file."""
+    real_path = os.path.realpath(filepath)
+    st = os.stat(real_path)
+    return f"{real_path}|{st.st_size}|{st.st_mtime_ns}", real_path
+
+
+def _load_cache():
+    try:
+        with open(PROBE_CACHE_FILE, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_cache(cache):
+    """
+    Menyimpan cache secara atomik lewat file sementara unik di direktori yang sama (lalu rename),
+    sehingga penyimpanan bersamaan dari beberapa thread maupun proses tidak saling menimpa.
+    """
+    directory = os.path.dirname(PROBE_CACHE_FILE) or "."
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(PROBE_CACHE_FILE)}.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f, indent=4)
+        os.replace(tmp_path, PROBE_CACHE_FILE)
+    except OSError as e:
+        print(f"[WARNING] Gagal menyimpan cache probe ke '{PROBE_CACHE_FILE}': {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _parse_rate(rate):
+    """Mengubah string rasio ffprobe (misal '30000/1001') menjadi float."""
+    try:
+        if not rate or rate == "0/0":
+            return None
+        if '/' in rate:
+            num, den = rate.split('/', 1)
+            return float(num) / float(den) if float(den) else None
+        return float(rate)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _estimate_gop(packets, video_index):
+    """Memperkirakan GOP (dalam frame) dari jarak antar keyframe pada paket video."""
+    distances = []
+    since_key = None
+    for packet in packets:
+        if packet.get("stream_index") != video_index:
+            continue
+        is_key = 'K' in packet.get("flags", "")
+        if is_key:
+            if since_key:
+                distances.append(since_key)
+            since_key = 1
+        elif since_key is not None:
+            since_key += 1
+    if not distances:
+        return None
+    return round(sum(distances) / len(distances))
+
+
+def _run_ffprobe(filepath):
+    """Menjalankan satu kali ffprobe (output JSON) untuk stream, format, dan paket awal."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-of', 'json',
+         '-show_entries', 'format:stream:packet=stream_index,flags',
+         '-read_intervals', f"%+{GOP_SAMPLE_SECONDS}",
+         filepath],
+        capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"ffprobe keluar dengan kode {result.returncode}")
+    data = json.loads(result.stdout or "{}")
+
+    streams = data.get("streams", [])
+    fmt = data.get("format", {})
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    info = {
+        "video_codec": video.get("codec_name") if video else None,
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "format_name": fmt.get("format_name"),
+        "width": _to_int(video.get("width")) if video else None,
+        "height": _to_int(video.get("height")) if video else None,
+        "pix_fmt": video.get("pix_fmt") if video else None,
+        "fps": (_parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate"))) if video else None,
+        "gop": _estimate_gop(data.get("packets", []), video.get("index")) if video else None,
+        "duration": _to_float(fmt.get("duration")),
+        "bit_rate": _to_int(fmt.get("bit_rate")),
+        "video_bitrate": _to_int(video.get("bit_rate")) if video else None,
+        "audio_bitrate": _to_int(audio.get("bit_rate")) if audio else None,
+        "audio_sample_rate": _to_int(audio.get("sample_rate")) if audio else None,
+        "audio_channels": _to_int(audio.get("channels")) if audio else None,
+    }
+    if info["fps"]:
+        info["fps"] = round(info["fps"], 3)
+    return info
+
+
+def probe_media(filepath, use_cache=True):
+    """
+    Mengembalikan metadata media (codec, resolusi, fps, GOP, durasi, bitrate).
+    Hasil disimpan di cache persisten dengan kunci (realpath, size, mtime_ns),
+    sehingga file yang sama tidak di-probe ulang selama belum berubah.
+    Mengembalikan None jika file tidak ada atau ffprobe gagal.
+    """
+    global _memory_cache
+    try:
+        key, real_path = _cache_key(filepath)
+    except OSError as e:
+        print(f"[ERROR] Tidak dapat membaca file '{filepath}': {e}")
+        return None
+
+    if use_cache:
+        with _cache_lock:
+            if _memory_cache is None or key not in _memory_cache:
+                _memory_cache = _load_cache()
+            cached = _memory_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+    try:
+        info = _run_ffprobe(real_path)
+    except FileNotFoundError:
+        print("[ERROR] FFprobe tidak ditemukan. Tidak dapat memeriksa codec video/audio.")
+        return None
+    except (RuntimeError, json.JSONDecodeError) as e:
+        print(f"[WARNING] Gagal mem-probe '{filepath}': {e}")
+        return None
+
+    with _cache_lock:
+        # Muat ulang dari disk sebelum menulis agar entri dari proses lain tidak hilang.
+        cache = _load_cache()
+        # Buang entri lama untuk path yang sama (file sudah berubah).
+        for old_key in [k for k in cache if k.rsplit('|', 2)[0] == real_path and k != key]:
+            del cache[old_key]
+        cache[key] = info
+        _save_cache(cache)
+        _memory_cache = cache
+    return dict(info)
+
+
+def forget_media(filepath):
+    """Menghapus semua entri cache untuk path tertentu (misal setelah file dihapus)."""
+    global _memory_cache
+    real_path = os.path.realpath(filepath)
+    with _cache_lock:
+        cache = _load_cache()
+        stale = [k for k in cache if k.rsplit('|', 2)[0] == real_path]
+        if not stale:
+            return
+        for k in stale:
+            del cache[k]
+        _save_cache(cache)
+        _memory_cache = cache
+
+
+# --- KELAYAKAN COPY STREAM ---
+# Satu-satunya aturan kapan track bisa dikirim ke YouTube lewat FLV tanpa re-encode. Dipakai oleh
+# streamer.decide_stream_mode (keputusan live), transcoder (antrean pre-transcode), dan
+# video_library (penanda ⚡), agar ketiganya tidak pernah berbeda pendapat.
+COPY_VIDEO_CODECS = ("h264",)
+COPY_VIDEO_PIX_FMTS = ("yuv420p", "yuvj420p", None)
+COPY_AUDIO_CODECS = ("aac",)
+COPY_AUDIO_SAMPLE_RATES = (44100, 48000, None)
+
+
+def is_video_copy_ok(media_info):
+    """True jika track video bisa di-copy: h264 8-bit 4:2:0."""
+    return (media_info.get("video_codec") in COPY_VIDEO_CODECS
+            and media_info.get("pix_fmt") in COPY_VIDEO_PIX_FMTS)
+
+
+def is_audio_copy_ok(media_info):
+    """True jika tidak ada audio, atau audionya AAC 44.1/48 kHz."""
+    if media_info.get("audio_codec") is None:
+        return True
+    return (media_info.get("audio_codec") in COPY_AUDIO_CODECS
+            and media_info.get("audio_sample_rate") in COPY_AUDIO_SAMPLE_RATES)
+
+
+def is_copy_eligible(media_info):
+    """True jika file bisa di-stream tanpa re-encode sama sekali (video dan audio)."""
+    return bool(media_info) and is_video_copy_ok(media_info) and is_audio_copy_ok(media_info)
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import socket
+import platform
+import tempfile
+import subprocess
+import threading
+
+try:
+    import resource
+except ImportError: # Windows: pemakaian CPU tidak diukur.
+    resource = None
+
+# --- BENCHMARK PRESET LIBX264 ---
+# Mode benchmark (streamer.py --benchmark) meng-encode potongan pendek video dengan setiap kombinasi
+# preset dan jumlah thread tanpa -re, lalu mengukur kecepatan (detik video per detik) dan pemakaian CPU.
+# Dipilih preset paling lambat (kualitas terbaik per bitrate) yang masih mencapai MIN_SPEED, jadi ada
+# sisa tenaga di atas realtime. Hasilnya disimpan per host dan per resolusi/fps sumber di
+# PROFILE_FILE, dan dipakai perintah RE-ENCODE streamer menggantikan FFMPEG_PRESET.
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preset_profiles.json")
+
+# Urut dari kualitas terbaik (paling lambat) ke tercepat.
+CANDIDATE_PRESETS = ("slow", "medium", "fast", "faster", "veryfast", "superfast", "ultrafast")
+MIN_SPEED = 1.5
+SAMPLE_SECONDS = 20
+
+_lock = threading.Lock()
+
+
+def host_key():
+    """Identitas host: nama, arsitektur, dan jumlah CPU (hasil benchmark tidak berlaku di mesin lain)."""
+    return f"{socket.gethostname()}/{platform.machine()}/{os.cpu_count() or 1}cpu"
+
+
+def resolution_key(width, height, fps):
+    return f"{width}x{height}@{round(fps or 0)}"
+
+
+def thread_candidates():
+    cpus = os.cpu_count() or 1
+    return sorted({max(1, cpus // 2), cpus})
+
+
+def _load_profiles():
+    try:
+        with open(PROFILE_FILE, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_profiles(profiles):
+    """
+    Menulis PROFILE_FILE secara atomik lewat file sementara unik di direktori yang sama, sehingga
+    benchmark yang berjalan bersamaan (beberapa slot/proses) tidak saling menimpa file sementara.
+    Mengembalikan False jika gagal ditulis (misal disk penuh atau direktori read-only).
+    """
+    directory = os.path.dirname(PROFILE_FILE) or "."
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(PROFILE_FILE)}.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(profiles, f, indent=4)
+        os.replace(tmp_path, PROFILE_FILE)
+        return True
+    except OSError as e:
+        print(f"[WARNING] Gagal menyimpan profil preset ke '{PROFILE_FILE}': {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return False
+
+
+def _cpu_seconds():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_trial(video_file, preset, threads, bitrate_kbps, start, seconds, video_filter=None):
+    """
+    Meng-encode 'seconds' detik mulai 'start' ke null muxer secepat mungkin.
+    Mengembalikan {"preset", "threads", "speed", "cpu_percent", "ok"}.
+    """
+    command = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error',
+               '-ss', f"{start:.3f}", '-t', f"{seconds:.3f}", '-i', video_file,
+               '-map', '0:v:0', '-an']
+    if video_filter:
+        command += ['-vf', video_filter]
+    command += ['-c:v', 'libx264', '-preset', preset, '-threads', str(threads),
+                '-b:v', f"{bitrate_kbps}k", '-maxrate', f"{bitrate_kbps}k", '-bufsize', f"{bitrate_kbps * 2}k",
+                '-pix_fmt', 'yuv420p', '-f', 'null', '-']
+    cpu_before = _cpu_seconds()
+    started = time.monotonic()
+    result = subprocess.run(command, capture_output=True, text=True, check=False)
+    wall = max(time.monotonic() - started, 1e-6)
+    cpu_after = _cpu_seconds()
+    cpu_percent = None
+    if cpu_before is not None and cpu_after is not None:
+        cpu_percent = round((cpu_after - cpu_before) / wall / (os.cpu_count() or 1) * 100, 1)
+    return {"preset": preset, "threads": threads, "speed": round(seconds / wall, 3),
+            "cpu_percent": cpu_percent, "ok": result.returncode == 0,
+            "error": result.stderr.strip()[-300:] if result.returncode != 0 else None}
+
+
+def pick_best(results, min_speed=MIN_SPEED):
+    """
+    Preset paling lambat yang masih >= min_speed (di antara thread yang lolos, yang CPU-nya paling rendah).
+    Jika tidak ada yang lolos, kombinasi tercepat dikembalikan dengan realtime=False.
+    """
+    ok = [r for r in results if r["ok"]]
+    if not ok:
+        return None
+    passing = [r for r in ok if r["speed"] >= min_speed]
+    if not passing:
+        return dict(max(ok, key=lambda r: r["speed"]), realtime=False)
+    best = min(passing, key=lambda r: (CANDIDATE_PRESETS.index(r["preset"]),
+                                       r["cpu_percent"] if r["cpu_percent"] is not None else 0, r["threads"]))
+    return dict(best, realtime=True)
+
+
+def run_benchmark(video_file, media_info, bitrate_kbps, min_speed=MIN_SPEED, sample_seconds=SAMPLE_SECONDS,
+                  video_filter=None, on_result=None):
+    """
+    Menjalankan semua kombinasi preset x thread pada potongan video_file. on_result(result) dipanggil
+    setiap kombinasi selesai. Mengembalikan (terbaik, semua_hasil). Preset yang lebih cepat dari
+    preset pertama yang lolos tidak perlu diuji lagi, jadi benchmark berhenti di situ.
+    """
+    duration = media_info.get("duration") or 0
+    start = duration * 0.3 if duration > sample_seconds * 2 else 0.0
+    seconds = min(sample_seconds, duration - start) if duration else sample_seconds
+    results = []
+    for preset in CANDIDATE_PRESETS:
+        trials = [run_trial(video_file, preset, threads, bitrate_kbps, start, seconds, video_filter)
+                  for threads in thread_candidates()]
+        for trial in trials:
+            results.append(trial)
+            if on_result:
+                on_result(trial)
+        if any(t["ok"] and t["speed"] >= min_speed for t in trials):
+            break
+    return pick_best(results, min_speed), results
+
+
+def record_profile(width, height, fps, best, bitrate_kbps, min_speed=MIN_SPEED):
+    """Menyimpan hasil terbaik untuk host ini dan resolusi/fps sumber. Mengembalikan False jika gagal disimpan."""
+    with _lock:
+        profiles = _load_profiles()
+        profiles.setdefault(host_key(), {})[resolution_key(width, height, fps)] = {
+            "preset": best["preset"], "threads": best["threads"], "speed": best["speed"],
+            "cpu_percent": best["cpu_percent"], "realtime": best["realtime"], "min_speed": min_speed,
+            "bitrate_kbps": bitrate_kbps, "width": width, "height": height, "fps": fps,
+            "measured_at": time.time(),
+        }
+        return _save_profiles(profiles)
+
+
+def _profile_load(profile):
+    """Beban piksel (lebar x tinggi x fps) profil tersimpan, atau None jika entri rusak/diedit tangan."""
+    if not isinstance(profile, dict) or not isinstance(profile.get("preset"), str):
+        return None
+    width, height, fps = profile.get("width"), profile.get("height"), profile.get("fps") or 30
+    if not all(isinstance(v, (int, float)) and v > 0 for v in (width, height, fps)):
+        return None
+    return width * height * fps
+
+
+def lookup_profile(width, height, fps):
+    """
+    Profil tersimpan untuk host ini: resolusi/fps yang sama persis, atau profil terdekat yang beban
+    pikselnya (lebar x tinggi x fps) tidak lebih ringan dari sumber. None jika belum ada.
+    """
+    if not width or not height:
+        return None
+    with _lock:
+        host_profiles = _load_profiles().get(host_key())
+    if not isinstance(host_profiles, dict):
+        return None
+    exact = host_profiles.get(resolution_key(width, height, fps))
+    if _profile_load(exact) is not None:
+        return exact
+    load = width * height * (fps or 30)
+    heavier = [(p_load, p) for p_load, p in ((_profile_load(p), p) for p in host_profiles.values())
+               if p_load is not None and p_load >= load]
+    return min(heavier, key=lambda item: item[0])[1] if heavier else None
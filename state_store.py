@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+# --- PENYIMPANAN STATUS BOT (SQLITE WAL) ---
+# BOT_STATE disimpan di SQLite dengan journal WAL: kunci tingkat atas di tabel bot_state,
+# status tiap slot stream di baris stream_state sendiri. Setiap penulisan adalah satu transaksi,
+# jadi bot yang mati di tengah penulisan tidak merusak status. save_state() hanya mengambil
+# snapshot (JSON) lalu kembali; thread penulis menggabungkan perubahan beruntun dalam
+# DEBOUNCE_SECONDS menjadi satu transaksi dan hanya menulis baris yang berubah.
+DEBOUNCE_SECONDS = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stream_state (
+    slot_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+_db_path = None
+_cond = threading.Condition()
+_pending = None # snapshot terbaru yang belum ditulis
+_written = {} # (tabel, kunci) -> JSON yang terakhir berhasil ditulis
+_write_lock = threading.RLock()
+_writer = None
+
+
+@contextmanager
+def _connect():
+    """Koneksi singkat per operasi; commit otomatis lalu ditutup."""
+    conn = sqlite3.connect(_db_path, timeout=10)
+    conn.execute("PRAGMA synchronous=FULL")
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _move_aside(path, reason):
+    """Memindahkan file rusak ke <path>.corrupt-<waktu> agar bisa diperiksa, bukan ditimpa diam-diam."""
+    target = f"{path}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, target)
+    logger.error(f"{reason}: '{path}' dipindahkan ke '{target}'. Status dimulai dari default.")
+
+
+def _open_database():
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise sqlite3.DatabaseError("quick_check gagal")
+
+
+def init_store(db_path, legacy_json_path=None):
+    """
+    Membuka (atau membuat) database status di db_path dan memulai thread penulis. Jika database
+    masih kosong dan legacy_json_path (bot_state.json lama) ada, isinya diimpor sekali lalu file
+    tersebut diganti nama menjadi .migrated.
+    """
+    global _db_path, _writer
+    _db_path = db_path
+    try:
+        _open_database()
+    except sqlite3.DatabaseError as e:
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        _move_aside(db_path, f"Database status rusak ({e})")
+        _open_database()
+
+    if legacy_json_path and os.path.exists(legacy_json_path) and load_state() is None:
+        try:
+            with open(legacy_json_path, 'r') as f:
+                legacy_state = json.load(f)
+            _write(_snapshot(legacy_state))
+            os.replace(legacy_json_path, f"{legacy_json_path}.migrated")
+            logger.info(f"Status lama dari '{legacy_json_path}' diimpor ke '{db_path}'.")
+        except json.JSONDecodeError as e:
+            _move_aside(legacy_json_path, f"File status lama tidak valid ({e})")
+
+    if _writer is None:
+        _writer = threading.Thread(target=_writer_loop, name="state-writer", daemon=True)
+        _writer.start()
+
+
+def load_state():
+    """Mengembalikan status tersimpan sebagai dict (dengan kunci 'streams' per slot), atau None jika kosong."""
+    with _connect() as conn:
+        bot_rows = conn.execute("SELECT key, value FROM bot_state").fetchall()
+        stream_rows = conn.execute("SELECT slot_id, state FROM stream_state").fetchall()
+    if not bot_rows and not stream_rows:
+        return None
+    state = {key: json.loads(value) for key, value in bot_rows}
+    state["streams"] = {slot_id: json.loads(value) for slot_id, value in stream_rows}
+    with _write_lock:
+        _written.clear()
+        _written.update(_snapshot(state))
+    return state
+
+
+def _snapshot(state):
+    """Serialisasi status menjadi {(tabel, kunci): JSON}; status slot lama (tanpa 'streams') masuk ke bot_state."""
+    rows = {("bot_state", key): json.dumps(value, sort_keys=True)
+            for key, value in state.items() if key != "streams"}
+    for slot_id, slot_state in (state.get("streams") or {}).items():
+        rows[("stream_state", slot_id)] = json.dumps(slot_state, sort_keys=True)
+    return rows
+
+
+def _write(snapshot):
+    """Menulis baris yang berubah (dan menghapus yang hilang) dalam satu transaksi."""
+    with _write_lock:
+        changed = {k: v for k, v in snapshot.items() if _written.get(k) != v}
+        removed = [k for k in _written if k not in snapshot]
+        if not changed and not removed:
+            return
+        now = time.time()
+        with _connect() as conn:
+            for (table, key), value in changed.items():
+                if table == "bot_state":
+                    conn.execute("INSERT INTO bot_state (key, value) VALUES (?, ?) "
+                                 "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+                else:
+                    conn.execute("INSERT INTO stream_state (slot_id, state, updated_at) VALUES (?, ?, ?) "
+                                 "ON CONFLICT(slot_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                                 (key, value, now))
+            for table, key in removed:
+                column = "key" if table == "bot_state" else "slot_id"
+                conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+        _written.clear()
+        _written.update(snapshot)
+    logger.debug(f"Status bot disimpan ke '{_db_path}' ({len(changed)} diubah, {len(removed)} dihapus).")
+
+
+def save_state(state):
+    """Menjadwalkan penyimpanan state (tidak memblokir). Snapshot diambil saat ini juga."""
+    global _pending
+    snapshot = _snapshot(state)
+    with _cond:
+        _pending = snapshot
+        _cond.notify()
+
+
+def _take_pending():
+    global _pending
+    with _cond:
+        snapshot, _pending = _pending, None
+    return snapshot
+
+
+def _writer_loop():
+    global _pending
+    while True:
+        with _cond:
+            while _pending is None:
+                _cond.wait()
+        time.sleep(DEBOUNCE_SECONDS) # Kumpulkan perubahan beruntun menjadi satu transaksi.
+        # Ambil dan tulis snapshot di bawah _write_lock agar flush_state() tidak tersalip snapshot lama.
+        with _write_lock:
+            snapshot = _take_pending()
+            if snapshot is None:
+                continue
+            try:
+                _write(snapshot)
+            except sqlite3.Error as e:
+                logger.error(f"Gagal menyimpan status bot ke '{_db_path}': {e}")
+                with _cond:
+                    if _pending is None:
+                        _pending = snapshot # Dicoba lagi pada putaran berikutnya.
+
+
+def flush_state():
+    """Menulis snapshot yang tertunda sekarang juga (dipanggil saat bot dimatikan)."""
+    with _write_lock:
+        snapshot = _take_pending()
+        if snapshot is not None:
+            _write(snapshot)
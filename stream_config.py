@@ -0,0 +1,341 @@
+import os
+import json
+import copy
+import ctypes
+import ctypes.util
+import select
+import struct
+import logging
+import platform
+import threading
+
+# --- KONFIGURASI STREAMER BERSAMA (config.json) ---
+# Dipakai oleh streamer.py dan telegram_bot.py. Isi config.json divalidasi terhadap tipe dan
+# batas di bawah (nilai yang tidak valid diganti default), disimpan di memori, dan hanya
+# dibaca ulang jika mtime/ukuran file berubah. watch_config() memantau perubahan file
+# (inotify di Linux, polling mtime di sistem lain) agar perubahan bisa diterapkan tanpa restart.
+DEFAULT_CONFIG = {
+    "STREAM_URL": "rtmp://a.rtmp.youtube.com/live2", # Diperbarui ke yang lebih standar
+    # Ingest cadangan untuk STREAM_URL, urut prioritas (lihat ingest_failover).
+    "BACKUP_STREAM_URLS": [],
+    "INGEST_FAILOVER_AFTER": 2, # Kegagalan koneksi beruntun sebelum pindah ke ingest berikutnya.
+    "INGEST_PRIMARY_RECHECK_SEC": 60,
+    "VIDEO_EXTENSIONS": [".mp4", ".mkv", ".avi", ".mov", ".flv", ".webm"],
+    "KEY_FILENAME": "keystream.txt",
+    "RETRY_LIMIT": 5,
+    "RETRY_BACKOFF_BASE_SEC": 2,
+    "RETRY_BACKOFF_MAX_SEC": 60,
+    "RETRY_RESET_AFTER_SEC": 600,
+    "RESUME_ON_RETRY": True,
+    "LOG_FILE": "ffmpeg_log.txt",
+    "LOG_MAX_BYTES": 5 * 1024 * 1024,
+    "LOG_BACKUP_COUNT": 3,
+    "LOG_COMPRESS": True,
+    "TIMEZONE": "Asia/Makassar",
+    "FFMPEG_PRESET": "veryfast",
+    # Pakai preset/thread hasil benchmark (streamer.py --benchmark) untuk host dan resolusi ini jika ada.
+    "PRESET_AUTOTUNE": True,
+    "BENCHMARK_MIN_SPEED": 1.5, # Kecepatan minimum (x realtime) agar preset dianggap sanggup.
+    "BENCHMARK_SAMPLE_SEC": 20,
+    # Normalisasi resolusi/fps saat re-encode sesuai bitrate (lihat video_normalize).
+    "RESOLUTION_NORMALIZE": True,
+    "VIDEO_FILTER": "", # Filter -vf pengganti; boleh memakai {width}, {height}, {fps}.
+    "VIDEO_BITRATE_KBPS": 2500,
+    "AUDIO_BITRATE_KBPS": 128,
+    # Autotune bitrate (lihat bitrate_autotune): VIDEO_BITRATE_KBPS menjadi batas atas tangga.
+    # Dinonaktifkan otomatis saat fan-out aktif (lebih dari satu tujuan): encoder tidak melihat backpressure RTMP.
+    "BITRATE_AUTOTUNE": True,
+    "BITRATE_LADDER_KBPS": [6000, 4500, 3500, 2500, 1800, 1200, 800],
+    # "host:port" sink TCP untuk mengukur uplink sebelum siaran; kosong = tanpa probe. Sengaja kosong secara
+    # default: tidak ada sink publik yang aman dipakai, dan mengirim data uji ke ingest RTMP tujuan akan
+    # ditolak atau memulai siaran. Tanpa probe, siaran dimulai dari VIDEO_BITRATE_KBPS dan monitor
+    # menurunkannya dalam satu WINDOW_SEC jika uplink tidak cukup.
+    "BANDWIDTH_PROBE_TARGET": "",
+    "BANDWIDTH_PROBE_SEC": 5,
+    # Cache encode (RE-ENCODE saja): putaran pertama di-encode sambil ditulis ke ENCODE_CACHE_DIR,
+    # putaran berikutnya COPY dari file cache. Peralihan ke cache BUKAN tanpa jeda: FFmpeg encode
+    # berhenti dan FFmpeg copy membuka koneksi RTMP baru, jadi penonton melihat siaran tersambung ulang
+    # sekali (beberapa detik buffering) di akhir putaran pertama. Matikan jika itu tidak bisa diterima.
+    "ENCODE_CACHE": True,
+    "ENCODE_CACHE_DIR": "encode_cache",
+    "METRICS_ENABLED": True,
+    "METRICS_PORT": 9464,
+    "PROGRESS_EVENT_INTERVAL_SEC": 10,
+    "STALL_TIMEOUT_SEC": 30,
+    # Tujuan tambahan (fan-out): [{"name": ..., "url": ..., "key_file"/"key_env": ...}].
+    # Kosong = hanya STREAM_URL dengan kunci slot. Lihat streamer.resolve_destinations.
+    "DESTINATIONS": [],
+    "SLOTS": {}
+}
+
+FFMPEG_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+
+# Batas (min, maks) untuk nilai numerik. Kunci tanpa batas hanya dicek tipenya.
+NUMERIC_LIMITS = {
+    "RETRY_LIMIT": (1, 1000),
+    "INGEST_FAILOVER_AFTER": (1, 100),
+    "INGEST_PRIMARY_RECHECK_SEC": (5, 86400),
+    "RETRY_BACKOFF_BASE_SEC": (0, 3600),
+    "RETRY_BACKOFF_MAX_SEC": (0, 3600),
+    "RETRY_RESET_AFTER_SEC": (0, 86400),
+    "LOG_MAX_BYTES": (0, 1024 * 1024 * 1024),
+    "LOG_BACKUP_COUNT": (0, 100),
+    "VIDEO_BITRATE_KBPS": (100, 60000),
+    "AUDIO_BITRATE_KBPS": (32, 512),
+    "BANDWIDTH_PROBE_SEC": (1, 60),
+    "BENCHMARK_MIN_SPEED": (1.0, 10.0),
+    "BENCHMARK_SAMPLE_SEC": (5, 300),
+    "METRICS_PORT": (0, 65535),
+    "PROGRESS_EVENT_INTERVAL_SEC": (1, 3600),
+    "STALL_TIMEOUT_SEC": (0, 3600),
+}
+
+# Kunci yang aman diubah saat siaran berjalan: langsung berlaku di loop streamer berikutnya.
+LIVE_KEYS = ("RETRY_LIMIT", "RETRY_BACKOFF_BASE_SEC", "RETRY_BACKOFF_MAX_SEC", "RETRY_RESET_AFTER_SEC",
+             "RESUME_ON_RETRY", "PROGRESS_EVENT_INTERVAL_SEC", "STALL_TIMEOUT_SEC")
+# Kunci pengaturan encode: berlaku setelah FFmpeg di-restart (dilanjutkan dari posisi terakhir).
+ENCODE_KEYS = ("FFMPEG_PRESET", "VIDEO_BITRATE_KBPS", "AUDIO_BITRATE_KBPS", "RESOLUTION_NORMALIZE", "VIDEO_FILTER")
+# Kunci teks yang boleh dikosongkan.
+OPTIONAL_TEXT_KEYS = ("BANDWIDTH_PROBE_TARGET", "VIDEO_FILTER")
+
+WATCH_POLL_INTERVAL_SECONDS = 2
+
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+_cache = {} # path absolut -> ((mtime_ns, size), config)
+
+
+class ConfigError(Exception):
+    pass
+
+
+def _validate_value(key, value, default):
+    """Mengembalikan nilai yang sudah divalidasi, atau memunculkan ConfigError."""
+    if isinstance(default, bool):
+        if not isinstance(value, bool):
+            raise ConfigError("harus true/false")
+        return value
+    if isinstance(default, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ConfigError("harus berupa angka")
+        low, high = NUMERIC_LIMITS.get(key, (None, None))
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise ConfigError(f"harus antara {low} dan {high}")
+        return int(value) if isinstance(default, int) and float(value).is_integer() else value
+    if isinstance(default, str):
+        if not isinstance(value, str) or (not value.strip() and key not in OPTIONAL_TEXT_KEYS):
+            raise ConfigError("harus berupa teks yang tidak kosong")
+        if key == "FFMPEG_PRESET" and value not in FFMPEG_PRESETS:
+            raise ConfigError(f"harus salah satu dari {', '.join(FFMPEG_PRESETS)}")
+        if key == "STREAM_URL":
+            value = value.strip().strip('/')
+        if key == "VIDEO_FILTER":
+            try:
+                value.format(width=1280, height=720, fps=30)
+            except (KeyError, IndexError, ValueError) as e:
+                raise ConfigError(f"placeholder tidak valid ({e}); gunakan {{width}}, {{height}}, {{fps}}")
+        return value
+    if key == "BITRATE_LADDER_KBPS":
+        low, high = NUMERIC_LIMITS["VIDEO_BITRATE_KBPS"]
+        if (not isinstance(value, list) or not value
+                or not all(isinstance(v, int) and not isinstance(v, bool) and low <= v <= high for v in value)):
+            raise ConfigError(f"harus berupa daftar angka bulat antara {low} dan {high}")
+        return value
+    if key == "DESTINATIONS":
+        if not isinstance(value, list) or not all(isinstance(d, dict) and isinstance(d.get("url"), str) and d["url"].strip()
+                                                  for d in value):
+            raise ConfigError("harus berupa daftar objek dengan 'url'")
+        for option in ("name", "key_file", "key_env"):
+            if any(option in d and not isinstance(d[option], str) for d in value):
+                raise ConfigError(f"'{option}' setiap tujuan harus berupa teks")
+        return value
+    if isinstance(default, list):
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ConfigError("harus berupa daftar teks")
+        if key == "VIDEO_EXTENSIONS":
+            value = [v.lower() if v.startswith('.') else f".{v.lower()}" for v in value]
+        if key == "BACKUP_STREAM_URLS":
+            value = [v.strip().strip('/') for v in value if v.strip()]
+        return value
+    if isinstance(default, dict):
+        if not isinstance(value, dict) or not all(isinstance(v, dict) for v in value.values()):
+            raise ConfigError("harus berupa objek berisi profil")
+        return value
+    return value
+
+
+def validate_config(raw):
+    """
+    Melengkapi dan memvalidasi isi config.json. Mengembalikan (config, daftar masalah);
+    nilai yang tidak valid diganti default. Kunci yang tidak dikenal dibiarkan apa adanya.
+    """
+    if not isinstance(raw, dict):
+        return copy.deepcopy(DEFAULT_CONFIG), ["isi file bukan objek JSON"]
+    config = dict(raw)
+    problems = []
+    for key, default in DEFAULT_CONFIG.items():
+        if key not in raw:
+            config[key] = copy.deepcopy(default)
+            continue
+        try:
+            config[key] = _validate_value(key, raw[key], default)
+        except ConfigError as e:
+            problems.append(f"{key} {e} (dipakai default: {default!r})")
+            config[key] = copy.deepcopy(default)
+    for slot_id, profile in config["SLOTS"].items():
+        for key in [k for k in profile if k in DEFAULT_CONFIG and k != "SLOTS"]:
+            try:
+                profile[key] = _validate_value(key, profile[key], DEFAULT_CONFIG[key])
+            except ConfigError as e:
+                problems.append(f"SLOTS.{slot_id}.{key} {e} (diabaikan)")
+                del profile[key]
+    if not config["STREAM_URL"].startswith(("rtmp://", "rtmps://")):
+        problems.append("STREAM_URL mungkin tidak valid. Pastikan dimulai dengan 'rtmp://'.")
+    for url in config["BACKUP_STREAM_URLS"]:
+        if not url.startswith(("rtmp://", "rtmps://")):
+            problems.append(f"BACKUP_STREAM_URLS '{url}' mungkin tidak valid. Pastikan dimulai dengan 'rtmp://'.")
+    return config, problems
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_config(path, create_missing=False):
+    """
+    Mengembalikan konfigurasi tervalidasi dari path. Hasil parse disimpan di memori dan file hanya
+    dibaca ulang jika mtime/ukurannya berubah. Jika file tidak ada, dipakai default (dan file
+    dibuat jika create_missing). Jika JSON rusak, konfigurasi terakhir yang valid tetap dipakai.
+    Nilai kembalian adalah salinan; aman diubah pemanggil.
+    """
+    path = os.path.abspath(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        try:
+            signature = _file_signature(path)
+        except FileNotFoundError:
+            if create_missing:
+                logger.info(f"File '{path}' tidak ditemukan. Membuat file konfigurasi default...")
+                save_config(DEFAULT_CONFIG, path)
+            config = copy.deepcopy(DEFAULT_CONFIG)
+            _cache[path] = (None, config)
+            return copy.deepcopy(config)
+        if cached and cached[0] == signature:
+            return copy.deepcopy(cached[1])
+        try:
+            with open(path, 'r') as f:
+                raw = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Kesalahan format JSON di '{path}': {e}. Menggunakan konfigurasi {'terakhir' if cached else 'default'}.")
+            config = cached[1] if cached else copy.deepcopy(DEFAULT_CONFIG)
+            _cache[path] = (signature, config)
+            return copy.deepcopy(config)
+        config, problems = validate_config(raw)
+        for problem in problems:
+            logger.warning(f"Konfigurasi '{os.path.basename(path)}': {problem}")
+        _cache[path] = (signature, config)
+        return copy.deepcopy(config)
+
+
+def save_config(config, path):
+    """Menyimpan konfigurasi secara atomik (tulis ke file sementara lalu rename)."""
+    path = os.path.abspath(path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(config, f, indent=4)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Gagal menyimpan konfigurasi ke '{path}': {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def changed_keys(old, new):
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+# --- PEMANTAUAN PERUBAHAN FILE ---
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _open_inotify(directory):
+    """Mengembalikan fd inotify yang memantau directory, atau None jika inotify tidak tersedia."""
+    if platform.system() != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        # Direktori (bukan file) dipantau karena editor dan save_config mengganti file lewat rename.
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _inotify_names(fd):
+    """Membaca semua event yang tertunda dan mengembalikan nama file yang disebut."""
+    names = set()
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return names
+    offset = 0
+    while offset + _INOTIFY_EVENT.size <= len(data):
+        _, _, _, name_len = _INOTIFY_EVENT.unpack_from(data, offset)
+        offset += _INOTIFY_EVENT.size
+        names.add(os.fsdecode(data[offset:offset + name_len].rstrip(b"\0")))
+        offset += name_len
+    return names
+
+
+def watch_config(path, on_change, poll_interval=WATCH_POLL_INTERVAL_SECONDS):
+    """
+    Memantau path di thread daemon. Setiap kali isi file berubah, on_change(config_lama, config_baru)
+    dipanggil dengan konfigurasi tervalidasi. Mengembalikan threading.Event untuk menghentikan pemantauan.
+    """
+    path = os.path.abspath(path)
+    stop = threading.Event()
+    current = [load_config(path)]
+
+    def check():
+        new_config = load_config(path)
+        if new_config != current[0]:
+            old_config, current[0] = current[0], new_config
+            try:
+                on_change(old_config, new_config)
+            except Exception as e:
+                logger.error(f"Gagal menerapkan perubahan konfigurasi '{path}': {e}", exc_info=True)
+
+    def run():
+        fd = _open_inotify(os.path.dirname(path))
+        # Perubahan antara load_config awal dan terpasangnya watch inotify tidak memicu event.
+        check()
+        try:
+            while not stop.is_set():
+                if fd is None:
+                    stop.wait(poll_interval)
+                    check()
+                    continue
+                ready, _, _ = select.select([fd], [], [], poll_interval)
+                if ready and os.path.basename(path) in _inotify_names(fd):
+                    check()
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    threading.Thread(target=run, name="config-watch", daemon=True).start()
+    return stop
@@ -0,0 +1,154 @@
+import time
+import socket
+import subprocess
+import threading
+
+import ffmpeg_log
+import ingest_failover
+
+# --- FAN-OUT KE BEBERAPA TUJUAN RTMP ---
+# Jika satu stream punya lebih dari satu tujuan (CONFIG["DESTINATIONS"]), FFmpeg utama hanya
+# meng-encode sekali dan mengirim MPEG-TS ke port UDP lokal, satu port per tujuan (muxer tee).
+# Untuk setiap tujuan ada proses relay FFmpeg (-c copy) yang membaca port tersebut dan
+# mendorongnya ke RTMP. Relay yang putus di-restart sendiri dengan backoff tanpa mengganggu
+# encoder maupun tujuan lain; UDP tidak pernah memblokir encoder jika relay sedang mati.
+# Tujuan yang punya ingest cadangan ("ingest", lihat ingest_failover) berpindah ingest di dalam relay-nya.
+RELAY_BACKOFF_BASE_SEC = 2
+RELAY_BACKOFF_MAX_SEC = 30
+RELAY_STABLE_AFTER_SEC = 60 # Relay yang hidup selama ini dianggap pulih; backoff direset.
+RELAY_RW_TIMEOUT_US = 15_000_000 # Relay keluar jika soket RTMP macet selama ini.
+UDP_PACKET_SIZE = 1316 # 7 paket TS per datagram.
+
+
+def pick_local_port(taken=()):
+    """Port UDP lokal yang sedang bebas dan belum dipakai relay lain (taken)."""
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        if port not in taken:
+            return port
+
+
+def relay_output_url(port):
+    """URL yang ditulis FFmpeg utama untuk satu relay."""
+    return f"udp://127.0.0.1:{port}?pkt_size={UDP_PACKET_SIZE}"
+
+
+def build_relay_command(port, destination_url):
+    """Perintah relay: baca MPEG-TS dari port UDP lokal, kirim tanpa re-encode ke tujuan RTMP."""
+    return [
+        'ffmpeg', '-nostats', '-loglevel', 'level+warning',
+        '-fflags', '+genpts',
+        '-i', f"udp://127.0.0.1:{port}?fifo_size=1000000&overrun_nonfatal=1",
+        '-map', '0:v?', '-map', '0:a?', '-c', 'copy', '-bsf:a', 'aac_adtstoasc',
+        '-rw_timeout', str(RELAY_RW_TIMEOUT_US),
+        '-f', 'flv', destination_url
+    ]
+
+
+def start_relays(destinations, log, emit_event):
+    """
+    Menjalankan satu relay per tujuan ({"name", "url"}) di thread pengawas masing-masing.
+    Mengembalikan dict handle: "outputs" (URL UDP untuk muxer tee FFmpeg utama) dan "stop".
+    """
+    stop = threading.Event()
+    relays = []
+    for destination in destinations:
+        # Soket pemilih port sudah ditutup, jadi OS bisa memberikan port yang sama lagi; hindari duplikat.
+        port = pick_local_port({r["port"] for r in relays})
+        relay = {"name": destination["name"], "url": destination["url"], "ingest": destination.get("ingest"),
+                 "port": port, "process": None, "restarts": 0}
+        relay["thread"] = threading.Thread(target=_supervise_relay, args=(relay, stop, log, emit_event),
+                                           name=f"relay-{relay['name']}", daemon=True)
+        relays.append(relay)
+    for relay in relays:
+        relay["thread"].start()
+    return {"relays": relays, "stop": stop, "outputs": [relay_output_url(r["port"]) for r in relays]}
+
+
+def _wait_relay(process, stop, pool, recovered, emit_event, name):
+    """Menunggu relay keluar; jika ingest utama pulih, relay dihentikan. Mengembalikan True jika kembali ke utama."""
+    while True:
+        try:
+            process.wait(timeout=1)
+            return False
+        except subprocess.TimeoutExpired:
+            pass
+        if stop.is_set() or not recovered.is_set():
+            continue
+        recovered.clear()
+        if ingest_failover.return_to_primary(pool, emit_event, name):
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            return True
+
+
+def _supervise_relay(relay, stop, log, emit_event):
+    failures = 0
+    pool = relay["ingest"]
+    recovered = threading.Event()
+    stop_watch = ingest_failover.watch_primary(pool, recovered) if pool else None
+    while not stop.is_set():
+        if pool:
+            ingest_failover.ensure_reachable(pool, emit_event, relay["name"])
+            relay["url"] = ingest_failover.active(pool)["url"]
+        started = time.monotonic()
+        returned = False
+        try:
+            process = subprocess.Popen(build_relay_command(relay["port"], relay["url"]),
+                                       stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            log.info(f"[relay {relay['name']}] gagal dijalankan: {e}")
+            process = None
+        if process is not None:
+            relay["process"] = process
+            emit_event("relay", name=relay["name"], state="up", pid=process.pid, restarts=relay["restarts"])
+            stderr_thread = ffmpeg_log.start_stderr_pump(process.stderr, log, prefix=f"[relay {relay['name']}] ")
+            if pool:
+                returned = _wait_relay(process, stop, pool, recovered, emit_event, relay["name"])
+            else:
+                process.wait()
+            stderr_thread.join(timeout=2)
+            if stop.is_set():
+                break
+        if returned:
+            print(f"\n[ INFO ] Ingest utama pulih. Relay '{relay['name']}' dipindahkan kembali ke ingest utama.")
+            continue
+        ran_for = time.monotonic() - started
+        if ran_for >= RELAY_STABLE_AFTER_SEC:
+            failures = 0
+        failures += 1
+        relay["restarts"] += 1
+        delay = min(RELAY_BACKOFF_MAX_SEC, RELAY_BACKOFF_BASE_SEC * (2 ** (failures - 1)))
+        if pool and ran_for < ingest_failover.CONNECT_FAILURE_MAX_STREAMED_SEC:
+            switched = ingest_failover.record_failure(pool, emit_event, relay["name"])
+            if switched and switched[1]:
+                delay = ingest_failover.SWITCH_DELAY_SEC # Ingest lain belum bermasalah; tidak perlu backoff.
+        elif pool:
+            ingest_failover.record_success(pool)
+        emit_event("relay", name=relay["name"], state="down", code=process.returncode if process else None,
+                   restarts=relay["restarts"], retry_in=delay)
+        print(f"\n[ WARNING ] Relay '{relay['name']}' terputus. Disambung ulang dalam {delay} detik; tujuan lain tetap berjalan.")
+        stop.wait(delay)
+    if stop_watch:
+        stop_watch.set()
+
+
+def stop_relays(handle, timeout=5):
+    """Menghentikan semua relay (dipanggil saat siaran selesai)."""
+    handle["stop"].set()
+    for relay in handle["relays"]:
+        process = relay["process"]
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    for relay in handle["relays"]:
+        relay["thread"].join(timeout=timeout)
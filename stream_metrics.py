@@ -0,0 +1,192 @@
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- METRIK PROGRES FFMPEG ---
+# FFmpeg dijalankan dengan '-progress pipe:1'. Setiap blok key=value yang diakhiri
+# 'progress=continue|end' diubah menjadi satu sampel dan disimpan di deret waktu bergulir.
+# Deret waktu ini dibaca oleh streamer (event ke bot) dan oleh endpoint HTTP lokal
+# berformat Prometheus.
+PROGRESS_HISTORY_SIZE = 720
+
+PROGRESS_SERIES = deque(maxlen=PROGRESS_HISTORY_SIZE)
+_lock = threading.Lock()
+_state = {
+    "slot": "default",
+    "ffmpeg_up": 0,
+    "ffmpeg_starts": 0,
+    "stall_restarts": 0,
+    # Waktu (monotonic) terakhir frame atau out_time bertambah, dipakai watchdog stall.
+    "last_advance": None,
+    "last_frame": None,
+    "last_out_time": None,
+}
+
+
+def _parse_number(value, suffix=""):
+    if value is None:
+        return None
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_progress_block(fields):
+    """Mengubah satu blok key=value dari -progress menjadi sampel metrik."""
+    out_time_us = _parse_number(fields.get("out_time_us")) or _parse_number(fields.get("out_time_ms"))
+    return {
+        "ts": time.time(),
+        "frame": _parse_number(fields.get("frame")),
+        "fps": _parse_number(fields.get("fps")),
+        "bitrate_kbps": _parse_number(fields.get("bitrate"), "kbits/s"),
+        "total_size": _parse_number(fields.get("total_size")),
+        "out_time_s": out_time_us / 1_000_000 if out_time_us is not None else None,
+        "speed": _parse_number(fields.get("speed"), "x"),
+        "drop_frames": _parse_number(fields.get("drop_frames")),
+        "dup_frames": _parse_number(fields.get("dup_frames")),
+        "progress": fields.get("progress"),
+    }
+
+
+def read_progress(pipe, on_sample=None):
+    """Membaca output -progress sampai EOF, menyimpan setiap sampel dan memanggil on_sample(sample)."""
+    fields = {}
+    for raw_line in pipe:
+        line = raw_line.decode("utf-8", errors="replace") if isinstance(raw_line, bytes) else raw_line
+        key, sep, value = line.strip().partition('=')
+        if not sep:
+            continue
+        fields[key] = value
+        if key == "progress":
+            sample = parse_progress_block(fields)
+            record_sample(sample)
+            if on_sample:
+                on_sample(sample)
+            fields = {}
+
+
+def record_sample(sample):
+    with _lock:
+        PROGRESS_SERIES.append(sample)
+        frame, out_time = sample.get("frame"), sample.get("out_time_s")
+        advanced = ((frame is not None and (_state["last_frame"] is None or frame > _state["last_frame"]))
+                    or (out_time is not None and (_state["last_out_time"] is None or out_time > _state["last_out_time"])))
+        if advanced:
+            _state["last_advance"] = time.monotonic()
+        if frame is not None:
+            _state["last_frame"] = frame
+        if out_time is not None:
+            _state["last_out_time"] = out_time
+
+
+def latest_sample():
+    with _lock:
+        return dict(PROGRESS_SERIES[-1]) if PROGRESS_SERIES else None
+
+
+def recent_samples(seconds):
+    cutoff = time.time() - seconds
+    with _lock:
+        return [dict(s) for s in PROGRESS_SERIES if s["ts"] >= cutoff]
+
+
+def rolling_average(field, seconds=60):
+    """Rata-rata nilai field selama 'seconds' terakhir (None jika tidak ada data)."""
+    values = [s[field] for s in recent_samples(seconds) if s.get(field) is not None]
+    return sum(values) / len(values) if values else None
+
+
+def set_ffmpeg_running(running):
+    with _lock:
+        _state["ffmpeg_up"] = 1 if running else 0
+        if running:
+            _state["ffmpeg_starts"] += 1
+            # Proses baru mulai dari frame 0; jam progres dihitung dari saat proses dijalankan.
+            _state["last_advance"] = time.monotonic()
+            _state["last_frame"] = None
+            _state["last_out_time"] = None
+
+
+def seconds_since_advance():
+    """Detik sejak frame/out_time terakhir bertambah (None jika ffmpeg belum pernah dijalankan)."""
+    with _lock:
+        last_advance = _state["last_advance"]
+    return time.monotonic() - last_advance if last_advance is not None else None
+
+
+def record_stall_restart():
+    with _lock:
+        _state["stall_restarts"] += 1
+
+
+def render_prometheus():
+    """Metrik terkini dalam format teks Prometheus."""
+    sample = latest_sample() or {}
+    with _lock:
+        slot = _state["slot"]
+        up = _state["ffmpeg_up"]
+        starts = _state["ffmpeg_starts"]
+        stall_restarts = _state["stall_restarts"]
+    label = f'{{slot="{slot}"}}'
+    metrics = [
+        ("streamer_ffmpeg_up", "gauge", "1 jika proses ffmpeg sedang berjalan.", up),
+        ("streamer_ffmpeg_starts_total", "counter", "Jumlah proses ffmpeg yang dijalankan.", starts),
+        ("streamer_stall_restarts_total", "counter", "Jumlah restart ffmpeg oleh watchdog stall.", stall_restarts),
+        ("streamer_frames_total", "counter", "Frame yang sudah dikirim pada proses ffmpeg saat ini.", sample.get("frame")),
+        ("streamer_fps", "gauge", "FPS output saat ini.", sample.get("fps")),
+        ("streamer_bitrate_kbps", "gauge", "Bitrate output saat ini (kbps).", sample.get("bitrate_kbps")),
+        ("streamer_bitrate_kbps_avg_60s", "gauge", "Rata-rata bitrate output 60 detik terakhir (kbps).", rolling_average("bitrate_kbps")),
+        ("streamer_speed", "gauge", "Kecepatan encode relatif terhadap realtime.", sample.get("speed")),
+        ("streamer_speed_avg_60s", "gauge", "Rata-rata kecepatan 60 detik terakhir.", rolling_average("speed")),
+        ("streamer_drop_frames_total", "counter", "Frame yang dibuang ffmpeg.", sample.get("drop_frames")),
+        ("streamer_dup_frames_total", "counter", "Frame yang diduplikasi ffmpeg.", sample.get("dup_frames")),
+        ("streamer_out_time_seconds", "gauge", "Posisi waktu output ffmpeg (detik).", sample.get("out_time_s")),
+        ("streamer_last_progress_timestamp_seconds", "gauge", "Waktu sampel progres terakhir (unix).", sample.get("ts")),
+    ]
+    lines = []
+    for name, metric_type, help_text, value in metrics:
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name}{label} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Jangan campur log akses HTTP dengan output streamer.
+
+
+def start_metrics_server(port, slot, host="127.0.0.1"):
+    """
+    Menjalankan endpoint metrik di host:port (thread daemon). Jika port sudah dipakai
+    (misal oleh slot lain), port acak dipakai. Mengembalikan port yang aktif, atau None jika gagal.
+    """
+    with _lock:
+        _state["slot"] = slot
+    for candidate in (port, 0):
+        try:
+            server = ThreadingHTTPServer((host, candidate), _MetricsHandler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server.server_address[1]
+    return None
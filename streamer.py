@@ -2,68 +2,265 @@ import os
 import subprocess
 import sys
 import platform
+import shutil
 import json
+import re
+import argparse
+import signal
+import hashlib
+import time
+import random
+import threading
+from collections import deque
 from datetime import datetime
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from media_probe import probe_media, is_video_copy_ok, is_audio_copy_ok
+import stream_metrics
+import stream_config
+import ffmpeg_failures
+import ffmpeg_log
+import stream_fanout
+import ingest_failover
+import bitrate_autotune
+import preset_benchmark
+import video_normalize
+
 # --- KONFIGURASI ---
 CONFIG_FILE = "config.json"
-DEFAULT_CONFIG = {
-    "STREAM_URL": "rtmp://a.rtmp.youtube.com/live2", # Diperbarui ke yang lebih standar
-    "VIDEO_EXTENSIONS": [".mp4", ".mkv", ".avi", ".mov", ".flv", ".webm"],
-    "KEY_FILENAME": "keystream.txt",
-    "RETRY_LIMIT": 5,
-    "LOG_FILE": "ffmpeg_log.txt",
-    "TIMEZONE": "Asia/Makassar",
-    "FFMPEG_PRESET": "veryfast",
-    "VIDEO_BITRATE_KBPS": 2500,
-    "AUDIO_BITRATE_KBPS": 128
-}
+DEFAULT_CONFIG = stream_config.DEFAULT_CONFIG
 CONFIG = {}
 
+# --- SLOT STREAMING ---
+# Slot "default" memakai file di folder streamer (kompatibel dengan setup lama).
+# Slot lain memakai folder sendiri di SLOTS_DIR/<slot> untuk video, kunci, dan log,
+# serta profil (override konfigurasi) dari CONFIG["SLOTS"][<slot>].
+DEFAULT_SLOT = "default"
+SLOTS_DIR = "slots"
+SLOT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+CURRENT_SLOT = DEFAULT_SLOT
+CURRENT_PROFILE = None
+
+# --- PERUBAHAN KONFIGURASI SAAT SIARAN ---
+# config.json dipantau selama siaran. Kunci di stream_config.LIVE_KEYS (kebijakan retry, watchdog)
+# langsung berlaku; perubahan stream_config.ENCODE_KEYS (preset/bitrate) memicu restart FFmpeg
+# yang dilanjutkan dari posisi terakhir, tetapi hanya jika siaran sedang meng-encode.
+CONFIG_RESTART = threading.Event()
+ENCODING_ACTIVE = False
+# Di-set oleh ingest_failover.watch_primary saat ingest utama pulih selama siaran memakai ingest cadangan.
+INGEST_RETURN = threading.Event()
+# Autotune bitrate (lihat bitrate_autotune): BITRATE_TUNER berisi tangga dan anak tangga aktif selama
+# video di-encode; BITRATE_RESTART di-set saat anak tangga berubah agar FFmpeg di-restart.
+BITRATE_TUNER = None
+BITRATE_RESTART = threading.Event()
+# Profil preset hasil benchmark (lihat preset_benchmark) untuk video yang sedang disiarkan, atau None.
+PRESET_PROFILE = None
+
+# --- EVENT TERSTRUKTUR ---
+# Selain teks untuk manusia, streamer menulis event JSON satu baris ke stdout
+# (misal {"event": "state", "state": "streaming", ...}) yang dibaca oleh bot.
+# Event dikirim dari beberapa thread (progres, relay, autotune), jadi satu baris ditulis dengan satu
+# write di bawah _emit_lock agar dua event tidak saling menyisip di tengah baris.
+_emit_lock = threading.Lock()
+
+def emit_event(event_type, **data):
+    event = {"event": event_type, "ts": round(time.time(), 3), "slot": CURRENT_SLOT}
+    event.update(data)
+    line = json.dumps(event, ensure_ascii=False)
+    with _emit_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+class PipeSafeStdout:
+    """
+    Pembungkus sys.stdout. Jika bot yang membaca pipe stdout hilang (misal bot di-restart lalu
+    mengadopsi proses ini), output berikutnya dibuang ke /dev/null alih-alih memunculkan
+    BrokenPipeError yang menghentikan siaran. Event tetap tercatat di status slot milik bot.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self.detached = False
+
+    def _detach(self):
+        self.detached = True
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(devnull, self._stream.fileno())
+        finally:
+            os.close(devnull)
+
+    def write(self, text):
+        try:
+            return self._stream.write(text)
+        except BrokenPipeError:
+            self._detach()
+            return len(text)
+
+    def flush(self):
+        try:
+            self._stream.flush()
+        except BrokenPipeError:
+            self._detach()
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def guard_stdout():
+    if not isinstance(sys.stdout, PipeSafeStdout):
+        sys.stdout = PipeSafeStdout(sys.stdout)
+
+def get_slot_dir(slot_id):
+    """Mengembalikan folder kerja untuk slot tertentu."""
+    if slot_id == DEFAULT_SLOT:
+        return "."
+    return os.path.join(SLOTS_DIR, slot_id)
+
+def get_profile_overrides(config, slot_id, profile_name=None):
+    """Override konfigurasi dari config["SLOTS"][profile_name] (default: nama slot)."""
+    profile = config.get("SLOTS", {}).get(profile_name or slot_id, {})
+    return {key: value for key, value in profile.items() if key != "SLOTS"}
+
+def apply_slot_profile(slot_id, profile_name=None):
+    """
+    Menerapkan profil (override dari CONFIG["SLOTS"][profile_name], default: nama slot) ke CONFIG
+    dan mengarahkan file kunci/log ke folder slot.
+    """
+    global CURRENT_PROFILE
+    CURRENT_PROFILE = profile_name
+    profile = get_profile_overrides(CONFIG, slot_id, profile_name)
+    CONFIG.update(profile)
+    slot_dir = get_slot_dir(slot_id)
+    if slot_dir != ".":
+        os.makedirs(slot_dir, exist_ok=True)
+        CONFIG["KEY_FILENAME"] = os.path.join(slot_dir, os.path.basename(CONFIG["KEY_FILENAME"]))
+        CONFIG["LOG_FILE"] = os.path.join(slot_dir, os.path.basename(CONFIG["LOG_FILE"]))
+    if profile:
+        print(f"[INFO] Profil '{profile_name or slot_id}' diterapkan: {', '.join(profile.keys())}")
+
 def load_config():
-    """Memuat konfigurasi dari config.json atau membuat file default jika tidak ada."""
+    """Memuat konfigurasi tervalidasi dari config.json (lewat stream_config) atau membuat file default jika tidak ada."""
     global CONFIG
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            CONFIG = json.load(f)
-        for key, default_value in DEFAULT_CONFIG.items():
-            if key not in CONFIG:
-                CONFIG[key] = default_value
-        print(f"[INFO] Konfigurasi dimuat dari '{CONFIG_FILE}'.")
-    except FileNotFoundError:
-        print(f"[INFO] File '{CONFIG_FILE}' tidak ditemukan. Membuat file konfigurasi default...")
-        CONFIG = DEFAULT_CONFIG
-        save_config()
-    except json.JSONDecodeError:
-        print(f"[ERROR] Kesalahan format JSON di '{CONFIG_FILE}'. Menggunakan konfigurasi default.")
-        CONFIG = DEFAULT_CONFIG
-        print(f"       Harap periksa atau hapus '{CONFIG_FILE}' jika Anda ingin menggunakan konfigurasi baru.")
-
-    if not CONFIG["STREAM_URL"].startswith("rtmp://"):
-        print("[WARNING] STREAM_URL mungkin tidak valid. Pastikan dimulai dengan 'rtmp://'.")
-    CONFIG["STREAM_URL"] = CONFIG["STREAM_URL"].strip('/')
+    CONFIG = stream_config.load_config(CONFIG_FILE, create_missing=True)
+    print(f"[INFO] Konfigurasi dimuat dari '{CONFIG_FILE}'.")
 
 def save_config():
     """Menyimpan konfigurasi saat ini ke config.json."""
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(CONFIG, f, indent=4)
-        print(f"[INFO] Konfigurasi disimpan ke '{CONFIG_FILE}'.")
-    except IOError as e:
-        print(f"[ERROR] Gagal menyimpan konfigurasi ke '{CONFIG_FILE}': {e}")
+    stream_config.save_config(CONFIG, CONFIG_FILE)
+    print(f"[INFO] Konfigurasi disimpan ke '{CONFIG_FILE}'.")
+
+def on_config_change(old_config, new_config):
+    """Menerapkan perubahan config.json yang aman ke siaran yang sedang berjalan (dipanggil dari thread pemantau)."""
+    effective = dict(new_config)
+    effective.update(get_profile_overrides(new_config, CURRENT_SLOT, CURRENT_PROFILE))
+    applied = [key for key in stream_config.LIVE_KEYS if CONFIG.get(key) != effective[key]]
+    encode_changed = [key for key in stream_config.ENCODE_KEYS if CONFIG.get(key) != effective[key]]
+    for key in applied + encode_changed:
+        CONFIG[key] = effective[key]
+    pending = [key for key in stream_config.changed_keys(old_config, new_config)
+               if key not in stream_config.LIVE_KEYS + stream_config.ENCODE_KEYS and key != "SLOTS"]
+    restart = bool(encode_changed) and ENCODING_ACTIVE
+    if not (applied or encode_changed or pending):
+        return
+    print(f"\n[ INFO ] config.json berubah. Diterapkan: {', '.join(applied + encode_changed) or '-'}"
+          f"{'; FFmpeg di-restart dengan pengaturan encode baru' if restart else ''}"
+          f"{'; berlaku pada siaran berikutnya: ' + ', '.join(pending) if pending else ''}")
+    emit_event("config_reload", applied=applied + encode_changed, pending=pending, restart=restart)
+    if restart:
+        CONFIG_RESTART.set()
+
+def on_bitrate_change(kbps, reason, speed):
+    """Dipanggil thread autotune saat anak tangga bitrate berubah; FFmpeg di-restart dengan bitrate baru."""
+    if not ENCODING_ACTIVE:
+        return
+    action = "diturunkan" if reason == "slow" else "dinaikkan kembali"
+    print(f"\n[ INFO ] Kecepatan siaran {speed:.2f}x. Bitrate video {action} ke {kbps} kbps; FFmpeg di-restart.")
+    emit_event("bitrate", kbps=kbps, reason=reason, speed=round(speed, 3))
+    BITRATE_RESTART.set()
+
+def video_bitrate_kbps():
+    """Bitrate video yang dipakai encoder: anak tangga autotune jika aktif, jika tidak VIDEO_BITRATE_KBPS."""
+    return bitrate_autotune.current_kbps(BITRATE_TUNER) if BITRATE_TUNER else CONFIG['VIDEO_BITRATE_KBPS']
+
+def encoder_preset():
+    """(preset, threads) libx264: profil benchmark jika ada dan PRESET_AUTOTUNE aktif, jika tidak FFMPEG_PRESET."""
+    if PRESET_PROFILE and CONFIG.get('PRESET_AUTOTUNE'):
+        return PRESET_PROFILE["preset"], PRESET_PROFILE["threads"]
+    return CONFIG['FFMPEG_PRESET'], None
+
+def restart_requested():
+    """True jika FFmpeg yang sedang berjalan perlu di-restart dengan pengaturan/tujuan baru."""
+    return CONFIG_RESTART.is_set() or INGEST_RETURN.is_set() or BITRATE_RESTART.is_set()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="YouTube streamer berbasis FFmpeg.")
+    parser.add_argument("--slot", default=DEFAULT_SLOT,
+                        help="Nama slot streaming (default: 'default').")
+    parser.add_argument("--input",
+                        help="Path file video yang disiarkan. Tanpa opsi ini, satu file video dicari di folder slot.")
+    key_source = parser.add_mutually_exclusive_group()
+    key_source.add_argument("--key-file",
+                            help="File berisi kunci streaming (default: KEY_FILENAME di folder slot).")
+    key_source.add_argument("--key-env", metavar="VAR",
+                            help="Nama environment variable yang berisi kunci streaming.")
+    parser.add_argument("--profile",
+                        help="Nama profil di CONFIG['SLOTS'] yang diterapkan (default: nama slot).")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Benchmark preset libx264 pada video input lalu simpan preset terbaik untuk host ini.")
+    return parser.parse_args(argv)
 
 def main():
+    args = parse_args()
+    if not SLOT_ID_PATTERN.fullmatch(args.slot):
+        print(f"[ERROR] Nama slot '{args.slot}' tidak valid. Gunakan huruf, angka, '_' atau '-' (maks. 32 karakter).")
+        return
+    global CURRENT_SLOT
+    CURRENT_SLOT = args.slot
+    guard_stdout()
+    install_signal_handlers()
     clear_screen()
     load_config()
+    apply_slot_profile(args.slot, args.profile)
+    emit_event("state", state="starting")
 
-    video_file = find_video_file(silent=True)
+    if args.input:
+        video_file = args.input if os.path.isfile(args.input) else None
+    else:
+        # Dijalankan manual tanpa --input: cari satu file video di folder slot (perilaku lama).
+        video_file = find_video_file(silent=True, directory=get_slot_dir(args.slot))
 
     if not video_file:
-        print("[ERROR] Video tidak ditemukan di folder ini. Pastikan ada satu file video didalam folder.")
+        print("[ERROR] Video tidak ditemukan. Berikan --input atau pastikan ada satu file video di dalam folder slot.")
+        emit_event("state", state="error", reason="video_not_found")
         # Tidak memanggil pause_and_exit() karena ini adalah subprocess
         return # Keluar dari main()
 
+    if args.benchmark:
+        run_preset_benchmark(video_file)
+        return
+
+    key_source = f"environment variable '{args.key_env}'" if args.key_env else f"file '{args.key_file or CONFIG['KEY_FILENAME']}'"
+    print(f"2. Membaca Kunci Streaming dari {key_source}...")
+    stream_key = read_stream_key(key_file=args.key_file, key_env=args.key_env)
+    if not stream_key:
+        emit_event("state", state="error", reason="stream_key_missing")
+        return # Keluar dari main()
+
+    run_stream(video_file, stream_key)
+
+def run_stream(video_file, stream_key, slot_id=None, profile=None):
+    """
+    Menyiarkan video_file ke STREAM_URL dengan stream_key sampai selesai, gagal permanen, atau dihentikan.
+    Bisa dipanggil langsung dari Python dengan input dan kunci eksplisit; jika CONFIG belum dimuat,
+    config.json dimuat dan profil slot diterapkan terlebih dahulu.
+    """
+    global CURRENT_SLOT, ENCODING_ACTIVE, BITRATE_TUNER, PRESET_PROFILE
+    if slot_id:
+        CURRENT_SLOT = slot_id
+    if not CONFIG:
+        load_config()
+        apply_slot_profile(CURRENT_SLOT, profile)
+
     video_name = os.path.splitext(os.path.basename(video_file))[0]
     if platform.system() == "Windows":
         os.system(f"title Streaming: {video_name}")
@@ -77,81 +274,671 @@ def main():
     print(f"1. Video ditemukan: {video_file}\n")
 
     if not check_ffmpeg_installed():
-        return # Keluar dari main()
+        emit_event("state", state="error", reason="ffmpeg_not_found")
+        return
 
-    print(f"2. Membaca Kunci Streaming dari file '{CONFIG['KEY_FILENAME']}'...")
-    stream_key = read_stream_key()
-    if not stream_key:
-        return # Keluar dari main()
+    destinations = resolve_destinations(stream_key)
+    log = ffmpeg_log.open_rotating_log(CONFIG['LOG_FILE'], CONFIG['LOG_MAX_BYTES'], CONFIG['LOG_BACKUP_COUNT'],
+                                       CONFIG['LOG_COMPRESS'])
+    fanout = None
+    if len(destinations) > 1:
+        # Encode sekali, lalu setiap tujuan didorong oleh relay sendiri (lihat stream_fanout).
+        fanout = stream_fanout.start_relays(destinations, log, emit_event)
+        destination = fanout["outputs"]
+    else:
+        destination = destinations[0]["url"]
+    # Tanpa fan-out, failover ingest dilakukan di loop ini; dengan fan-out, di relay tujuan "utama".
+    ingest = None if fanout else destinations[0].get("ingest")
 
-    destination_url = f"{CONFIG['STREAM_URL']}/{stream_key}"
+    media_info = probe_media(video_file) or {}
+    video_codec, audio_codec = media_info.get("video_codec"), media_info.get("audio_codec")
+    stream_mode = decide_stream_mode(media_info)
 
-    video_codec, audio_codec = get_media_info(video_file)
+    PRESET_PROFILE = None
+    if CONFIG.get('PRESET_AUTOTUNE') and stream_mode["video"] == "encode":
+        PRESET_PROFILE = preset_benchmark.lookup_profile(media_info.get("width"), media_info.get("height"),
+                                                         media_info.get("fps"))
 
-    if video_codec == 'h264' and audio_codec == 'aac':
-        print("3. Mode: COPY STREAM (tanpa re-encode) ✅\n")
-        command = [
-            'ffmpeg', '-re', '-stream_loop', '-1', '-i', video_file,
-            '-c:v', 'copy', '-c:a', 'copy',
-            '-f', 'flv', destination_url
-        ]
+    BITRATE_TUNER = None
+    if CONFIG.get('BITRATE_AUTOTUNE') and stream_mode["video"] == "encode" and fanout:
+        # Encoder hanya menulis ke relay UDP lokal, jadi tidak pernah merasakan backpressure RTMP;
+        # keputusan autotune tanpa sinyal itu tidak bermakna.
+        print("[WARNING] BITRATE_AUTOTUNE dinonaktifkan karena fan-out aktif (lebih dari satu tujuan). "
+              f"Bitrate video tetap {CONFIG['VIDEO_BITRATE_KBPS']} kbps.")
+        emit_event("bitrate", kbps=CONFIG['VIDEO_BITRATE_KBPS'], reason="autotune_disabled_fanout")
+    elif CONFIG.get('BITRATE_AUTOTUNE') and stream_mode["video"] == "encode":
+        measured_kbps = None
+        if CONFIG.get('BANDWIDTH_PROBE_TARGET'):
+            print(f"[INFO] Mengukur uplink ke '{CONFIG['BANDWIDTH_PROBE_TARGET']}' selama {CONFIG['BANDWIDTH_PROBE_SEC']} detik...")
+            measured_kbps = bitrate_autotune.probe_uplink(CONFIG['BANDWIDTH_PROBE_TARGET'], CONFIG['BANDWIDTH_PROBE_SEC'])
+            if measured_kbps is None:
+                print("[WARNING] Pengukuran uplink gagal. Dimulai dari VIDEO_BITRATE_KBPS.")
+        BITRATE_TUNER = bitrate_autotune.new_tuner(CONFIG['BITRATE_LADDER_KBPS'], CONFIG['VIDEO_BITRATE_KBPS'],
+                                                   measured_kbps, CONFIG['AUDIO_BITRATE_KBPS'])
+        if measured_kbps is not None:
+            print(f"[INFO] Uplink terukur {measured_kbps:.0f} kbps. Bitrate video awal: {video_bitrate_kbps()} kbps.")
+        emit_event("bitrate", kbps=video_bitrate_kbps(), reason="probe" if measured_kbps is not None else "initial",
+                   measured_kbps=round(measured_kbps) if measured_kbps is not None else None)
+
+    # Cache hasil encode: jika video file ini sudah pernah di-encode penuh, loop cache-nya dengan COPY.
+    encode_cache_file = None
+    encode_cache_pending = None
+    if CONFIG.get('ENCODE_CACHE') and stream_mode["video"] == "encode":
+        encode_cache_file = find_encode_cache(video_file)
+
+    if encode_cache_file:
+        mode_label = "COPY STREAM dari cache encode (tanpa re-encode) ✅"
+        print(f"3. Mode: {mode_label}")
+        print(f"   Cache: {encode_cache_file}\n")
+        command = build_copy_loop_command(encode_cache_file, destination)
     else:
-        print(f"3. Mode: RE-ENCODE (video: {video_codec if video_codec else 'Tidak Ditemukan'}, audio: {audio_codec if audio_codec else 'Tidak Ditemukan'}) ⚠️")
-        print("   FFmpeg akan melakukan re-encode ke H.264 (video) dan AAC (audio).")
-        print(f"   Preset: {CONFIG['FFMPEG_PRESET']}, Video Bitrate: {CONFIG['VIDEO_BITRATE_KBPS']}kbps, Audio Bitrate: {CONFIG['AUDIO_BITRATE_KBPS']}kbps\n")
-        command = [
-            'ffmpeg', '-re', '-stream_loop', '-1', '-i', video_file,
-            '-c:v', 'libx264', '-preset', CONFIG['FFMPEG_PRESET'],
-            '-b:v', f"{CONFIG['VIDEO_BITRATE_KBPS']}k",
-            '-maxrate', f"{CONFIG['VIDEO_BITRATE_KBPS']}k",
-            '-bufsize', f"{CONFIG['VIDEO_BITRATE_KBPS'] * 2}k",
-            '-g', '120', '-keyint_min', '120',
-            '-pix_fmt', 'yuv420p',
-            '-c:a', 'aac', '-b:a', f"{CONFIG['AUDIO_BITRATE_KBPS']}k",
-            '-f', 'flv', destination_url
-        ]
+        mode_label = stream_mode["label"]
+        print(f"3. Mode: {mode_label} (video: {video_codec if video_codec else 'Tidak Ditemukan'}, audio: {audio_codec if audio_codec else 'Tidak Ditemukan'})")
+        if stream_mode["video"] == "encode":
+            preset, threads = encoder_preset()
+            print(f"   Video di-encode ke H.264. Preset: {preset}"
+                  f"{f' ({threads} thread, hasil benchmark)' if PRESET_PROFILE else ''}, Video Bitrate: {video_bitrate_kbps()}kbps"
+                  f"{' (autotune)' if BITRATE_TUNER else ''}")
+            video_filter, out_fps = build_video_filter(stream_mode, video_bitrate_kbps())
+            if video_filter:
+                print(f"   Filter video: {video_filter} (sumber {stream_mode['width']}x{stream_mode['height']}"
+                      f"@{stream_mode['fps']}, {video_normalize.describe_keyframes(out_fps, CONFIG.get('VIDEO_FILTER'))})")
+        if stream_mode["audio"] == "encode":
+            print(f"   Audio di-encode ke AAC. Audio Bitrate: {CONFIG['AUDIO_BITRATE_KBPS']}kbps")
+        print()
+        command = build_stream_command(video_file, destination, stream_mode)
+        if CONFIG.get('ENCODE_CACHE') and stream_mode["video"] == "encode":
+            # Putaran pertama di-encode sekali, dikirim ke RTMP sekaligus ditulis ke cache.
+            # Setelah selesai, putaran berikutnya cukup COPY dari file cache.
+            encode_cache_pending = get_encode_cache_path(video_file)
+            command = build_encode_cache_pass_command(command, encode_cache_pending, destination)
+            print(f"   Cache encode aktif: putaran pertama juga ditulis ke '{encode_cache_pending}'.\n"
+                  "   Setelah putaran pertama, siaran beralih ke COPY dari cache dengan koneksi RTMP baru"
+                  " (penonton melihat sambung ulang sekali).\n")
+
+    emit_event("mode", mode=mode_label, video=stream_mode["video"], audio=stream_mode["audio"],
+               video_codec=video_codec, audio_codec=audio_codec, cached=bool(encode_cache_file),
+               input=os.path.basename(video_file))
+    ENCODING_ACTIVE = not encode_cache_file and "encode" in (stream_mode["video"], stream_mode["audio"])
+    emit_event("destinations", names=[d["name"] for d in destinations], fanout=bool(fanout))
+    stop_config_watch = stream_config.watch_config(CONFIG_FILE, on_config_change)
+    log.info(f"--- Mode Streaming: {mode_label} | video={video_codec} audio={audio_codec} container={media_info.get('format_name')} ---")
 
     print("-----------------------------------------")
     print("   SIARAN AKAN SEGERA DIMULAI...")
-    print(f"   > Tujuan: {destination_url}")
+    for d in destinations:
+        print(f"   > Tujuan{' [' + d['name'] + ']' if fanout else ''}: {d['url']}")
+        if d.get("ingest"):
+            print(f"     (+{len(d['ingest']['endpoints']) - 1} ingest cadangan)")
     print("   > Tekan CTRL+C di jendela ini untuk menghentikan siaran.")
     print(f"   > Output FFmpeg akan dicatat di '{CONFIG['LOG_FILE']}'.")
     print("-----------------------------------------")
 
+    if CONFIG.get('METRICS_ENABLED'):
+        metrics_port = stream_metrics.start_metrics_server(int(CONFIG['METRICS_PORT']), CURRENT_SLOT)
+        if metrics_port:
+            print(f"[INFO] Metrik Prometheus tersedia di http://127.0.0.1:{metrics_port}/metrics")
+            emit_event("metrics", port=metrics_port)
+        else:
+            print("[WARNING] Gagal menjalankan endpoint metrik.")
+
+    stop_ingest_watch = ingest_failover.watch_primary(ingest, INGEST_RETURN) if ingest else None
+    stop_bitrate_monitor = bitrate_autotune.start_monitor(BITRATE_TUNER, on_bitrate_change) if BITRATE_TUNER and ENCODING_ACTIVE else None
     retry_count = 0
+    retry_delay = 0
+    failure_counts = {} # kategori kegagalan -> jumlah kejadian sejak jatah retry terakhir direset
+    # Posisi (detik) di dalam file tempat percobaan berikutnya dimulai, agar penonton tidak melihat ulang dari awal.
+    resume_position = 0.0
+    loop_duration = media_info.get("duration")
     while retry_count < CONFIG['RETRY_LIMIT']:
         try:
-            with open(CONFIG['LOG_FILE'], "a", encoding="utf-8") as log_file: # Ubah "w" ke "a" untuk append
-                log_file.write(f"\n--- Memulai Siaran ({datetime.now(ZoneInfo(CONFIG['TIMEZONE'])).strftime('%Y-%m-%d %H:%M:%S')}) ---\n")
-                process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
-                process.wait()
+            if retry_delay:
+                print(f"[ INFO ] Menunggu {retry_delay:.1f} detik sebelum mencoba lagi...")
+                time.sleep(retry_delay)
+                retry_delay = 0
+            if ingest:
+                switched = ingest_failover.ensure_reachable(ingest, emit_event)
+                if switched:
+                    print(f"\n[ WARNING ] Ingest tidak bisa dihubungi. Beralih ke ingest {switched['label']}.")
+                    command = retarget_command(command, destination, switched["url"])
+                    destination = switched["url"]
+            attempt_command = add_input_seek(command, resume_position) if resume_position else command
+            attempt_started = time.time()
+            log.info(f"--- Memulai Siaran ({datetime.now(ZoneInfo(CONFIG['TIMEZONE'])).strftime('%Y-%m-%d %H:%M:%S')}) ---")
+            if resume_position:
+                log.info(f"--- Melanjutkan dari posisi {resume_position:.1f} detik ---")
+            # stdout FFmpeg berisi progres (-progress pipe:1); stderr dipompa ke log bergulir,
+            # dan baris terakhirnya disimpan untuk klasifikasi kegagalan.
+            stderr_tail = deque(maxlen=FAILURE_TAIL_LINES)
+            process = subprocess.Popen(add_progress_output(attempt_command), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stream_metrics.set_ffmpeg_running(True)
+            if BITRATE_TUNER:
+                bitrate_autotune.note_restart(BITRATE_TUNER)
+            progress_thread = start_progress_reader(process)
+            stderr_thread = ffmpeg_log.start_stderr_pump(process.stderr, log, stderr_tail)
+            emit_event("state", state="streaming", pid=process.pid, attempt=retry_count + 1)
+            stalled_for = wait_with_stall_watchdog(process)
+            progress_thread.join(timeout=2)
+            stderr_thread.join(timeout=2)
+            stream_metrics.set_ffmpeg_running(False)
+            if restart_requested() and stalled_for is None:
+                sample = stream_metrics.latest_sample() or {}
+                streamed = (sample.get("out_time_s") or 0) if sample.get("ts", 0) >= attempt_started else 0
+                emit_event("ffmpeg_exit", code=process.returncode,
+                           reason="config_reload" if CONFIG_RESTART.is_set()
+                           else "ingest_return" if INGEST_RETURN.is_set() else "bitrate_autotune")
+                if INGEST_RETURN.is_set():
+                    INGEST_RETURN.clear()
+                    primary = ingest_failover.return_to_primary(ingest, emit_event)
+                    if primary:
+                        print("\n[ INFO ] Ingest utama pulih. Siaran dipindahkan kembali ke ingest utama.")
+                        log.info("--- Ingest utama pulih, FFmpeg di-restart ke ingest utama ---")
+                        command = retarget_command(command, destination, primary["url"])
+                        destination = primary["url"]
+                if BITRATE_RESTART.is_set():
+                    BITRATE_RESTART.clear()
+                    log.info(f"--- Autotune: bitrate video menjadi {video_bitrate_kbps()} kbps, FFmpeg di-restart ---")
+                    if encode_cache_pending:
+                        # Cache pada bitrate darurat tidak layak dipakai ulang; lanjutkan siaran tanpa menulis cache.
+                        discard_encode_cache(encode_cache_pending)
+                        encode_cache_pending = None
+                    command = build_stream_command(video_file, destination, stream_mode)
+                if CONFIG_RESTART.is_set():
+                    CONFIG_RESTART.clear()
+                    log.info("--- Pengaturan encode berubah, FFmpeg di-restart ---")
+                    if BITRATE_TUNER:
+                        bitrate_autotune.set_ceiling(BITRATE_TUNER, CONFIG['VIDEO_BITRATE_KBPS'], CONFIG['BITRATE_LADDER_KBPS'])
+                    command = build_stream_command(video_file, destination, stream_mode)
+                    if encode_cache_pending:
+                        command = build_encode_cache_pass_command(command, encode_cache_pending, destination)
+                if encode_cache_pending:
+                    # Cache encode harus satu putaran utuh dengan pengaturan yang sama; mulai ulang dari awal.
+                    discard_encode_cache(encode_cache_pending)
+                    resume_position = 0.0
+                else:
+                    resume_position = next_resume_position(resume_position, streamed, loop_duration)
+                continue
+            if stalled_for is not None:
+                log.info(f"--- Watchdog: tidak ada progres selama {stalled_for:.0f} detik, FFmpeg di-restart ---")
+            emit_event("ffmpeg_exit", code=process.returncode)
 
+            if stalled_for is not None:
+                raise StreamStalled(stalled_for)
             if process.returncode != 0:
                 raise subprocess.CalledProcessError(process.returncode, command)
+            if encode_cache_pending:
+                cache_file = finalize_encode_cache(video_file, encode_cache_pending)
+                encode_cache_pending = None
+                if cache_file:
+                    # Bukan peralihan mulus: FFmpeg baru membuka koneksi RTMP baru, penonton bisa melihat jeda singkat.
+                    print("\n[ INFO ] Putaran pertama selesai. Beralih ke COPY STREAM dari cache encode;"
+                          " koneksi RTMP disambung ulang (jeda singkat di sisi penonton).")
+                    emit_event("mode", mode="COPY STREAM dari cache encode (tanpa re-encode) ✅", video="copy",
+                               audio="copy", video_codec="h264", audio_codec="aac", cached=True,
+                               input=os.path.basename(video_file), handover="rtmp_reconnect")
+                    command = build_copy_loop_command(cache_file, destination)
+                    ENCODING_ACTIVE = False
+                    if stop_bitrate_monitor:
+                        stop_bitrate_monitor.set()
+                    resume_position = 0.0
+                    continue
+            emit_event("state", state="finished")
             break
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, StreamStalled) as e:
+            sample = stream_metrics.latest_sample() or {}
+            streamed = (sample.get("out_time_s") or 0) if sample.get("ts", 0) >= attempt_started else 0
+            if CONFIG['RETRY_RESET_AFTER_SEC'] and streamed >= CONFIG['RETRY_RESET_AFTER_SEC'] and retry_count:
+                # Percobaan ini sempat stabil cukup lama; jatah percobaan ulang diisi kembali.
+                print(f"\n[ INFO ] Siaran stabil selama {streamed:.0f} detik sebelum gagal. Jatah percobaan ulang direset.")
+                retry_count = 0
+                failure_counts = {}
+            if isinstance(e, StreamStalled):
+                category, detail = "stall", str(e)
+            else:
+                category, detail = ffmpeg_failures.classify_failure("\n".join(stderr_tail), command[command.index('-i') + 1])
+            failure_counts[category] = failure_counts.get(category, 0) + 1
+            policy = ffmpeg_failures.get_policy(category)
+            description = ffmpeg_failures.describe_failure(category)
+            retryable = policy["max_retries"] is None or failure_counts[category] <= policy["max_retries"]
+            emit_event("failure", category=category, detail=detail, exit_code=process.returncode,
+                       count=failure_counts[category], retryable=retryable)
+            print(f"\n[ WARNING ] Penyebab kegagalan: {description} [{category}]")
+            if detail:
+                print(f"            {detail}")
+            if not retryable:
+                print("\n[ FATAL ] Kegagalan ini tidak akan pulih dengan mencoba ulang. Proses dibatalkan.")
+                if encode_cache_pending:
+                    discard_encode_cache(encode_cache_pending)
+                emit_event("state", state="failed", reason=category, exit_code=process.returncode)
+                break
+            if encode_cache_pending:
+                # Putaran pertama cache encode harus lengkap dari awal file, jadi tidak dilanjutkan dari tengah.
+                discard_encode_cache(encode_cache_pending)
+                resume_position = 0.0
+            elif CONFIG.get('RESUME_ON_RETRY'):
+                resume_position = next_resume_position(resume_position, streamed, loop_duration)
+            if ingest and ingest_failover.is_connect_failure(category, streamed):
+                previous = ingest_failover.active(ingest)
+                switched = ingest_failover.record_failure(ingest, emit_event)
+                if switched:
+                    endpoint, free = switched
+                    print(f"\n[ WARNING ] Ingest {previous['label']} gagal tersambung {previous['failures']}x berturut-turut. "
+                          f"Beralih ke ingest {endpoint['label']}.")
+                    command = retarget_command(command, destination, endpoint["url"])
+                    destination = endpoint["url"]
+                    if free:
+                        # Ingest tujuan belum bermasalah: coba segera tanpa memakai jatah percobaan ulang.
+                        retry_delay = ingest_failover.SWITCH_DELAY_SEC
+                        continue
+            elif ingest:
+                ingest_failover.record_success(ingest)
             retry_count += 1
-            print(f"\n[ WARNING ] FFmpeg gagal dijalankan (percobaan {retry_count}/{CONFIG['RETRY_LIMIT']}). Kode keluar: {e.returncode}")
+            retry_delay = max(compute_retry_delay(retry_count), policy["min_delay"])
+            if isinstance(e, StreamStalled):
+                print(f"\n[ WARNING ] FFmpeg macet: tidak ada progres selama {e.stalled_for:.0f} detik. Di-restart (percobaan {retry_count}/{CONFIG['RETRY_LIMIT']}).")
+            else:
+                print(f"\n[ WARNING ] FFmpeg gagal dijalankan (percobaan {retry_count}/{CONFIG['RETRY_LIMIT']}). Kode keluar: {e.returncode}")
             print(f"            Lihat '{CONFIG['LOG_FILE']}' untuk detail lebih lanjut.")
+            if retry_count < CONFIG['RETRY_LIMIT'] and resume_position:
+                print(f"            Percobaan berikutnya dilanjutkan dari posisi {resume_position:.1f} detik.")
+            emit_event("retry", attempt=retry_count, limit=CONFIG['RETRY_LIMIT'], exit_code=process.returncode, reason=category,
+                       delay=round(retry_delay, 1), resume_at=round(resume_position, 1))
             if retry_count >= CONFIG['RETRY_LIMIT']:
                 print("\n[ FATAL ] Gagal setelah beberapa kali percobaan. Proses dibatalkan.")
+                emit_event("state", state="failed", reason="retry_limit", category=category, exit_code=process.returncode)
                 break
         except KeyboardInterrupt:
-            print(f"\n\n[ INFO ] Siaran [{video_name}] dihentikan oleh pengguna.")
+            print(f"\n\n[ INFO ] Siaran [{video_name}] (slot: {CURRENT_SLOT}) dihentikan oleh pengguna.")
             if 'process' in locals() and process.poll() is None:
                 process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            if encode_cache_pending:
+                discard_encode_cache(encode_cache_pending)
+            emit_event("state", state="stopped")
             break
         except Exception as e:
             print(f"\n[ ERROR ] Terjadi kesalahan tak terduga: {e}")
+            emit_event("state", state="error", reason=str(e))
             break
 
+    stop_config_watch.set()
+    if stop_ingest_watch:
+        stop_ingest_watch.set()
+    if stop_bitrate_monitor:
+        stop_bitrate_monitor.set()
+    if fanout:
+        stream_fanout.stop_relays(fanout)
+    ENCODING_ACTIVE = False
     print(f"\nProses [{video_name}] selesai.")
     # Hapus atau beri komentar baris ini:
     # pause_and_exit(message="Tekan Enter untuk menutup jendela ini...")
 
+def run_preset_benchmark(video_file):
+    """Mode --benchmark: mengukur setiap preset/thread pada video_file dan menyimpan yang terbaik untuk host ini."""
+    if not check_ffmpeg_installed():
+        return
+    media_info = probe_media(video_file) or {}
+    width, height, fps = media_info.get("width"), media_info.get("height"), media_info.get("fps")
+    if not width or not height:
+        print(f"[ERROR] Resolusi video '{video_file}' tidak bisa dibaca. Benchmark dibatalkan.")
+        return
+    min_speed = CONFIG['BENCHMARK_MIN_SPEED']
+    print(f"[INFO] Benchmark preset libx264 untuk {preset_benchmark.resolution_key(width, height, fps)} "
+          f"di host {preset_benchmark.host_key()} (target minimal {min_speed}x realtime)...")
+
+    def on_result(result):
+        cpu = f"{result['cpu_percent']:.0f}%" if result["cpu_percent"] is not None else "-"
+        status = f"{result['speed']:.2f}x, CPU {cpu}" if result["ok"] else f"gagal: {result['error']}"
+        print(f"   {result['preset']:<10} {result['threads']:>3} thread : {status}")
+
+    # Benchmark memakai filter normalisasi yang sama dengan siaran, karena itulah yang di-encode.
+    video_filter, _ = build_video_filter(decide_stream_mode(media_info), CONFIG['VIDEO_BITRATE_KBPS'])
+    best, _ = preset_benchmark.run_benchmark(video_file, media_info, CONFIG['VIDEO_BITRATE_KBPS'], min_speed,
+                                             CONFIG['BENCHMARK_SAMPLE_SEC'], video_filter, on_result=on_result)
+    if not best:
+        print("[ERROR] Semua percobaan encode gagal. Lihat pesan di atas.")
+        return
+    if not preset_benchmark.record_profile(width, height, fps, best, CONFIG['VIDEO_BITRATE_KBPS'], min_speed):
+        print(f"[ERROR] Hasil benchmark (preset '{best['preset']}', {best['threads']} thread, {best['speed']:.2f}x) "
+              "tidak bisa disimpan. Siaran tetap memakai FFMPEG_PRESET.")
+        return
+    if best["realtime"]:
+        print(f"[INFO] Terbaik: preset '{best['preset']}' dengan {best['threads']} thread ({best['speed']:.2f}x). Disimpan.")
+    else:
+        print(f"[WARNING] Tidak ada preset yang mencapai {min_speed}x. Disimpan yang tercepat: "
+              f"'{best['preset']}' dengan {best['threads']} thread ({best['speed']:.2f}x).")
+    emit_event("benchmark", preset=best["preset"], threads=best["threads"], speed=best["speed"],
+               realtime=best["realtime"], resolution=preset_benchmark.resolution_key(width, height, fps))
+
+# --- Perintah FFmpeg & Cache Encode ---
+
+# Container yang bisa langsung di-copy; aturan codec ada di media_probe.is_copy_eligible.
+NATIVE_CONTAINERS = ("mov", "mp4", "m4a", "3gp", "flv")
+
+def decide_stream_mode(media_info):
+    """
+    Menentukan perlakuan tiap track secara terpisah: 'copy' atau 'encode' untuk video dan audio.
+    Jika kedua track bisa di-copy tetapi container bukan MP4/MOV/FLV, mode-nya REMUX (tanpa re-encode).
+    """
+    video_ok = is_video_copy_ok(media_info)
+    has_audio = media_info.get("audio_codec") is not None
+    audio_ok = is_audio_copy_ok(media_info)
+    containers = (media_info.get("format_name") or "").split(',')
+    native_container = any(c in NATIVE_CONTAINERS for c in containers)
+
+    mode = {"video": "copy" if video_ok else "encode",
+            "audio": "copy" if audio_ok else "encode",
+            "has_audio": has_audio,
+            # Resolusi/fps sumber untuk normalisasi saat video di-encode (lihat build_video_filter).
+            "width": media_info.get("width"), "height": media_info.get("height"), "fps": media_info.get("fps")}
+    if video_ok and audio_ok:
+        mode["label"] = "COPY STREAM (tanpa re-encode) ✅" if native_container else "REMUX (ganti container, tanpa re-encode) ✅"
+    elif video_ok:
+        mode["label"] = "COPY VIDEO + ENCODE AUDIO (AAC) ✅"
+    elif audio_ok:
+        mode["label"] = "ENCODE VIDEO (H.264) + COPY AUDIO ⚠️"
+    else:
+        mode["label"] = "RE-ENCODE (H.264 + AAC) ⚠️"
+    return mode
+
+# --- NORMALISASI RESOLUSI & FPS RE-ENCODE ---
+# Aturan normalisasi ada di video_normalize (dipakai juga oleh transcoder untuk mezzanine).
+def build_video_filter(stream_mode, bitrate_kbps):
+    """(filter -vf atau None, fps keluaran) untuk video yang di-encode, sesuai CONFIG saat ini."""
+    return video_normalize.build_video_filter(stream_mode.get("width"), stream_mode.get("height"),
+                                              stream_mode.get("fps"), bitrate_kbps,
+                                              CONFIG.get('RESOLUTION_NORMALIZE'), CONFIG.get('VIDEO_FILTER'))
+
+def build_stream_command(video_file, destination, stream_mode):
+    """Membangun perintah ffmpeg loop sesuai keputusan per-track dari decide_stream_mode."""
+    command = ['ffmpeg', '-re', '-stream_loop', '-1', '-i', video_file,
+               '-map', '0:v:0', '-map', '0:a:0?']
+    if stream_mode["video"] == "copy":
+        command += ['-c:v', 'copy']
+    else:
+        video_filter, out_fps = build_video_filter(stream_mode, video_bitrate_kbps())
+        if video_filter:
+            command += ['-vf', video_filter]
+        preset, threads = encoder_preset()
+        command += ['-c:v', 'libx264', '-preset', preset]
+        if threads:
+            command += ['-threads', str(threads)]
+        command += [
+            '-b:v', f"{video_bitrate_kbps()}k",
+            '-maxrate', f"{video_bitrate_kbps()}k",
+            '-bufsize', f"{video_bitrate_kbps() * 2}k",
+        ]
+        # Keyframe setiap KEYFRAME_INTERVAL_SEC detik berapa pun fps-nya.
+        command += video_normalize.keyframe_args(out_fps, CONFIG.get('VIDEO_FILTER'))
+        command += ['-pix_fmt', 'yuv420p']
+    if stream_mode["audio"] == "copy":
+        command += ['-c:a', 'copy']
+        if stream_mode["has_audio"]:
+            # AAC dari MPEG-TS/ADTS perlu dikonversi agar valid di FLV.
+            command += ['-bsf:a', 'aac_adtstoasc']
+    else:
+        command += ['-c:a', 'aac', '-b:a', f"{CONFIG['AUDIO_BITRATE_KBPS']}k", '-ar', '44100']
+    command += build_output_args(destination)
+    return command
+
+def resolve_destinations(stream_key):
+    """
+    Daftar tujuan siaran {"name", "url"}: STREAM_URL dengan kunci slot, ditambah CONFIG["DESTINATIONS"].
+    Tujuan tambahan memakai kunci slot kecuali diberi key_file/key_env sendiri; '{key}' di url
+    diganti kunci, jika tidak ada kunci ditambahkan di akhir url.
+    """
+    destinations = [{"name": "utama", "url": ingest_failover.join_key(CONFIG['STREAM_URL'], stream_key)}]
+    if CONFIG.get("BACKUP_STREAM_URLS"):
+        destinations[0]["ingest"] = ingest_failover.new_pool(
+            [CONFIG['STREAM_URL']] + CONFIG['BACKUP_STREAM_URLS'], stream_key,
+            CONFIG['INGEST_FAILOVER_AFTER'], CONFIG['INGEST_PRIMARY_RECHECK_SEC'])
+    for index, extra in enumerate(CONFIG.get("DESTINATIONS") or [], start=1):
+        key = stream_key
+        if extra.get("key_file") or extra.get("key_env"):
+            key = read_stream_key(key_file=extra.get("key_file"), key_env=extra.get("key_env"))
+            if not key:
+                print(f"[WARNING] Tujuan '{extra.get('name') or extra['url']}' dilewati karena kuncinya tidak ada.")
+                continue
+        destinations.append({"name": extra.get("name") or f"tujuan-{index}",
+                             "url": ingest_failover.join_key(extra["url"], key)})
+    return destinations
+
+def retarget_command(command, old_url, new_url):
+    """
+    Mengganti URL tujuan di perintah FFmpeg (output FLV langsung maupun target tee) setelah ingest berpindah.
+    Hanya argumen yang sama persis dengan old_url, atau target tee yang URL-nya sama persis, yang diganti;
+    URL ingest yang merupakan awalan URL lain, nama file, dan argumen lain tidak tersentuh.
+    """
+    retargeted = []
+    for index, arg in enumerate(command):
+        if arg == old_url:
+            arg = new_url
+        elif index >= 2 and command[index - 2:index] == ['-f', 'tee']:
+            slaves = []
+            for slave in arg.split("|"):
+                options, bracket, url = slave.partition("]") if slave.startswith("[") else ("", "", slave)
+                slaves.append(f"{options}{bracket}{new_url}" if url == old_url else slave)
+            arg = "|".join(slaves)
+        retargeted.append(arg)
+    return retargeted
+
+def build_tee_targets(destination):
+    """Target muxer tee untuk tujuan: satu URL RTMP (FLV), atau daftar URL relay fan-out (MPEG-TS per relay)."""
+    if isinstance(destination, str):
+        return [f"[f=flv:onfail=abort]{destination}"]
+    # Setiap relay gagal sendiri-sendiri; encoder tetap jalan untuk relay lain.
+    return [f"[f=mpegts:onfail=ignore]{url}" for url in destination]
+
+def build_output_args(destination):
+    """Argumen output FFmpeg: FLV langsung ke satu URL RTMP, atau tee ke relay fan-out."""
+    if isinstance(destination, str):
+        return ['-f', 'flv', destination]
+    return ['-f', 'tee', "|".join(build_tee_targets(destination))]
+
+def add_progress_output(command):
+    """
+    Menambahkan output progres mesin-baca FFmpeg ke stdout (dan mematikan baris statistik di log).
+    Setiap baris log diberi tag level ([info], [warning], [error]) agar bisa difilter oleh bot.
+    """
+    return [command[0], '-progress', 'pipe:1', '-nostats', '-loglevel', 'level+info'] + command[1:]
+
+def start_progress_reader(process):
+    """Membaca progres FFmpeg di thread terpisah dan mengirim ringkasannya ke bot secara berkala."""
+    last_emit = [0.0]
+
+    def on_sample(sample):
+        now = time.monotonic()
+        if now - last_emit[0] >= CONFIG['PROGRESS_EVENT_INTERVAL_SEC'] or sample.get("progress") == "end":
+            last_emit[0] = now
+            emit_event("progress", **{k: v for k, v in sample.items() if k not in ("ts", "progress")})
+
+    thread = threading.Thread(target=stream_metrics.read_progress, args=(process.stdout, on_sample),
+                              name="ffmpeg-progress", daemon=True)
+    thread.start()
+    return thread
+
+# Jumlah baris stderr terakhir per run yang diperiksa oleh ffmpeg_failures.
+FAILURE_TAIL_LINES = 200
+
+def add_input_seek(command, position):
+    """
+    Menambahkan seek input sebelum '-i' agar percobaan ulang dimulai dari posisi tertentu.
+    '-noaccurate_seek' membuat FFmpeg mulai dari keyframe terdekat sebelum posisi (tanpa decode yang dibuang).
+    Seek hanya berlaku untuk putaran pertama; loop berikutnya tetap dimulai dari awal file.
+    """
+    index = command.index('-i')
+    return command[:index] + ['-ss', f"{position:.3f}", '-noaccurate_seek'] + command[index:]
+
+def next_resume_position(previous_position, streamed_seconds, loop_duration):
+    """Posisi di dalam file setelah streamed_seconds diputar mulai dari previous_position (memperhitungkan loop)."""
+    if not loop_duration or loop_duration <= 0:
+        return 0.0
+    position = (previous_position + streamed_seconds) % loop_duration
+    # Terlalu dekat dengan akhir file; mulai dari awal saja.
+    return 0.0 if loop_duration - position < 1 else position
+
+def compute_retry_delay(attempt):
+    """Jeda exponential backoff dengan jitter (antara setengah dan penuh dari jeda dasar)."""
+    base = min(CONFIG['RETRY_BACKOFF_MAX_SEC'], CONFIG['RETRY_BACKOFF_BASE_SEC'] * (2 ** (attempt - 1)))
+    return random.uniform(base / 2, base)
+
+class StreamStalled(Exception):
+    """FFmpeg masih hidup tetapi frame/out_time tidak bertambah selama STALL_TIMEOUT_SEC."""
+    def __init__(self, stalled_for):
+        super().__init__(f"tidak ada progres selama {stalled_for:.0f} detik")
+        self.stalled_for = stalled_for
+
+def wait_with_stall_watchdog(process, poll_interval=1.0):
+    """
+    Menunggu FFmpeg selesai sambil memantau progres. Jika frame/out_time tidak bertambah selama
+    STALL_TIMEOUT_SEC (misal soket RTMP macet), FFmpeg dihentikan dan lama macetnya dikembalikan.
+    Mengembalikan None jika FFmpeg keluar sendiri atau dihentikan karena restart_requested().
+    """
+    while True:
+        try:
+            process.wait(timeout=poll_interval)
+            return None
+        except subprocess.TimeoutExpired:
+            pass
+        if restart_requested():
+            _terminate(process)
+            return None
+        timeout = CONFIG.get('STALL_TIMEOUT_SEC') or 0
+        if timeout <= 0:
+            continue
+        stalled_for = stream_metrics.seconds_since_advance()
+        if stalled_for is None or stalled_for < timeout:
+            continue
+        sample = stream_metrics.latest_sample() or {}
+        emit_event("stall", stalled_for=round(stalled_for, 1), frame=sample.get("frame"),
+                   out_time_s=sample.get("out_time_s"), pid=process.pid)
+        stream_metrics.record_stall_restart()
+        _terminate(process)
+        return stalled_for
+
+def _terminate(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def build_copy_loop_command(input_file, destination):
+    """Perintah COPY STREAM yang me-loop file tanpa henti ke tujuan RTMP."""
+    return [
+        'ffmpeg', '-re', '-stream_loop', '-1', '-i', input_file,
+        '-c:v', 'copy', '-c:a', 'copy',
+    ] + build_output_args(destination)
+
+def build_encode_cache_pass_command(encode_command, cache_path, destination):
+    """
+    Mengubah perintah RE-ENCODE menjadi satu putaran (tanpa -stream_loop) yang mengirim hasil
+    encode ke RTMP dan menulis salinannya ke file cache lewat muxer tee.
+    """
+    command = [arg for arg in encode_command[:encode_command.index('-f')]]
+    loop_index = command.index('-stream_loop')
+    del command[loop_index:loop_index + 2]
+    # GOP tertutup dan tanpa keyframe ekstra agar titik loop cache bersih.
+    command += ['-sc_threshold', '0', '-flags', '+cgop+global_header',
+                '-f', 'tee',
+                "|".join(build_tee_targets(destination) + [f"[f=mp4:movflags=+faststart:onfail=ignore]{encode_cache_part_path(cache_path)}"])]
+    return command
+
+def _encode_cache_settings():
+    return {
+        "FFMPEG_PRESET": encoder_preset()[0],
+        "RESOLUTION_NORMALIZE": CONFIG.get('RESOLUTION_NORMALIZE'),
+        "VIDEO_FILTER": CONFIG.get('VIDEO_FILTER'),
+        "VIDEO_BITRATE_KBPS": video_bitrate_kbps(),
+        "AUDIO_BITRATE_KBPS": CONFIG['AUDIO_BITRATE_KBPS'],
+    }
+
+def get_encode_cache_path(video_file):
+    """Path file cache encode untuk sumber (satu file per path sumber)."""
+    real_path = os.path.realpath(video_file)
+    digest = hashlib.sha1(real_path.encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(real_path))[0]
+    os.makedirs(CONFIG['ENCODE_CACHE_DIR'], exist_ok=True)
+    return os.path.join(CONFIG['ENCODE_CACHE_DIR'], f"{stem}.{digest}.mp4")
+
+def encode_cache_part_path(cache_path):
+    """
+    File sementara milik penulis ini (slot + pid). Dua slot yang menyiarkan video yang sama menulis
+    file .part masing-masing; yang selesai lebih dulu dipindahkan secara atomik menjadi cache.
+    """
+    return f"{cache_path}.{CURRENT_SLOT}-{os.getpid()}.part"
+
+def find_encode_cache(video_file):
+    """
+    Mengembalikan path cache encode yang masih valid untuk sumber, atau None.
+    Cache dibuang jika mtime/ukuran sumber atau pengaturan encode sudah berubah.
+    """
+    cache_path = get_encode_cache_path(video_file)
+    meta_path = f"{cache_path}.json"
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        st = os.stat(os.path.realpath(video_file))
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if (meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size
+                and meta.get("settings") == _encode_cache_settings()):
+            return cache_path
+        print("[INFO] Sumber atau pengaturan encode berubah. Cache encode lama dibuang.")
+    except (OSError, json.JSONDecodeError):
+        print("[WARNING] Metadata cache encode tidak valid. Cache dibuang.")
+    discard_encode_cache(cache_path, include_final=True)
+    return None
+
+def finalize_encode_cache(video_file, cache_path):
+    """Memindahkan cache .part menjadi file final (atomik) dan mencatat sidik sumbernya."""
+    part_path = encode_cache_part_path(cache_path)
+    meta_tmp_path = f"{part_path}.json"
+    try:
+        if not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+            print("[WARNING] File cache encode tidak terbentuk. Putaran berikutnya tetap re-encode.")
+            return None
+        st = os.stat(os.path.realpath(video_file))
+        with open(meta_tmp_path, 'w') as f:
+            json.dump({"source": os.path.realpath(video_file), "size": st.st_size,
+                       "mtime_ns": st.st_mtime_ns, "settings": _encode_cache_settings()}, f, indent=4)
+        os.replace(part_path, cache_path)
+        os.replace(meta_tmp_path, f"{cache_path}.json")
+        print(f"[INFO] Cache encode disimpan: {cache_path}")
+        return cache_path
+    except OSError as e:
+        print(f"[WARNING] Gagal menyimpan cache encode: {e}")
+        discard_encode_cache(cache_path, include_final=True)
+        return None
+
+def discard_encode_cache(cache_path, include_final=False):
+    paths = [encode_cache_part_path(cache_path), f"{encode_cache_part_path(cache_path)}.json"]
+    if include_final:
+        paths += [cache_path, f"{cache_path}.json"]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[WARNING] Gagal menghapus file cache '{path}': {e}")
+
 # --- Helper Functions (Sama seperti sebelumnya) ---
 
+def install_signal_handlers():
+    """SIGTERM (dari bot) diperlakukan seperti CTRL+C agar proses FFmpeg ikut dihentikan dengan rapi."""
+    def handle_sigterm(signum, frame):
+        raise KeyboardInterrupt
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
 def clear_screen():
+    if not sys.stdout.isatty():
+        return # Output dibaca bot lewat pipe; jangan kirim kode escape layar.
     command = 'cls' if platform.system() == "Windows" else 'clear'
     os.system(command)
 
@@ -165,10 +952,11 @@ def pause_and_exit(message="Tekan Enter untuk keluar..."):
         input(message)
     sys.exit(1)
 
-def find_video_file(silent=False):
+def find_video_file(silent=False, directory='.'):
     if not silent:
         print("1. Mencari file video di folder ini...")
-    video_files = [f for f in os.listdir('.') if f.lower().endswith(tuple(CONFIG["VIDEO_EXTENSIONS"]))]
+    video_files = [os.path.join(directory, f) if directory != '.' else f
+                   for f in os.listdir(directory) if f.lower().endswith(tuple(CONFIG["VIDEO_EXTENSIONS"]))]
     if not video_files:
         if not silent: print("\n[ ERROR ] Tidak ada file video yang ditemukan di folder ini.")
         return None
@@ -177,28 +965,39 @@ def find_video_file(silent=False):
         return None
     return video_files[0]
 
-def read_stream_key():
+def read_stream_key(key_file=None, key_env=None):
+    """Membaca kunci streaming dari environment variable key_env, file key_file, atau CONFIG['KEY_FILENAME']."""
+    if key_env:
+        stream_key = os.environ.get(key_env, "").strip()
+        if not stream_key:
+            print(f"\n[ ERROR ] Environment variable '{key_env}' tidak ada atau kosong.")
+            return None
+        print(f"   -> Kunci ditemukan: ...{stream_key[-4:]}\n")
+        return stream_key
+    key_file = key_file or CONFIG['KEY_FILENAME']
     try:
-        with open(CONFIG['KEY_FILENAME'], 'r') as f:
+        with open(key_file, 'r') as f:
             stream_key = f.read().strip()
         if not stream_key:
-            print(f"\n[ ERROR ] File '{CONFIG['KEY_FILENAME']}' ditemukan, tetapi isinya kosong. Harap masukkan kunci streaming Anda.")
+            print(f"\n[ ERROR ] File '{key_file}' ditemukan, tetapi isinya kosong. Harap masukkan kunci streaming Anda.")
             return None
-        print(f"   -> Kunci ditemukan: ...{stream_key[-4:]}\n")
+        print(f"   -> Kunci ditemukan: ...{stream_key[-4:]}\n")
         return stream_key
     except FileNotFoundError:
-        print(f"\n[ ERROR ] File kunci streaming '{CONFIG['KEY_FILENAME']}' tidak ditemukan.")
+        print(f"\n[ ERROR ] File kunci streaming '{key_file}' tidak ditemukan.")
         print("          Harap buat file teks dengan nama tersebut dan letakkan kunci streaming Anda di dalamnya.")
         return None
     except Exception as e:
-        print(f"\n[ ERROR ] Gagal membaca kunci streaming dari '{CONFIG['KEY_FILENAME']}': {e}")
+        print(f"\n[ ERROR ] Gagal membaca kunci streaming dari '{key_file}': {e}")
         return None
 
 def check_ffmpeg_installed():
     print("*. Memeriksa instalasi FFmpeg...")
     try:
         subprocess.run(['ffmpeg', '-version'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        subprocess.run(['ffprobe', '-version'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        # FFprobe cukup dicari di PATH; metadata file diambil dari cache media_probe.
+        if not shutil.which('ffprobe'):
+            raise FileNotFoundError('ffprobe')
         print("   -> FFmpeg dan FFprobe terdeteksi.\n")
         return True
     except (FileNotFoundError, subprocess.CalledProcessError):
@@ -211,36 +1010,15 @@ def check_ffmpeg_installed():
         return False
 
 def get_media_info(filepath):
-    video_codec = None
-    audio_codec = None
-    try:
-        result_video = subprocess.run(
-            ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
-             '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1', filepath],
-            capture_output=True, text=True, check=False
-        )
-        if result_video.returncode == 0:
-            video_codec = result_video.stdout.strip()
-        else:
-            print(f"[WARNING] Tidak dapat mendeteksi codec video: {result_video.stderr.strip()}")
-
-        result_audio = subprocess.run(
-            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
-             '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1', filepath],
-            capture_output=True, text=True, check=False
-        )
-        if result_audio.returncode == 0:
-            audio_codec = result_audio.stdout.strip()
-        else:
-            print(f"[WARNING] Tidak dapat mendeteksi codec audio: {result_audio.stderr.strip()}")
-
-        return video_codec, audio_codec
-    except FileNotFoundError:
-        print("[ERROR] FFprobe tidak ditemukan. Tidak dapat memeriksa codec video/audio.")
-        return None, None
-    except Exception as e:
-        print(f"[ERROR] Gagal mendapatkan info media: {e}")
+    """Mengembalikan (video_codec, audio_codec) dari metadata yang di-cache oleh media_probe."""
+    info = probe_media(filepath)
+    if not info:
         return None, None
+    if not info.get("video_codec"):
+        print("[WARNING] Tidak dapat mendeteksi codec video.")
+    if not info.get("audio_codec"):
+        print("[WARNING] Tidak dapat mendeteksi codec audio.")
+    return info.get("video_codec"), info.get("audio_codec")
 
 def print_waktu_lokal():
     hari_indo = {
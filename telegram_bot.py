@@ -3,9 +3,14 @@ import os
 import subprocess
 import time
 import json
+import asyncio
 import sys
 import platform
+import re
+import signal
+from collections import deque
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from telegram.ext import (
@@ -13,6 +18,20 @@ from telegram.ext import (
     ConversationHandler, CallbackQueryHandler
 )
 
+from media_probe import probe_media, forget_media
+from ffmpeg_failures import describe_failure
+from ffmpeg_log import tail_lines, LEVEL_TAGS
+import video_library
+import content_store
+import upload_ingest
+import stream_config
+import state_store
+import live_scheduler
+from transcoder import (
+    init_transcoder, shutdown_transcoder, submit_transcode, get_job,
+    find_ready_mezzanine, remove_mezzanines
+)
+
 # --- KONFIGURASI BOT ---
 BOT_CONFIG_FILE = "bot_config.json"
 BOT_STATE_FILE = "bot_state.json"
@@ -20,7 +39,40 @@ CONFIG = {} # Konfigurasi bot
 BOT_STATE = {} # Status bot (persisten)
 
 # States untuk ConversationHandler
-SELECT_VIDEO_STATE, ENTER_KEY_STATE, SCHEDULE_STOP_STATE, DELETE_VIDEO_STATE, UPLOAD_VIDEO_STATE = range(5) 
+SELECT_VIDEO_STATE, ENTER_KEY_STATE, SCHEDULE_STOP_STATE, DELETE_VIDEO_STATE, UPLOAD_VIDEO_STATE, SELECT_SLOT_STATE, NEW_SLOT_STATE = range(7)
+
+# Slot streaming. Slot "default" memakai file lama di folder streamer (PID_FILE, keystream.txt, log),
+# slot lain memakai folder 'slots/<slot>' di samping streamer.py (lihat streamer.get_slot_dir).
+DEFAULT_SLOT = "default"
+SLOTS_DIR_NAME = "slots"
+SLOT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+
+# Supervisor proses streamer (asyncio). Status dijawab dari handle proses di memori;
+# PID file hanya ditulis agar proses yang tertinggal dari bot sebelumnya bisa diadopsi.
+STOP_TIMEOUT_SECONDS = 10
+STREAM_PROCESSES = {} # slot_id -> asyncio.subprocess.Process
+ADOPTED_PIDS = {} # slot_id -> PID proses streamer dari sesi bot sebelumnya
+_slot_locks = {} # slot_id -> asyncio.Lock (start/stop satu slot tidak boleh tumpang tindih)
+
+# Output streamer dibaca terus-menerus dan diubah menjadi event JSON-lines (lihat streamer.emit_event).
+# Event terbaru per slot disimpan di ring buffer agar status/log bisa dijawab seketika.
+EVENT_BUFFER_SIZE = 200
+STREAM_OUTPUT_LINE_LIMIT = 1024 * 1024
+STREAM_EVENTS = {} # slot_id -> deque event
+STREAM_STATUS = {} # slot_id -> ringkasan event terakhir (state, mode, retry, exit code)
+
+# Daftar video diambil dari indeks video_library (SQLite), ditampilkan per halaman.
+VIDEO_PAGE_SIZE = 8
+VIDEO_BUTTON_NAME_LIMIT = 40
+
+# Upload diunduh di latar belakang (lihat ingest_upload); satu unduhan per file_unique_id.
+ACTIVE_UPLOADS = set()
+UPLOAD_PROGRESS_INTERVAL_SECONDS = 3
+STALE_INCOMING_SECONDS = 24 * 60 * 60
+# Dengan server Bot API lokal, getFile baru selesai setelah server mengunduh seluruh file.
+LOCAL_GET_FILE_TIMEOUT_SECONDS = 30 * 60
+# Batas ukuran dokumen yang bisa dikirim bot lewat Bot API; log yang lebih besar dikirim bagian akhirnya saja.
+LOG_DOCUMENT_MAX_BYTES = 45 * 1024 * 1024
 
 # Default config jika file tidak ditemukan atau error
 DEFAULT_BOT_CONFIG = {
@@ -29,13 +81,26 @@ DEFAULT_BOT_CONFIG = {
     "STREAM_SCRIPT_PATH": "streamer.py",
     "PID_FILE": "stream_process.pid",
     "LOG_FILE": "ffmpeg_log.txt",
-    "VIDEOS_DIR": "uploaded_videos"
+    "VIDEOS_DIR": "uploaded_videos",
+    "PRETRANSCODE_ON_UPLOAD": True,
+    "TRANSCODE_WORKERS": 1,
+    "LOG_VIEW_LINES": 40,
+    "LIBRARY_DB": "video_library.db",
+    "STATE_DB": "bot_state.db",
+    "LOCAL_BOT_API_URL": "",
+    "LOCAL_BOT_API_DIR_MAP": {},
+    "LOCAL_FILE_HANDOFF": "hardlink"
 }
 
-DEFAULT_BOT_STATE = {
+DEFAULT_SLOT_STATE = {
     "selected_video": None,
-    "is_stream_key_set": False,
-    "scheduled_stop_job_name": None
+    "is_stream_key_set": False
+}
+
+DEFAULT_BOT_STATE = {
+    "active_slot": DEFAULT_SLOT,
+    "streams": {},
+    "schedules": {} # id -> jadwal live persisten (lihat live_scheduler)
 }
 
 # Aktifkan logging
@@ -76,6 +141,8 @@ def load_bot_config():
 
         CONFIG["PID_FILE"] = os.path.abspath(os.path.join(current_script_dir, CONFIG["PID_FILE"]))
         CONFIG["LOG_FILE"] = os.path.abspath(os.path.join(current_script_dir, CONFIG["LOG_FILE"]))
+        CONFIG["LIBRARY_DB"] = os.path.abspath(os.path.join(current_script_dir, CONFIG["LIBRARY_DB"]))
+        CONFIG["STATE_DB"] = os.path.abspath(os.path.join(current_script_dir, CONFIG["STATE_DB"]))
         logger.info(f"PID File: {CONFIG['PID_FILE']}, Log File: {CONFIG['LOG_FILE']}")
 
     except FileNotFoundError:
@@ -101,6 +168,8 @@ def save_bot_config():
         temp_config["STREAM_SCRIPT_PATH"] = os.path.relpath(CONFIG["STREAM_SCRIPT_PATH"], current_script_dir)
         temp_config["PID_FILE"] = os.path.relpath(CONFIG["PID_FILE"], current_script_dir)
         temp_config["LOG_FILE"] = os.path.relpath(CONFIG["LOG_FILE"], current_script_dir)
+        temp_config["LIBRARY_DB"] = os.path.relpath(CONFIG["LIBRARY_DB"], current_script_dir)
+        temp_config["STATE_DB"] = os.path.relpath(CONFIG["STATE_DB"], current_script_dir)
 
         with open(config_file_path, 'w') as f:
             json.dump(temp_config, f, indent=4)
@@ -109,79 +178,111 @@ def save_bot_config():
         logger.error(f"Gagal menyimpan konfigurasi bot ke '{config_file_path}': {e}")
 
 def load_bot_state():
-    """Memuat status bot dari bot_state.json."""
+    """Memuat status bot dari database status (SQLite); bot_state.json lama diimpor sekali jika ada."""
     global BOT_STATE
-    try:
-        current_script_dir = os.path.dirname(os.path.abspath(__file__))
-        state_file_path = os.path.join(current_script_dir, BOT_STATE_FILE)
-
-        with open(state_file_path, 'r') as f:
-            BOT_STATE = json.load(f)
-        for key, default_value in DEFAULT_BOT_STATE.items():
-            if key not in BOT_STATE:
-                BOT_STATE[key] = default_value
-        logger.info(f"Status bot dimuat dari '{state_file_path}'.")
-    except FileNotFoundError:
-        logger.warning(f"File '{BOT_STATE_FILE}' tidak ditemukan. Membuat status bot default...")
-        BOT_STATE = DEFAULT_BOT_STATE
-        save_bot_state()
-    except json.JSONDecodeError:
-        logger.error(f"Kesalahan format JSON di '{BOT_STATE_FILE}'. Menggunakan status bot default.")
-        BOT_STATE = DEFAULT_BOT_STATE
+    current_script_dir = os.path.dirname(os.path.abspath(__file__))
+    state_store.init_store(CONFIG["STATE_DB"], legacy_json_path=os.path.join(current_script_dir, BOT_STATE_FILE))
+    BOT_STATE = state_store.load_state()
+    if BOT_STATE is None:
+        logger.warning(f"Status bot belum ada di '{CONFIG['STATE_DB']}'. Membuat status bot default...")
+        BOT_STATE = json.loads(json.dumps(DEFAULT_BOT_STATE))
+        migrate_bot_state()
         save_bot_state()
+    else:
+        migrate_bot_state()
+        logger.info(f"Status bot dimuat dari '{CONFIG['STATE_DB']}'.")
+
+def migrate_bot_state():
+    """Memindahkan status lama (satu stream) ke dalam BOT_STATE['streams']['default']."""
+    for key, default_value in DEFAULT_BOT_STATE.items():
+        if key not in BOT_STATE:
+            BOT_STATE[key] = json.loads(json.dumps(default_value))
+    legacy = {key: BOT_STATE.pop(key) for key in DEFAULT_SLOT_STATE if key in BOT_STATE}
+    if legacy:
+        BOT_STATE["streams"].setdefault(DEFAULT_SLOT, {}).update(legacy)
+    for slot_state in BOT_STATE["streams"].values():
+        # Jadwal lama berbasis job_queue di memori tidak bisa dipulihkan setelah restart.
+        slot_state.pop("scheduled_stop_job_name", None)
+    get_slot_state(DEFAULT_SLOT)
+    if BOT_STATE["active_slot"] not in BOT_STATE["streams"]:
+        BOT_STATE["active_slot"] = DEFAULT_SLOT
+
+def get_slot_state(slot_id):
+    """Mengembalikan (dan membuat jika belum ada) status persisten untuk satu slot."""
+    slot_state = BOT_STATE["streams"].setdefault(slot_id, {})
+    for key, default_value in DEFAULT_SLOT_STATE.items():
+        slot_state.setdefault(key, default_value)
+    return slot_state
+
+def get_active_slot():
+    return BOT_STATE.get("active_slot") or DEFAULT_SLOT
+
+def get_slot_dir(slot_id):
+    """Folder kerja streamer untuk slot (sama dengan streamer.get_slot_dir, tetapi absolut)."""
+    streamer_dir = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
+    if slot_id == DEFAULT_SLOT:
+        return streamer_dir
+    slot_dir = os.path.join(streamer_dir, SLOTS_DIR_NAME, slot_id)
+    os.makedirs(slot_dir, exist_ok=True)
+    return slot_dir
+
+def get_pid_file(slot_id):
+    if slot_id == DEFAULT_SLOT:
+        return CONFIG['PID_FILE']
+    base, ext = os.path.splitext(CONFIG['PID_FILE'])
+    return f"{base}_{slot_id}{ext}"
+
+def get_log_file(slot_id):
+    if slot_id == DEFAULT_SLOT:
+        return CONFIG['LOG_FILE']
+    return os.path.join(get_slot_dir(slot_id), os.path.basename(CONFIG['LOG_FILE']))
 
 def save_bot_state():
-    """Menyimpan status bot saat ini ke bot_state.json."""
-    try:
-        current_script_dir = os.path.dirname(os.path.abspath(__file__))
-        state_file_path = os.path.join(current_script_dir, BOT_STATE_FILE)
+    """Menjadwalkan penyimpanan status bot (snapshot diambil sekarang, ditulis di latar belakang oleh state_store)."""
+    state_store.save_state(BOT_STATE)
 
-        with open(state_file_path, 'w') as f:
-            json.dump(BOT_STATE, f, indent=4)
-        logger.info(f"Status bot disimpan ke '{state_file_path}'.")
-    except IOError as e:
-        logger.error(f"Gagal menyimpan status bot ke '{state_file_path}': {e}")
+def get_streamer_config_path():
+    return os.path.join(os.path.dirname(CONFIG['STREAM_SCRIPT_PATH']), "config.json")
 
-def get_stream_key_from_file():
-    """Membaca kunci streaming dari file (menggunakan KEY_FILENAME dari config.json streamer)."""
-    streamer_dir = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-    streamer_config_path = os.path.join(streamer_dir, "config.json")
-    
-    try:
-        with open(streamer_config_path, 'r') as f:
-            streamer_conf = json.load(f)
-        key_filename = streamer_conf.get("KEY_FILENAME", "keystream.txt")
-        key_file_path = os.path.join(streamer_dir, key_filename)
+def read_streamer_config():
+    """Konfigurasi streamer tervalidasi (config.json), di-cache di memori sampai file-nya berubah."""
+    return stream_config.load_config(get_streamer_config_path())
+
+def get_stream_key_path(slot_id):
+    """Path file kunci streaming untuk slot (menggunakan KEY_FILENAME dari config.json streamer)."""
+    key_filename = read_streamer_config()["KEY_FILENAME"]
+    return os.path.join(get_slot_dir(slot_id), os.path.basename(key_filename))
 
+def get_stream_key_from_file(slot_id=DEFAULT_SLOT):
+    """Membaca kunci streaming slot dari file."""
+    slot_state = get_slot_state(slot_id)
+    key_file_path = None
+    try:
+        key_file_path = get_stream_key_path(slot_id)
         with open(key_file_path, 'r') as f:
             key = f.read().strip()
             if key:
-                BOT_STATE["is_stream_key_set"] = True
+                slot_state["is_stream_key_set"] = True
                 save_bot_state()
             return key
     except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-        logger.error(f"Gagal membaca kunci streaming dari file '{key_file_path}': {e}")
-        BOT_STATE["is_stream_key_set"] = False
+        logger.error(f"Gagal membaca kunci streaming slot '{slot_id}' dari file '{key_file_path}': {e}")
+        slot_state["is_stream_key_set"] = False
         save_bot_state()
         return None
 
-def write_stream_key_to_file(key):
-    """Menulis kunci streaming ke file."""
-    streamer_dir = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-    streamer_config_path = os.path.join(streamer_dir, "config.json")
+def write_stream_key_to_file(key, slot_id=DEFAULT_SLOT):
+    """Menulis kunci streaming slot ke file."""
+    key_file_path = None
     try:
-        with open(streamer_config_path, 'r') as f:
-            streamer_conf = json.load(f)
-        key_filename = streamer_conf.get("KEY_FILENAME", "keystream.txt")
-        key_file_path = os.path.join(streamer_dir, key_filename)
-
+        key_file_path = get_stream_key_path(slot_id)
         with open(key_file_path, 'w') as f:
             f.write(key.strip())
-        BOT_STATE["is_stream_key_set"] = True
+        get_slot_state(slot_id)["is_stream_key_set"] = True
         save_bot_state()
         return True
     except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-        logger.error(f"Gagal menulis kunci streaming ke file '{key_file_path}': {e}")
+        logger.error(f"Gagal menulis kunci streaming slot '{slot_id}' ke file '{key_file_path}': {e}")
         return False
 
 # --- Fungsi Helper Bot ---
@@ -197,127 +298,301 @@ async def check_auth(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return False
     return True
 
-def is_stream_running():
-    """Mengecek apakah proses streaming sedang berjalan."""
-    pid_file_path = CONFIG['PID_FILE']
-    if os.path.exists(pid_file_path):
-        with open(pid_file_path, 'r') as f:
-            pid_str = f.read().strip()
-        try:
-            pid = int(pid_str)
-            if platform.system() == "Windows":
-                return True, pid
-            else:
-                os.kill(pid, 0)
-                return True, pid
-        except (ProcessLookupError, ValueError):
-            logger.warning(f"PID {pid_str} tidak valid atau proses tidak ditemukan. Menghapus '{pid_file_path}'.")
-            os.remove(pid_file_path)
-            return False, None
-        except Exception as e:
-            logger.error(f"Error saat mengecek PID: {e}")
-            return False, None
-    return False, None
-
-def start_stream_process():
-    """Memulai proses streaming."""
-    running, _ = is_stream_running()
-    if running:
-        logger.info("Mencoba memulai stream, tetapi sudah ada yang berjalan.")
-        return False
-
-    if not BOT_STATE["selected_video"]:
-        logger.error("Tidak ada video yang dipilih untuk streaming.")
-        return False
-
-    if not BOT_STATE["is_stream_key_set"]:
-        logger.error("Kunci streaming belum diatur.")
-        return False
-
-    if not os.path.exists(BOT_STATE["selected_video"]):
-        logger.error(f"Video yang dipilih '{os.path.basename(BOT_STATE['selected_video'])}' tidak ditemukan. Path: {BOT_STATE['selected_video']}")
+def _pid_alive(pid):
+    if platform.system() == "Windows":
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
         return False
+    except PermissionError:
+        return True
 
+def _remove_pid_file(slot_id):
     try:
-        selected_video_filename = os.path.basename(BOT_STATE["selected_video"])
-        streamer_dir = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-        destination_path_for_streamer = os.path.join(streamer_dir, selected_video_filename)
-
-        streamer_config_path_abs = os.path.join(streamer_dir, "config.json")
-        allowed_extensions = []
+        os.remove(get_pid_file(slot_id))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Gagal menghapus PID file slot '{slot_id}': {e}")
+
+def _get_slot_lock(slot_id):
+    if slot_id not in _slot_locks:
+        _slot_locks[slot_id] = asyncio.Lock()
+    return _slot_locks[slot_id]
+
+def adopt_orphan_streams():
+    """Dipanggil sekali saat bot mulai: mengadopsi proses streamer yang masih hidup dari PID file."""
+    for slot_id in list_slots():
+        pid_file_path = get_pid_file(slot_id)
+        if not os.path.exists(pid_file_path):
+            continue
         try:
-            with open(streamer_config_path_abs, 'r') as f:
-                streamer_conf = json.load(f)
-            allowed_extensions = [ext.lower() for ext in streamer_conf.get("VIDEO_EXTENSIONS", [])]
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Gagal membaca streamer config dari '{streamer_config_path_abs}'. Menggunakan ekstensi default untuk pembersihan: {e}")
-            allowed_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.webm']
-
-        for f in os.listdir(streamer_dir):
-            file_ext = os.path.splitext(f)[1].lower()
-            if file_ext in allowed_extensions and f != selected_video_filename:
-                try:
-                    full_path_to_remove = os.path.join(streamer_dir, f)
-                    if os.path.islink(full_path_to_remove):
-                        os.unlink(full_path_to_remove)
-                        logger.info(f"Menghapus symlink lama di direktori streamer: {full_path_to_remove}")
-                    elif os.path.isfile(full_path_to_remove):
-                        os.remove(full_path_to_remove)
-                        logger.info(f"Menghapus video fisik lama di direktori streamer: {full_path_to_remove}")
-                except Exception as ex:
-                    logger.warning(f"Gagal menghapus video/symlink lama {f}: {ex}")
-
-        if not os.path.exists(destination_path_for_streamer) or \
-           not os.path.islink(destination_path_for_streamer) or \
-           (os.path.islink(destination_path_for_streamer) and os.readlink(destination_path_for_streamer) != BOT_STATE["selected_video"]):
-            
-            if os.path.exists(destination_path_for_streamer):
-                try:
-                    os.unlink(destination_path_for_streamer)
-                except OSError as ose:
-                    if ose.errno == 21:
-                        pass 
-                    else:
-                        os.remove(destination_path_for_streamer)
-                except Exception as ex:
-                    logger.warning(f"Gagal membersihkan tujuan symlink {destination_path_for_streamer}: {ex}")
-
-            os.symlink(BOT_STATE["selected_video"], destination_path_for_streamer)
-            logger.info(f"Membuat symlink: {BOT_STATE['selected_video']} -> {destination_path_for_streamer}")
+            with open(pid_file_path, 'r') as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            pid = None
+        if pid and _pid_alive(pid):
+            ADOPTED_PIDS[slot_id] = pid
+            logger.info(f"Mengadopsi proses streaming slot '{slot_id}' yang masih berjalan (PID: {pid}).")
         else:
-            logger.info(f"Symlink {destination_path_for_streamer} sudah ada dan menunjuk ke video yang benar.")
-
-        process = subprocess.Popen([sys.executable, CONFIG['STREAM_SCRIPT_PATH']],
-                                     cwd=streamer_dir,
-                                     stdout=subprocess.PIPE,
-                                     stderr=subprocess.STDOUT,
-                                     text=True,
-                                     creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if platform.system() == "Windows" else 0)
-
-        with open(CONFIG['PID_FILE'], 'w') as f:
-            f.write(str(process.pid))
-        logger.info(f"Proses streaming dimulai dengan PID: {process.pid}")
-        return True
-    except Exception as e:
-        logger.error(f"Gagal memulai proses streaming: {e}", exc_info=True)
-        return False
+            logger.warning(f"PID file slot '{slot_id}' tidak valid atau proses tidak ditemukan. Menghapus '{pid_file_path}'.")
+            _remove_pid_file(slot_id)
+
+def is_stream_running(slot_id=DEFAULT_SLOT):
+    """Mengecek apakah proses streaming slot sedang berjalan (dari handle proses di memori)."""
+    process = STREAM_PROCESSES.get(slot_id)
+    if process is not None and process.returncode is None:
+        return True, process.pid
+    pid = ADOPTED_PIDS.get(slot_id)
+    if pid is not None:
+        if _pid_alive(pid):
+            return True, pid
+        ADOPTED_PIDS.pop(slot_id, None)
+        _remove_pid_file(slot_id)
+    return False, None
 
-def stop_stream_process(pid):
-    """Menghentikan proses streaming."""
+def list_slots():
+    """Daftar slot yang dikenal (dari status bot), slot default selalu pertama."""
+    slots = [DEFAULT_SLOT] + sorted(s for s in BOT_STATE["streams"] if s != DEFAULT_SLOT)
+    return slots
+
+def resolve_stream_source(slot_id):
+    """Path video yang diberikan ke streamer (--input): mezzanine hasil pre-transcode jika sudah siap, agar streamer berjalan dalam mode COPY."""
+    selected_video = get_slot_state(slot_id)["selected_video"]
+    return find_ready_mezzanine(selected_video, CONFIG["VIDEOS_DIR"], read_streamer_config()) or selected_video
+
+def record_stream_event(slot_id, event):
+    """Menyimpan event ke ring buffer slot dan memperbarui ringkasan status slot."""
+    if slot_id not in STREAM_EVENTS:
+        STREAM_EVENTS[slot_id] = deque(maxlen=EVENT_BUFFER_SIZE)
+    STREAM_EVENTS[slot_id].append(event)
+    status = STREAM_STATUS.setdefault(slot_id, {})
+    event_type = event.get("event")
+    if event_type == "state":
+        status["state"] = event.get("state")
+        status["reason"] = event.get("reason")
+        status["state_ts"] = event.get("ts")
+    elif event_type == "mode":
+        status["mode"] = event.get("mode")
+        status["handover"] = event.get("handover")
+    elif event_type == "retry":
+        status["retry"] = f"{event.get('attempt')}/{event.get('limit')}"
+        status["retry_reason"] = event.get("reason")
+        status["resume_at"] = event.get("resume_at")
+    elif event_type == "failure":
+        status["failure"] = event.get("category")
+        status["failure_detail"] = event.get("detail")
+    elif event_type == "stall":
+        status["stall_count"] = status.get("stall_count", 0) + 1
+        status["last_stall_ts"] = event.get("ts")
+    elif event_type in ("ffmpeg_exit", "exit"):
+        status[f"{event_type}_code"] = event.get("code")
+    elif event_type == "progress":
+        status["progress"] = event
+    elif event_type == "metrics":
+        status["metrics_port"] = event.get("port")
+    elif event_type == "destinations":
+        status["destinations"] = event.get("names")
+        status["relays"] = {}
+        status["ingest"] = {}
+    elif event_type == "bitrate":
+        status["target_bitrate_kbps"] = event.get("kbps")
+        status["bitrate_reason"] = event.get("reason")
+    elif event_type == "ingest":
+        status.setdefault("ingest", {})[event.get("name")] = event.get("active")
+    elif event_type == "relay":
+        status.setdefault("relays", {})[event.get("name")] = {"state": event.get("state"),
+                                                              "restarts": event.get("restarts", 0)}
+
+def get_recent_events(slot_id, limit=20, event_types=None, exclude_types=None):
+    events = list(STREAM_EVENTS.get(slot_id, ()))
+    if event_types:
+        events = [e for e in events if e.get("event") in event_types]
+    if exclude_types:
+        events = [e for e in events if e.get("event") not in exclude_types]
+    return events[-limit:]
+
+def format_progress(progress, target_bitrate_kbps=None):
+    """Ringkasan metrik progres FFmpeg, dengan peringatan jika speed < 1.0x atau bitrate turun."""
+    def fmt(value, pattern):
+        return pattern.format(value) if value is not None else "-"
+    text = (f"FPS: {fmt(progress.get('fps'), '{:.1f}')} | Bitrate: {fmt(progress.get('bitrate_kbps'), '{:.0f}')} kbps"
+            f" | Speed: {fmt(progress.get('speed'), '{:.2f}')}x"
+            f"\nDrop/Dup: {fmt(progress.get('drop_frames'), '{:.0f}')}/{fmt(progress.get('dup_frames'), '{:.0f}')}"
+            f" | Posisi: {timedelta(seconds=int(progress['out_time_s'])) if progress.get('out_time_s') is not None else '-'}")
+    age = time.time() - progress.get("ts", time.time())
+    if age > 30:
+        text += f"\n⚠️ Tidak ada progres baru selama {int(age)} detik."
+    if progress.get("speed") is not None and progress["speed"] < 1.0:
+        text += "\n⚠️ Speed di bawah 1.0x: encoder tidak mampu mengejar realtime."
+    if target_bitrate_kbps and progress.get("bitrate_kbps") is not None and progress["bitrate_kbps"] < 0.8 * target_bitrate_kbps:
+        text += f"\n⚠️ Bitrate di bawah 80% target ({target_bitrate_kbps} kbps)."
+    return text
+
+def format_stream_event(event):
+    ts = datetime.fromtimestamp(event.get("ts", time.time())).strftime('%H:%M:%S')
+    details = ", ".join(f"{k}={v}" for k, v in event.items() if k not in ("event", "ts", "slot") and v is not None)
+    return f"{ts} [{event.get('event')}] {details}"
+
+def _parse_stream_output_line(line):
+    """Baris JSON dengan kunci 'event' menjadi event apa adanya; baris lain menjadi event 'output'."""
+    if line.startswith('{'):
+        try:
+            event = json.loads(line)
+            if isinstance(event, dict) and "event" in event:
+                return event
+        except json.JSONDecodeError:
+            pass
+    return {"event": "output", "ts": time.time(), "message": line}
+
+async def notify_stream_failed(bot, slot_id, event):
+    """Mengirim pemberitahuan ke chat admin saat streamer menyerah (kegagalan tidak bisa pulih atau jatah retry habis)."""
+    status = STREAM_STATUS.get(slot_id, {})
+    category = status.get("failure") or event.get("reason")
+    text = f"❌ Live slot '{slot_id}' berhenti: {describe_failure(category)}."
+    if event.get("reason") == "retry_limit":
+        text += "\nJatah percobaan ulang sudah habis."
+    if status.get("failure_detail"):
+        text += f"\n\nLog FFmpeg:\n{status['failure_detail']}"
     try:
-        if platform.system() == "Windows":
-            subprocess.run(["taskkill", "/F", "/PID", str(pid)], check=True, capture_output=True)
-        else:
-            os.kill(pid, 15)
+        await bot.send_message(chat_id=CONFIG['ALLOWED_CHAT_ID'], text=text)
+    except Exception as e:
+        logger.warning(f"Gagal mengirim notifikasi kegagalan slot '{slot_id}': {e}")
 
-        time.sleep(2)
-        if os.path.exists(CONFIG['PID_FILE']):
-            os.remove(CONFIG['PID_FILE'])
-        logger.info(f"Proses streaming (PID: {pid}) dihentikan.")
-        return True
+async def _supervise_stream_process(slot_id, process, bot=None):
+    """Menguras stdout streamer menjadi event, lalu menunggu proses selesai dan membersihkan handle/PID file."""
+    try:
+        while True:
+            try:
+                raw_line = await process.stdout.readline()
+            except ValueError:
+                # Baris melebihi batas buffer; buang sisa baris tersebut agar pembacaan bisa lanjut.
+                raw_line = await process.stdout.read(STREAM_OUTPUT_LINE_LIMIT)
+            if not raw_line:
+                break
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if line:
+                event = _parse_stream_output_line(line)
+                record_stream_event(slot_id, event)
+                if bot and event.get("event") == "state" and event.get("state") == "failed":
+                    await notify_stream_failed(bot, slot_id, event)
     except Exception as e:
-        logger.error(f"Gagal menghentikan proses streaming (PID: {pid}): {e}", exc_info=True)
-        return False
+        logger.warning(f"Gagal membaca output streamer slot '{slot_id}': {e}")
+
+    returncode = await process.wait()
+    record_stream_event(slot_id, {"event": "exit", "ts": time.time(), "code": returncode})
+    if STREAM_PROCESSES.get(slot_id) is process:
+        STREAM_PROCESSES.pop(slot_id, None)
+        await asyncio.to_thread(_remove_pid_file, slot_id)
+    logger.info(f"Proses streaming slot '{slot_id}' (PID: {process.pid}) selesai dengan kode {returncode}.")
+
+async def start_stream_process(slot_id=DEFAULT_SLOT, bot=None):
+    """Memulai proses streaming untuk satu slot tanpa memblokir event loop. Jika bot diberikan, kegagalan fatal dilaporkan ke chat admin."""
+    async with _get_slot_lock(slot_id):
+        running, _ = is_stream_running(slot_id)
+        if running:
+            logger.info(f"Mencoba memulai stream slot '{slot_id}', tetapi sudah ada yang berjalan.")
+            return False
+
+        slot_state = get_slot_state(slot_id)
+        if not slot_state["selected_video"]:
+            logger.error(f"Tidak ada video yang dipilih untuk streaming di slot '{slot_id}'.")
+            return False
+
+        if not slot_state["is_stream_key_set"]:
+            logger.error(f"Kunci streaming slot '{slot_id}' belum diatur.")
+            return False
+
+        if not await asyncio.to_thread(os.path.exists, slot_state["selected_video"]):
+            logger.error(f"Video yang dipilih '{os.path.basename(slot_state['selected_video'])}' tidak ditemukan. Path: {slot_state['selected_video']}")
+            return False
+
+        try:
+            stream_source = await asyncio.to_thread(resolve_stream_source, slot_id)
+            streamer_dir = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-u", CONFIG['STREAM_SCRIPT_PATH'], "--slot", slot_id,
+                "--input", os.path.abspath(stream_source), "--key-file", get_stream_key_path(slot_id),
+                cwd=streamer_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=STREAM_OUTPUT_LINE_LIMIT,
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if platform.system() == "Windows" else 0)
+            STREAM_PROCESSES[slot_id] = process
+
+            def write_pid_file():
+                with open(get_pid_file(slot_id), 'w') as f:
+                    f.write(str(process.pid))
+            await asyncio.to_thread(write_pid_file)
+            STREAM_EVENTS.pop(slot_id, None)
+            STREAM_STATUS.pop(slot_id, None)
+            asyncio.create_task(_supervise_stream_process(slot_id, process, bot))
+            logger.info(f"Proses streaming slot '{slot_id}' dimulai dengan PID: {process.pid}")
+            return True
+        except Exception as e:
+            logger.error(f"Gagal memulai proses streaming slot '{slot_id}': {e}", exc_info=True)
+            return False
+
+async def _stop_adopted_pid(slot_id, pid, timeout):
+    """Menghentikan proses streamer adopsi (tanpa handle asyncio) dengan SIGTERM lalu SIGKILL."""
+    if platform.system() == "Windows":
+        process = await asyncio.create_subprocess_exec("taskkill", "/F", "/PID", str(pid),
+                                                       stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await process.wait()
+        return
+    os.kill(pid, signal.SIGTERM)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while _pid_alive(pid):
+        if loop.time() >= deadline:
+            logger.warning(f"Proses streaming slot '{slot_id}' (PID: {pid}) tidak berhenti dalam {timeout} detik. Mengirim SIGKILL.")
+            os.kill(pid, signal.SIGKILL)
+            break
+        await asyncio.sleep(0.2)
+
+async def stop_stream_process(slot_id, timeout=STOP_TIMEOUT_SECONDS):
+    """Menghentikan proses streaming satu slot: SIGTERM, tunggu tanpa memblokir, lalu SIGKILL jika melewati batas waktu."""
+    async with _get_slot_lock(slot_id):
+        running, pid = is_stream_running(slot_id)
+        if not running:
+            return True
+        try:
+            process = STREAM_PROCESSES.get(slot_id)
+            if process is not None and process.returncode is None:
+                if platform.system() == "Windows":
+                    process.terminate()
+                else:
+                    process.send_signal(signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(process.wait(), timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Proses streaming slot '{slot_id}' (PID: {pid}) tidak berhenti dalam {timeout} detik. Mengirim SIGKILL.")
+                    process.kill()
+                    await process.wait()
+                STREAM_PROCESSES.pop(slot_id, None)
+            else:
+                await _stop_adopted_pid(slot_id, pid, timeout)
+                ADOPTED_PIDS.pop(slot_id, None)
+
+            await asyncio.to_thread(_remove_pid_file, slot_id)
+            logger.info(f"Proses streaming slot '{slot_id}' (PID: {pid}) dihentikan.")
+            return True
+        except ProcessLookupError:
+            ADOPTED_PIDS.pop(slot_id, None)
+            await asyncio.to_thread(_remove_pid_file, slot_id)
+            return True
+        except Exception as e:
+            logger.error(f"Gagal menghentikan proses streaming slot '{slot_id}' (PID: {pid}): {e}", exc_info=True)
+            return False
+
+async def stop_all_streams(application: Application) -> None:
+    """Dipanggil saat bot dimatikan: hentikan streamer yang dijalankan sesi ini secara rapi."""
+    slots = [slot_id for slot_id, process in STREAM_PROCESSES.items() if process.returncode is None]
+    if slots:
+        logger.info(f"Bot dimatikan. Menghentikan streaming slot: {', '.join(slots)}")
+        await asyncio.gather(*(stop_stream_process(slot_id) for slot_id in slots))
 
 async def send_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Mengirim menu utama bot hanya dengan ReplyKeyboardMarkup."""
@@ -326,9 +601,10 @@ async def send_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [KeyboardButton("🔑 Atur Kunci Streaming"), KeyboardButton("🔴 Mulai Live"), KeyboardButton("⏹️ Hentikan Live")],
         [KeyboardButton("⏰ Jadwal Hentikan Live"), KeyboardButton("🗑️ Hapus Video")],
         [KeyboardButton("⚙️ Status & Konfigurasi"), KeyboardButton("🟢 Cek Status Live"), KeyboardButton("📄 Lihat Log FFmpeg")],
-        [KeyboardButton("◀️ Kembali")] 
+        [KeyboardButton("📺 Pilih Slot"), KeyboardButton("◀️ Kembali")]
     ]
     reply_markup = ReplyKeyboardMarkup(reply_keyboard, resize_keyboard=True, one_time_keyboard=False)
+    menu_text = f"Pilih aksi (slot aktif: {get_active_slot()}):"
     
     target_message = None
     if update.message:
@@ -336,10 +612,10 @@ async def send_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif update.callback_query:
         target_message = update.callback_query.message
     else: 
-        await context.bot.send_message(chat_id=CONFIG['ALLOWED_CHAT_ID'], text="Pilih aksi:", reply_markup=reply_markup)
+        await context.bot.send_message(chat_id=CONFIG['ALLOWED_CHAT_ID'], text=menu_text, reply_markup=reply_markup)
         return
 
-    await target_message.reply_text("Pilih aksi:", reply_markup=reply_markup)
+    await target_message.reply_text(menu_text, reply_markup=reply_markup)
 
 
 # --- Handler Perintah Telegram ---
@@ -360,32 +636,67 @@ async def button_callback_handler(update: Update, context: ContextTypes.DEFAULT_
         await send_main_menu(update, context)
         return ConversationHandler.END
 
-    if action.startswith("select_video_"):
-        video_name = action.replace("select_video_", "")
-        selected_path = os.path.join(CONFIG["VIDEOS_DIR"], video_name) 
-        if os.path.exists(selected_path):
-            BOT_STATE["selected_video"] = selected_path
+    if action.startswith("log_view_"):
+        level = action.replace("log_view_", "")
+        await send_log_tail(query.message, get_active_slot(), level=None if level == "all" else level)
+        return ConversationHandler.END
+    elif action == "log_download":
+        await send_full_log(query.message, get_active_slot())
+        return ConversationHandler.END
+
+    if action.startswith("select_slot_"):
+        slot_id = action.replace("select_slot_", "")
+        if slot_id in BOT_STATE["streams"]:
+            BOT_STATE["active_slot"] = slot_id
             save_bot_state()
-            await query.edit_message_text(f"Video '{video_name}' telah dipilih.\nSekarang Anda bisa memulai live.")
+            await query.edit_message_text(f"Slot aktif sekarang: '{slot_id}'.")
         else:
-            await query.edit_message_text(f"Video '{video_name}' tidak ditemukan. Silakan pilih lagi.")
+            await query.edit_message_text(f"Slot '{slot_id}' tidak ditemukan.")
         await send_main_menu(update, context)
         return ConversationHandler.END
-    elif action.startswith("delete_video_"):
-        video_name = action.replace("delete_video_", "")
-        video_path = os.path.join(CONFIG["VIDEOS_DIR"], video_name)
-        if os.path.exists(video_path):
+    elif action.startswith("video_page_") or action.startswith("video_clear_"):
+        list_action, _, page = action.split("_", 2)[2].partition("_")
+        if action.startswith("video_clear_"):
+            context.user_data.pop("video_query", None)
+        _, text, reply_markup = await asyncio.to_thread(
+            build_video_list, list_action, int(page or 0), context.user_data.get("video_query"))
+        await query.edit_message_text(text, reply_markup=reply_markup)
+        return SELECT_VIDEO_STATE if list_action == "select" else DELETE_VIDEO_STATE
+    elif re.fullmatch(r"select_video_\d+", action):
+        video = await asyncio.to_thread(video_library.get_video, int(action.replace("select_video_", "")))
+        if video and await asyncio.to_thread(os.path.exists, video["path"]):
+            slot_id = get_active_slot()
+            get_slot_state(slot_id)["selected_video"] = video["path"]
+            save_bot_state()
+            await query.edit_message_text(f"Video '{video['name']}' telah dipilih untuk slot '{slot_id}'.\nSekarang Anda bisa memulai live.")
+        else:
+            await query.edit_message_text("Video tidak ditemukan. Silakan pilih lagi.")
+        await send_main_menu(update, context)
+        return ConversationHandler.END
+    elif re.fullmatch(r"delete_video_\d+", action):
+        video_id = int(action.replace("delete_video_", ""))
+        video = await asyncio.to_thread(video_library.get_video, video_id)
+        if video:
+            video_name, video_path = video["name"], video["path"]
             try:
-                os.remove(video_path)
+                removed_path = None
+                if await asyncio.to_thread(os.path.lexists, video_path):
+                    # Isi file (objek) hanya dihapus jika tidak ada alias lain yang memakainya.
+                    removed_path = await asyncio.to_thread(content_store.remove_alias, video_path, CONFIG["VIDEOS_DIR"])
+                await asyncio.to_thread(video_library.remove_video, video_id)
+                if removed_path:
+                    await asyncio.to_thread(forget_media, removed_path)
+                    await asyncio.to_thread(remove_mezzanines, removed_path, CONFIG["VIDEOS_DIR"])
                 await query.edit_message_text(f"Video '{video_name}' berhasil dihapus.")
-                if BOT_STATE["selected_video"] == video_path:
-                    BOT_STATE["selected_video"] = None
-                    save_bot_state()
+                for slot_state in BOT_STATE["streams"].values():
+                    if slot_state["selected_video"] == video_path:
+                        slot_state["selected_video"] = None
+                save_bot_state()
             except Exception as e:
                 logger.error(f"Gagal menghapus video '{video_name}': {e}", exc_info=True)
                 await query.edit_message_text(f"Gagal menghapus video '{video_name}': {e}")
         else:
-            await query.edit_message_text(f"Video '{video_name}' tidak ditemukan.")
+            await query.edit_message_text("Video tidak ditemukan.")
         await send_main_menu(update, context)
         return ConversationHandler.END
 
@@ -405,42 +716,16 @@ async def handle_video_upload(update: Update, context: ContextTypes.DEFAULT_TYPE
         logger.info(f"Dokumen diterima: {doc.file_name} (MIME: {doc.mime_type}, Size: {doc.file_size} bytes)")
 
         file_extension = os.path.splitext(doc.file_name)[1].lower()
-        
-        streamer_dir_for_config_path = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-        streamer_config_path = os.path.join(streamer_dir_for_config_path, "config.json")
-        allowed_extensions = []
-        try:
-            with open(streamer_config_path, 'r') as f:
-                streamer_conf = json.load(f)
-            allowed_extensions = [ext.lower() for ext in streamer_conf.get("VIDEO_EXTENSIONS", [])]
-            logger.info(f"Ekstensi video yang diizinkan dari streamer config: {allowed_extensions}")
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Gagal membaca streamer config dari '{streamer_config_path}'. Menggunakan ekstensi default untuk upload: {e}", exc_info=True)
-            allowed_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.webm']
+        allowed_extensions = read_streamer_config()["VIDEO_EXTENSIONS"]
 
         if file_extension in allowed_extensions:
-            file_id = doc.file_id
-            logger.info(f"File extension {file_extension} diizinkan. Mengambil file dengan file_id: {file_id}")
-            new_file = await context.bot.get_file(file_id)
-            
-            videos_dir_abs = CONFIG["VIDEOS_DIR"] 
-            os.makedirs(videos_dir_abs, exist_ok=True)
-
-            target_path = os.path.join(videos_dir_abs, doc.file_name)
-            base_name, ext = os.path.splitext(doc.file_name)
-            counter = 1
-            while os.path.exists(target_path):
-                target_path = os.path.join(videos_dir_abs, f"{base_name}_{counter}{ext}")
-                counter += 1
-            
-            logger.info(f"Akan mengunduh file ke: {target_path}")
-            try:
-                await new_file.download_to_drive(target_path)
-                logger.info(f"File berhasil diunduh ke {target_path}")
-                await update.message.reply_text(f"Video '{os.path.basename(target_path)}' berhasil diunggah dan disimpan.")
-            except Exception as e:
-                logger.error(f"Gagal mengunduh video ke '{target_path}': {e}", exc_info=True)
-                await update.message.reply_text(f"Gagal mengunggah video: {e}\nPeriksa log bot untuk detail.")
+            if doc.file_unique_id in ACTIVE_UPLOADS:
+                await update.message.reply_text(f"File '{doc.file_name}' sedang diunduh. Tunggu hingga selesai.")
+            else:
+                logger.info(f"File extension {file_extension} diizinkan. Mengunduh file dengan file_id: {doc.file_id}")
+                ACTIVE_UPLOADS.add(doc.file_unique_id)
+                # Unduhan berjalan di latar belakang agar bot tetap responsif dan beberapa upload bisa berjalan bersamaan.
+                context.application.create_task(ingest_upload(update.message, context, doc, file_extension))
         else:
             logger.warning(f"File extension {file_extension} tidak diizinkan untuk upload video.")
             await update.message.reply_text(f"Format file '{file_extension}' tidak didukung sebagai video. Ekstensi yang didukung: {', '.join(allowed_extensions)}")
@@ -452,73 +737,246 @@ async def handle_video_upload(update: Update, context: ContextTypes.DEFAULT_TYPE
     await send_main_menu(update.message, context)
     return ConversationHandler.END
 
-async def list_videos_for_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    message_to_reply = update.message if update.message else update.callback_query.message
+async def _edit_status(message, text):
+    try:
+        await message.edit_text(text)
+    except Exception as e:
+        logger.warning(f"Gagal memperbarui pesan status upload: {e}")
+
+async def ingest_upload(message, context: ContextTypes.DEFAULT_TYPE, doc, file_extension):
+    """
+    Mengunduh upload per potongan ke file sementara (bisa dilanjutkan), memverifikasinya dengan probe,
+    lalu baru memunculkannya di library lewat rename/symlink atomik. Progres ditampilkan di pesan yang diedit.
+    """
+    videos_dir_abs = CONFIG["VIDEOS_DIR"]
+    name = doc.file_name
+    status_message = await message.reply_text(f"⏳ Mengunduh '{name}'...")
+    incoming_path = content_store.get_incoming_path(videos_dir_abs, doc.file_unique_id)
+    last_report = [0.0]
+
+    async def report_progress(done, total):
+        now = time.monotonic()
+        if now - last_report[0] < UPLOAD_PROGRESS_INTERVAL_SECONDS:
+            return
+        last_report[0] = now
+        mb = 1024 * 1024
+        progress_text = f"{done / total * 100:.0f}% ({done / mb:.1f}/{total / mb:.1f} MB)" if total else f"{done / mb:.1f} MB"
+        await _edit_status(status_message, f"⏳ Mengunduh '{name}': {progress_text}")
 
-    videos_dir_abs = CONFIG["VIDEOS_DIR"] 
-    video_files = [f for f in os.listdir(videos_dir_abs) if os.path.isfile(os.path.join(videos_dir_abs, f))]
-    
-    streamer_dir_for_config_path = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-    streamer_config_path = os.path.join(streamer_dir_for_config_path, "config.json")
-    allowed_extensions = []
     try:
-        with open(streamer_config_path, 'r') as f:
-            streamer_conf = json.load(f)
-        allowed_extensions = [ext.lower() for ext in streamer_conf.get("VIDEO_EXTENSIONS", [])]
-    except (FileNotFoundError, json.JSONDecodeError):
-        logger.error(f"Gagal membaca streamer config dari '{streamer_config_path}'. Menggunakan ekstensi default.")
-        allowed_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.webm']
+        if CONFIG["LOCAL_BOT_API_URL"]:
+            # Server Bot API lokal sudah menulis file ke disk; cukup dipindahkan (hardlink/rename), tanpa unduh ulang.
+            new_file = await context.bot.get_file(doc.file_id, read_timeout=LOCAL_GET_FILE_TIMEOUT_SECONDS)
+            source_path = upload_ingest.map_local_path(new_file.file_path, CONFIG["LOCAL_BOT_API_DIR_MAP"])
+            await _edit_status(status_message, f"📥 Memindahkan '{name}' dari server Bot API lokal...")
+            digest = await asyncio.to_thread(upload_ingest.handoff_local_file, source_path, incoming_path,
+                                             CONFIG["LOCAL_FILE_HANDOFF"])
+        else:
+            new_file = await context.bot.get_file(doc.file_id)
+            digest = await upload_ingest.download_resumable(new_file.file_path, incoming_path, doc.file_size, report_progress)
+        await _edit_status(status_message, f"🔎 Memverifikasi '{name}'...")
+        object_path, is_duplicate = await asyncio.to_thread(
+            content_store.store_object, incoming_path, digest, file_extension, videos_dir_abs)
+
+        # Verifikasi cepat sebelum file muncul di library: harus ada stream video yang terbaca ffprobe.
+        # Hasil probe ini sekaligus mengisi cache agar "Mulai Live" tidak perlu menjalankan ffprobe lagi.
+        media_info = await asyncio.to_thread(probe_media, object_path)
+        if not media_info or not media_info.get("video_codec"):
+            if not is_duplicate:
+                await asyncio.to_thread(os.remove, object_path)
+                await asyncio.to_thread(forget_media, object_path)
+            await _edit_status(status_message, f"❌ '{name}' bukan video yang valid atau file rusak. File dibuang.")
+            return
+
+        existing_aliases = await asyncio.to_thread(content_store.find_aliases, videos_dir_abs, object_path) if is_duplicate else []
+        target_path = await asyncio.to_thread(content_store.create_alias, object_path, videos_dir_abs, name)
+        await asyncio.to_thread(video_library.add_video, target_path, media_info)
+        logger.info(f"File berhasil diunggah: {target_path} -> {object_path} (sha256 {digest[:12]}, duplikat: {is_duplicate})")
+
+        info_text = f"\nCodec: {media_info.get('video_codec') or '-'} / {media_info.get('audio_codec') or '-'}"
+        if media_info.get("width") and media_info.get("height"):
+            info_text += f", {media_info['width']}x{media_info['height']}"
+        if media_info.get("fps"):
+            info_text += f" @ {media_info['fps']:g} fps"
+        if is_duplicate:
+            names = ", ".join(f"'{os.path.basename(a)}'" for a in existing_aliases) or "file yang sudah ada"
+            info_text += f"\n♻️ Isi video ini sama dengan {names}. File tidak disimpan ulang; metadata dan hasil transcode dipakai kembali."
+        await _edit_status(status_message, f"✅ Video '{os.path.basename(target_path)}' berhasil diunggah dan disimpan.{info_text}")
+        if CONFIG.get("PRETRANSCODE_ON_UPLOAD", True):
+            await queue_pretranscode(message, context, target_path)
+    except Exception as e:
+        # File sementara sengaja tidak dihapus: mengirim ulang file yang sama akan melanjutkan unduhan.
+        logger.error(f"Gagal mengunduh video '{name}': {e}", exc_info=True)
+        await _edit_status(status_message, f"❌ Gagal mengunggah '{name}': {e}\nKirim ulang file yang sama untuk melanjutkan unduhan.")
+    finally:
+        ACTIVE_UPLOADS.discard(doc.file_unique_id)
+
+async def queue_pretranscode(message, context: ContextTypes.DEFAULT_TYPE, video_path):
+    """Memasukkan video ke antrean pre-transcode dan memantau progresnya lewat pesan yang diedit."""
+    settings = read_streamer_config()
+    try:
+        job = await asyncio.to_thread(submit_transcode, video_path, CONFIG["VIDEOS_DIR"], settings)
+    except Exception as e:
+        logger.error(f"Gagal memasukkan '{video_path}' ke antrean pre-transcode: {e}", exc_info=True)
+        return
+    if job is None:
+        return
+    if job["status"] == "done":
+        await message.reply_text("File siap di-stream sudah tersedia. Live akan berjalan dalam mode COPY.")
+        return
 
-    valid_video_files = [f for f in video_files if os.path.splitext(f)[1].lower() in allowed_extensions]
+    status_message = await message.reply_text(f"⏳ Pre-transcode '{os.path.basename(video_path)}' dimasukkan ke antrean...")
+    context.job_queue.run_repeating(
+        pretranscode_progress_callback, interval=10, first=5,
+        chat_id=status_message.chat_id, name=f"pretranscode_{status_message.message_id}",
+        data={"source": video_path, "message_id": status_message.message_id, "last_text": None}
+    )
 
-    if not valid_video_files:
-        await message_to_reply.reply_text("Tidak ada video yang ditemukan di folder 'uploaded_videos'.")
-        await send_main_menu(update, context)
-        return ConversationHandler.END
+async def pretranscode_progress_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    job = context.job
+    source = job.data["source"]
+    transcode_job = get_job(source)
+    name = os.path.basename(source)
+    if transcode_job is None:
+        job.schedule_removal()
+        return
+
+    if transcode_job["status"] == "queued":
+        text = f"⏳ Pre-transcode '{name}' menunggu giliran di antrean..."
+    elif transcode_job["status"] == "running":
+        text = f"⚙️ Pre-transcode '{name}': {transcode_job['progress'] * 100:.0f}%"
+    elif transcode_job["status"] == "done":
+        text = f"✅ Pre-transcode '{name}' selesai. Live berikutnya akan berjalan dalam mode COPY."
+        job.schedule_removal()
+    else:
+        text = f"❌ Pre-transcode '{name}' gagal: {transcode_job['error']}\nLive tetap bisa berjalan dengan re-encode."
+        job.schedule_removal()
+
+    if text != job.data["last_text"]:
+        job.data["last_text"] = text
+        try:
+            await context.bot.edit_message_text(text, chat_id=job.chat_id, message_id=job.data["message_id"])
+        except Exception as e:
+            logger.warning(f"Gagal memperbarui pesan progres pre-transcode: {e}")
+
+def format_duration(seconds):
+    return str(timedelta(seconds=int(seconds))) if seconds else "-"
+
+def build_video_list(list_action, page=0, query=None):
+    """
+    Membangun teks dan keyboard satu halaman library untuk list_action 'select' atau 'delete'.
+    Mengembalikan (total video yang cocok, teks, InlineKeyboardMarkup).
+    """
+    videos, total = video_library.list_videos(page * VIDEO_PAGE_SIZE, VIDEO_PAGE_SIZE, query)
+    if not videos and page > 0:
+        page = max(0, (total - 1) // VIDEO_PAGE_SIZE)
+        videos, total = video_library.list_videos(page * VIDEO_PAGE_SIZE, VIDEO_PAGE_SIZE, query)
+    selected_video = get_slot_state(get_active_slot())["selected_video"]
 
     keyboard = []
-    for video in valid_video_files:
-        current_video_abs_path = os.path.join(videos_dir_abs, video)
-        is_selected = " ✅" if current_video_abs_path == BOT_STATE["selected_video"] else ""
-        keyboard.append([InlineKeyboardButton(f"🎬 {video}{is_selected}", callback_data=f"select_video_{video}")])
+    for video in videos:
+        name = video["name"]
+        if len(name) > VIDEO_BUTTON_NAME_LIMIT:
+            name = name[:VIDEO_BUTTON_NAME_LIMIT - 1] + "…"
+        copy_marker = " ⚡" if video["copy_eligible"] else ""
+        if list_action == "select":
+            selected_marker = " ✅" if video["path"] == selected_video else ""
+            label = f"🎬 {name} ({format_duration(video['duration'])}){copy_marker}{selected_marker}"
+        else:
+            label = f"🗑️ {name} ({video['size'] / (1024 * 1024):.0f} MB)"
+        keyboard.append([InlineKeyboardButton(label, callback_data=f"{list_action}_video_{video['id']}")])
+
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton("⬅️ Sebelumnya", callback_data=f"video_page_{list_action}_{page - 1}"))
+    if (page + 1) * VIDEO_PAGE_SIZE < total:
+        navigation.append(InlineKeyboardButton("Berikutnya ➡️", callback_data=f"video_page_{list_action}_{page + 1}"))
+    if navigation:
+        keyboard.append(navigation)
+    if query:
+        keyboard.append([InlineKeyboardButton("✖️ Hapus Filter Pencarian", callback_data=f"video_clear_{list_action}")])
     keyboard.append([InlineKeyboardButton("◀️ Kembali ke Menu Utama", callback_data="main_menu")])
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await message_to_reply.reply_text("Pilih video yang ingin di-stream:", reply_markup=reply_markup)
-    return SELECT_VIDEO_STATE
+    title = "Pilih video yang ingin di-stream" if list_action == "select" else "Pilih video yang ingin dihapus"
+    if query:
+        title += f" (cari: '{query}')"
+    pages = max(1, (total + VIDEO_PAGE_SIZE - 1) // VIDEO_PAGE_SIZE)
+    text = f"{title}:\nHalaman {page + 1}/{pages}, {total} video."
+    if list_action == "select":
+        text += "\n⚡ = bisa di-stream tanpa re-encode."
+    if not total:
+        text += "\nTidak ada video yang cocok." if query else "\nBelum ada video."
+    text += "\nCari dengan /cari <nama>."
+    return total, text, InlineKeyboardMarkup(keyboard)
+
+async def _list_videos(update: Update, context: ContextTypes.DEFAULT_TYPE, list_action, empty_text, state):
+    message_to_reply = update.message if update.message else update.callback_query.message
+    query = context.user_data.get("video_query")
+    total, text, reply_markup = await asyncio.to_thread(build_video_list, list_action, 0, query)
+    if not total and not query:
+        await message_to_reply.reply_text(empty_text)
+        await send_main_menu(update, context)
+        return ConversationHandler.END
+    await message_to_reply.reply_text(text, reply_markup=reply_markup)
+    return state
+
+async def list_videos_for_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    return await _list_videos(update, context, "select",
+                              "Tidak ada video yang ditemukan di folder 'uploaded_videos'.", SELECT_VIDEO_STATE)
 
 async def list_videos_for_deletion(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    message_to_reply = update.message if update.message else update.callback_query.message
+    return await _list_videos(update, context, "delete",
+                              "Tidak ada video yang ditemukan untuk dihapus di folder 'uploaded_videos'.", DELETE_VIDEO_STATE)
 
-    videos_dir_abs = CONFIG["VIDEOS_DIR"] 
-    video_files = [f for f in os.listdir(videos_dir_abs) if os.path.isfile(os.path.join(videos_dir_abs, f))]
-    
-    streamer_dir_for_config_path = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-    streamer_config_path = os.path.join(streamer_dir_for_config_path, "config.json")
-    allowed_extensions = []
-    try:
-        with open(streamer_config_path, 'r') as f:
-            streamer_conf = json.load(f)
-        allowed_extensions = [ext.lower() for ext in streamer_conf.get("VIDEO_EXTENSIONS", [])]
-    except (FileNotFoundError, json.JSONDecodeError):
-        logger.error(f"Gagal membaca streamer config dari '{streamer_config_path}'. Menggunakan ekstensi default.")
-        allowed_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.webm']
+async def search_videos_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/cari <nama> - memfilter daftar video berdasarkan nama; /cari tanpa argumen menghapus filter."""
+    if not await check_auth(update, context): return
+    query = " ".join(context.args or []).strip()
+    if query:
+        context.user_data["video_query"] = query
+    else:
+        context.user_data.pop("video_query", None)
+    return await list_videos_for_selection(update, context)
 
-    valid_video_files = [f for f in video_files if os.path.splitext(f)[1].lower() in allowed_extensions]
 
-    if not valid_video_files:
-        await message_to_reply.reply_text("Tidak ada video yang ditemukan untuk dihapus di folder 'uploaded_videos'.")
-        await send_main_menu(update, context)
-        return ConversationHandler.END
+# --- Manajemen Slot Streaming ---
+async def list_slots_for_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message_to_reply = update.message if update.message else update.callback_query.message
 
     keyboard = []
-    for video in valid_video_files:
-        keyboard.append([InlineKeyboardButton(f"🗑️ {video}", callback_data=f"delete_video_{video}")])
+    for slot_id in list_slots():
+        running, _ = is_stream_running(slot_id)
+        marker = " ✅" if slot_id == get_active_slot() else ""
+        status = "🔴" if running else "⚪"
+        keyboard.append([InlineKeyboardButton(f"{status} {slot_id}{marker}", callback_data=f"select_slot_{slot_id}")])
+    keyboard.append([InlineKeyboardButton("➕ Slot Baru", callback_data="new_slot_inline")])
     keyboard.append([InlineKeyboardButton("◀️ Kembali ke Menu Utama", callback_data="main_menu")])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await message_to_reply.reply_text("Pilih video yang ingin dihapus:", reply_markup=reply_markup)
-    return DELETE_VIDEO_STATE
+    await message_to_reply.reply_text("Pilih slot streaming yang ingin dikelola:", reply_markup=reply_markup)
+    return SELECT_SLOT_STATE
+
+async def new_slot_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_text("Kirim nama slot baru (huruf, angka, '_' atau '-', maks. 32 karakter).")
+    return NEW_SLOT_STATE
+
+async def receive_new_slot(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not await check_auth(update, context): return ConversationHandler.END
+
+    slot_id = update.message.text.strip()
+    if not SLOT_ID_PATTERN.fullmatch(slot_id):
+        await update.message.reply_text("Nama slot tidak valid. Gunakan huruf, angka, '_' atau '-' (maks. 32 karakter).")
+        return NEW_SLOT_STATE
+
+    get_slot_state(slot_id)
+    get_slot_dir(slot_id)
+    BOT_STATE["active_slot"] = slot_id
+    save_bot_state()
+    await update.message.reply_text(f"Slot '{slot_id}' siap dan sekarang aktif. Pilih video dan atur kunci streaming untuk slot ini.")
+    await send_main_menu(update.message, context)
+    return ConversationHandler.END
 
 
 # --- Conversation Handlers ---
@@ -539,10 +997,9 @@ async def receive_stream_key(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("Kunci streaming tidak boleh kosong. Silakan coba lagi.")
         return ENTER_KEY_STATE
     
-    if write_stream_key_to_file(stream_key):
-        await update.message.reply_text("Kunci streaming berhasil disimpan!")
-        BOT_STATE["is_stream_key_set"] = True
-        save_bot_state()
+    slot_id = get_active_slot()
+    if write_stream_key_to_file(stream_key, slot_id):
+        await update.message.reply_text(f"Kunci streaming untuk slot '{slot_id}' berhasil disimpan!")
     else:
         await update.message.reply_text("Gagal menyimpan kunci streaming. Periksa log bot.")
 
@@ -563,195 +1020,270 @@ async def start_live_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     message = update.message if update.message else update.callback_query.message
     if not await check_auth(update, context): return
 
-    running, _ = is_stream_running()
+    slot_id = get_active_slot()
+    slot_state = get_slot_state(slot_id)
+    running, _ = is_stream_running(slot_id)
     if running:
-        await message.reply_text("Streaming sudah berjalan.")
+        await message.reply_text(f"Streaming slot '{slot_id}' sudah berjalan.")
         return
 
-    if not BOT_STATE["selected_video"]:
-        await message.reply_text("Anda belum memilih video. Silakan pilih video terlebih dahulu dari menu 'Pilih Video'.")
+    if not slot_state["selected_video"]:
+        await message.reply_text(f"Anda belum memilih video untuk slot '{slot_id}'. Silakan pilih video terlebih dahulu dari menu 'Pilih Video'.")
         return
     
-    if not BOT_STATE["is_stream_key_set"]:
-        await message.reply_text("Kunci streaming belum diatur. Silakan masukkan kunci streaming terlebih dahulu dari menu 'Atur Kunci Streaming'.")
+    if not slot_state["is_stream_key_set"]:
+        await message.reply_text(f"Kunci streaming slot '{slot_id}' belum diatur. Silakan masukkan kunci streaming terlebih dahulu dari menu 'Atur Kunci Streaming'.")
         return
 
-    if not os.path.exists(BOT_STATE["selected_video"]):
-        await message.reply_text(f"Video yang dipilih '{os.path.basename(BOT_STATE['selected_video'])}' tidak ditemukan. Silakan pilih video lain.")
-        BOT_STATE["selected_video"] = None
+    if not await asyncio.to_thread(os.path.exists, slot_state["selected_video"]):
+        await message.reply_text(f"Video yang dipilih '{os.path.basename(slot_state['selected_video'])}' tidak ditemukan. Silakan pilih video lain.")
+        slot_state["selected_video"] = None
         save_bot_state()
         return
 
-    await message.reply_text("Memulai streaming, mohon tunggu...")
+    transcode_job = get_job(slot_state["selected_video"])
+    if transcode_job and transcode_job["status"] in ("queued", "running"):
+        await message.reply_text("Pre-transcode video ini belum selesai, live dimulai dengan file asli (re-encode).")
 
-    streamer_dir = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-    streamer_config_path = os.path.join(streamer_dir, "config.json")
-    
-    allowed_extensions = []
-    try:
-        with open(streamer_config_path, 'r') as f:
-            streamer_conf = json.load(f)
-        allowed_extensions = [ext.lower() for ext in streamer_conf.get("VIDEO_EXTENSIONS", [])]
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Gagal membaca streamer config dari '{streamer_config_path}'. Menggunakan ekstensi default untuk pembersihan: {e}")
-        allowed_extensions = ['.mp4', '.mkv', '.avi', '.mov', '.flv', '.webm']
-
-    selected_video_filename = os.path.basename(BOT_STATE["selected_video"])
-    destination_path_for_streamer = os.path.join(streamer_dir, selected_video_filename)
-
-    for f in os.listdir(streamer_dir):
-        file_ext = os.path.splitext(f)[1].lower()
-        if file_ext in allowed_extensions and f != selected_video_filename:
-            try:
-                full_path_to_remove = os.path.join(streamer_dir, f)
-                if os.path.islink(full_path_to_remove):
-                    os.unlink(full_path_to_remove)
-                    logger.info(f"Menghapus symlink lama di direktori streamer: {full_path_to_remove}")
-                elif os.path.isfile(full_path_to_remove):
-                    os.remove(full_path_to_remove)
-                    logger.info(f"Menghapus video fisik lama di direktori streamer: {full_path_to_remove}")
-            except Exception as ex:
-                logger.warning(f"Gagal menghapus video/symlink lama {f}: {ex}")
-
-    try:
-        if not os.path.exists(destination_path_for_streamer) or \
-           not os.path.islink(destination_path_for_streamer) or \
-           (os.path.islink(destination_path_for_streamer) and os.readlink(destination_path_for_streamer) != BOT_STATE["selected_video"]):
-            
-            if os.path.exists(destination_path_for_streamer):
-                try:
-                    os.unlink(destination_path_for_streamer)
-                except OSError as ose:
-                    if ose.errno == 21:
-                        pass 
-                    else:
-                        os.remove(destination_path_for_streamer)
-                except Exception as ex:
-                    logger.warning(f"Gagal membersihkan tujuan symlink {destination_path_for_streamer}: {ex}")
-
-            os.symlink(BOT_STATE["selected_video"], destination_path_for_streamer)
-            logger.info(f"Membuat symlink: {BOT_STATE['selected_video']} -> {destination_path_for_streamer}")
-        else:
-            logger.info(f"Symlink {destination_path_for_streamer} sudah ada dan menunjuk ke video yang benar.")
-
-    except Exception as e:
-        logger.error(f"Gagal menyiapkan video untuk streamer (symlink/copy): {e}", exc_info=True)
-        await message.reply_text(f"Gagal menyiapkan video untuk streamer (symlink/copy): {e}\nCoba secara manual menempatkan video yang dipilih di folder yang sama dengan streamer.py.")
-        return
+    await message.reply_text(f"Memulai streaming slot '{slot_id}', mohon tunggu...")
 
-    if start_stream_process():
-        await message.reply_text("Streaming berhasil dimulai! Cek log FFmpeg untuk detail.")
+    if await start_stream_process(slot_id, bot=context.bot):
+        await message.reply_text(f"Streaming slot '{slot_id}' berhasil dimulai! Cek log FFmpeg untuk detail.")
     else:
         await message.reply_text("Gagal memulai streaming. Periksa log bot.")
 
+def cancel_scheduled_stop(context: ContextTypes.DEFAULT_TYPE, slot_id):
+    """Membatalkan jadwal penghentian sekali jalan slot. Mengembalikan True jika ada jadwal yang dibatalkan."""
+    cancelled = [entry["id"] for entry in get_schedules(slot_id) if entry["kind"] == "once" and entry["action"] == "stop"]
+    for schedule_id in cancelled:
+        remove_schedule(context.job_queue, schedule_id)
+    return bool(cancelled)
+
 async def stop_live_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     message = update.message if update.message else update.callback_query.message
     if not await check_auth(update, context): return
 
-    running, pid = is_stream_running()
+    slot_id = get_active_slot()
+    running, pid = is_stream_running(slot_id)
     if not running:
-        await message.reply_text("Streaming tidak sedang berjalan.")
+        await message.reply_text(f"Streaming slot '{slot_id}' tidak sedang berjalan.")
     else:
-        if BOT_STATE["scheduled_stop_job_name"]:
-            current_jobs = context.job_queue.get_jobs_by_name(BOT_STATE["scheduled_stop_job_name"])
-            for job in current_jobs:
-                job.schedule_removal()
-            BOT_STATE["scheduled_stop_job_name"] = None
-            save_bot_state()
+        if cancel_scheduled_stop(context, slot_id):
             await message.reply_text("Jadwal penghentian live telah dibatalkan.")
 
-        await message.reply_text(f"Menghentikan streaming (PID: {pid}), mohon tunggu...")
-        if stop_stream_process(pid):
-            await message.reply_text("Streaming berhasil dihentikan.")
-        else:
-            await message.reply_text("Gagal menghentikan streaming. Periksa log bot.")
+        await message.reply_text(f"Menghentikan streaming slot '{slot_id}' (PID: {pid}), mohon tunggu...")
 
-async def scheduled_stop_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
-    job = context.job
-    chat_id = job.chat_id
-    await context.bot.send_message(chat_id=chat_id, text=f"Waktu yang dijadwalkan telah tiba. Menghentikan live...")
-    running, pid = is_stream_running()
-    if running:
-        if stop_stream_process(pid):
-            await context.bot.send_message(chat_id=chat_id, text="Streaming berhasil dihentikan secara terjadwal.")
+        async def stop_and_report():
+            if await stop_stream_process(slot_id):
+                await message.reply_text(f"Streaming slot '{slot_id}' berhasil dihentikan.")
+            else:
+                await message.reply_text("Gagal menghentikan streaming. Periksa log bot.")
+        # Dijalankan di latar belakang agar update Telegram lain tetap diproses selama menunggu.
+        context.application.create_task(stop_and_report())
+
+# --- Jadwal Live Persisten ---
+
+def get_schedule_tz():
+    """Zona waktu jadwal (TIMEZONE dari config.json streamer), jatuh ke zona waktu sistem jika tidak dikenal."""
+    try:
+        return ZoneInfo(read_streamer_config()["TIMEZONE"])
+    except ZoneInfoNotFoundError:
+        logger.warning(f"TIMEZONE '{read_streamer_config()['TIMEZONE']}' tidak dikenal. Jadwal memakai zona waktu sistem.")
+        return datetime.now().astimezone().tzinfo
+
+def get_schedules(slot_id=None):
+    schedules = [entry for entry in BOT_STATE["schedules"].values() if slot_id is None or entry["slot_id"] == slot_id]
+    return sorted(schedules, key=lambda entry: entry["created_at"])
+
+def arm_schedule(job_queue, entry):
+    """Memasang job_queue untuk tepi jadwal berikutnya (menggantikan job lama). Mengembalikan (epoch, aksi) atau None."""
+    job_name = f"schedule_{entry['id']}"
+    for job in job_queue.get_jobs_by_name(job_name):
+        job.schedule_removal()
+    tz = get_schedule_tz()
+    upcoming = live_scheduler.next_run(entry, tz)
+    if upcoming is None:
+        return None
+    run_at, action = upcoming
+    job_queue.run_once(run_schedule_job, datetime.fromtimestamp(run_at, tz), name=job_name,
+                       data={"schedule_id": entry["id"], "run_at": run_at, "action": action})
+    return upcoming
+
+def add_schedule(job_queue, entry):
+    BOT_STATE["schedules"][entry["id"]] = entry
+    save_bot_state()
+    return arm_schedule(job_queue, entry)
+
+def remove_schedule(job_queue, schedule_id):
+    entry = BOT_STATE["schedules"].pop(schedule_id, None)
+    if entry is not None:
+        for job in job_queue.get_jobs_by_name(f"schedule_{schedule_id}"):
+            job.schedule_removal()
+        save_bot_state()
+    return entry
+
+async def execute_scheduled_action(bot, slot_id, action, late=False):
+    """Menjalankan aksi jadwal (start/stop) untuk slot dan melaporkan hasilnya ke chat admin."""
+    chat_id = CONFIG['ALLOWED_CHAT_ID']
+
+    async def notify(text):
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+        except Exception as e:
+            logger.warning(f"Gagal mengirim notifikasi jadwal slot '{slot_id}': {e}")
+
+    reason = "Jadwal terlewat saat bot tidak berjalan" if late else "Waktu yang dijadwalkan telah tiba"
+    running, _ = is_stream_running(slot_id)
+    if action == "stop":
+        await notify(f"{reason}. Menghentikan live slot '{slot_id}'...")
+        if not running:
+            await notify("Streaming tidak aktif saat waktu penghentian terjadwal tiba.")
+        elif await stop_stream_process(slot_id):
+            await notify("Streaming berhasil dihentikan secara terjadwal.")
         else:
-            await context.bot.send_message(chat_id=chat_id, text="Gagal menghentikan streaming secara terjadwal. Periksa log bot.")
+            await notify("Gagal menghentikan streaming secara terjadwal. Periksa log bot.")
     else:
-        await context.bot.send_message(chat_id=chat_id, text="Streaming tidak aktif saat waktu penghentian terjadwal tiba.")
-    
-    BOT_STATE["scheduled_stop_job_name"] = None
+        await notify(f"{reason}. Memulai live slot '{slot_id}'...")
+        if running:
+            await notify(f"Streaming slot '{slot_id}' sudah berjalan.")
+        elif await start_stream_process(slot_id, bot=bot):
+            await notify("Streaming berhasil dimulai secara terjadwal.")
+        else:
+            await notify("Gagal memulai streaming secara terjadwal. Periksa video terpilih, kunci streaming, dan log bot.")
+
+async def fire_schedule(bot, job_queue, entry, run_at, action, late=False):
+    """Mencatat bahwa tepi jadwal sudah dijalankan (disimpan dulu), menjalankan aksinya, lalu memasang tepi berikutnya."""
+    if entry["kind"] == "once":
+        BOT_STATE["schedules"].pop(entry["id"], None)
+    else:
+        entry["last_fired"] = run_at
     save_bot_state()
+    await execute_scheduled_action(bot, entry["slot_id"], action, late=late)
+    if entry["kind"] == "window" and entry["id"] in BOT_STATE["schedules"]:
+        arm_schedule(job_queue, entry)
+
+async def run_schedule_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    data = context.job.data
+    entry = BOT_STATE["schedules"].get(data["schedule_id"])
+    if entry is None:
+        return
+    await fire_schedule(context.bot, context.job_queue, entry, data["run_at"], data["action"])
+
+async def restore_schedules(application: Application) -> None:
+    """Dipanggil saat bot mulai: menjalankan aksi jadwal yang terlewat selama bot mati, lalu memasang ulang semua job."""
+    tz = get_schedule_tz()
+    now = time.time()
+    for entry in get_schedules():
+        missed = live_scheduler.missed_action(entry, tz, now)
+        if missed:
+            logger.info(f"Menjalankan jadwal terlewat {entry['id']} ({live_scheduler.describe(entry, tz)}): {missed[1]}")
+            await fire_schedule(application.bot, application.job_queue, entry, *missed, late=True)
+        elif entry["kind"] == "once" and entry["run_at"] <= now:
+            # Jadwal mulai yang terlewat terlalu lama tidak dijalankan (lihat START_CATCHUP_GRACE_SECONDS).
+            remove_schedule(application.job_queue, entry["id"])
+            try:
+                await application.bot.send_message(
+                    chat_id=CONFIG['ALLOWED_CHAT_ID'],
+                    text=f"Jadwal '{live_scheduler.describe(entry, tz)}' slot '{entry['slot_id']}' terlewat saat bot tidak berjalan dan dilewati.")
+            except Exception as e:
+                logger.warning(f"Gagal mengirim notifikasi jadwal terlewat: {e}")
+        else:
+            arm_schedule(application.job_queue, entry)
+    if BOT_STATE["schedules"]:
+        logger.info(f"{len(BOT_STATE['schedules'])} jadwal live dipulihkan.")
+
+def format_schedules(slot_id):
+    tz = get_schedule_tz()
+    lines = []
+    for entry in get_schedules(slot_id):
+        line = f"[{entry['id']}] {live_scheduler.describe(entry, tz)}"
+        upcoming = live_scheduler.next_run(entry, tz)
+        if upcoming:
+            run_at, action = upcoming
+            remaining = timedelta(seconds=max(0, int(run_at - time.time())))
+            line += (f"\n   Berikutnya: {live_scheduler.ACTION_LABELS[action]} pada "
+                     f"{datetime.fromtimestamp(run_at, tz).strftime('%Y-%m-%d %H:%M %Z')} (dalam {remaining})")
+        lines.append(line)
+    return lines
+
+SCHEDULE_USAGE = (
+    "Penggunaan /jadwal (berlaku untuk slot aktif, jam dalam TIMEZONE config.json):\n"
+    "/jadwal - daftar jadwal\n"
+    "/jadwal mulai 20:00 | 30m - mulai live sekali\n"
+    "/jadwal stop 23:00 | 2h30m - hentikan live sekali\n"
+    "/jadwal harian 20:00-23:00 - jendela live setiap hari\n"
+    "/jadwal mingguan sen,rab,jum 20:00-23:00 - jendela live pada hari tertentu (sen-jum juga bisa)\n"
+    "/jadwal hapus <id> - hapus jadwal"
+)
+
+async def schedule_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/jadwal - mengelola jadwal mulai/berhenti dan jendela live berulang untuk slot aktif."""
+    if not await check_auth(update, context): return
+    args = list(context.args or [])
+    slot_id = get_active_slot()
+    tz = get_schedule_tz()
+    if not args:
+        lines = format_schedules(slot_id)
+        text = "\n".join(lines) if lines else "Belum ada jadwal."
+        await update.message.reply_text(f"Jadwal live slot '{slot_id}':\n{text}\n\n{SCHEDULE_USAGE}")
+        return
+    command = args[0].lower()
+    try:
+        if command in ("mulai", "start", "stop", "berhenti") and len(args) == 2:
+            action = "start" if command in ("mulai", "start") else "stop"
+            entry = live_scheduler.new_once(slot_id, action, live_scheduler.resolve_time(args[1], tz))
+        elif command == "harian" and len(args) == 2:
+            start, _, end = args[1].partition("-")
+            entry = live_scheduler.new_window(slot_id, start, end)
+        elif command == "mingguan" and len(args) == 3:
+            start, _, end = args[2].partition("-")
+            entry = live_scheduler.new_window(slot_id, start, end, live_scheduler.parse_weekdays(args[1]))
+        elif command == "hapus" and len(args) == 2:
+            entry = BOT_STATE["schedules"].get(args[1])
+            if entry is None or entry["slot_id"] != slot_id:
+                await update.message.reply_text(f"Jadwal '{args[1]}' tidak ditemukan di slot '{slot_id}'.")
+            else:
+                remove_schedule(context.job_queue, args[1])
+                await update.message.reply_text(f"Jadwal '{live_scheduler.describe(entry, tz)}' dihapus.")
+            return
+        else:
+            await update.message.reply_text(SCHEDULE_USAGE)
+            return
+    except ValueError as e:
+        await update.message.reply_text(f"Jadwal tidak valid: {e}.\n\n{SCHEDULE_USAGE}")
+        return
+    add_schedule(context.job_queue, entry)
+    await update.message.reply_text(f"Jadwal ditambahkan untuk slot '{slot_id}':\n" + format_schedules(slot_id)[-1])
+    # Jendela yang dibuat saat sedang terbuka (misal 18:00-22:00 dibuat jam 19:00) langsung dimulai.
+    opened = live_scheduler.missed_action(entry, tz)
+    if opened:
+        await fire_schedule(context.bot, context.job_queue, entry, *opened)
 
 
 async def schedule_stop_receive(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     if not await check_auth(update, context): return ConversationHandler.END
 
     input_text = update.message.text.strip().lower()
+    slot_id = get_active_slot()
 
-    if BOT_STATE["scheduled_stop_job_name"]:
-        current_jobs = context.job_queue.get_jobs_by_name(BOT_STATE["scheduled_stop_job_name"])
-        for job in current_jobs:
-            job.schedule_removal()
-        BOT_STATE["scheduled_stop_job_name"] = None
-        save_bot_state()
+    if cancel_scheduled_stop(context, slot_id):
         await update.message.reply_text("Jadwal sebelumnya dibatalkan.")
 
-    delay_seconds = 0
     try:
-        if 'm' in input_text or 'h' in input_text:
-            total_minutes = 0
-            if 'h' in input_text:
-                parts = input_text.split('h')
-                if not parts[0].isdigit():
-                    raise ValueError("Format jam tidak valid.")
-                hours = int(parts[0])
-                total_minutes += hours * 60
-                input_text = parts[1]
-            if 'm' in input_text:
-                minutes_str = input_text.replace('m', '')
-                if minutes_str and not minutes_str.isdigit():
-                    raise ValueError("Format menit tidak valid.")
-                minutes = int(minutes_str) if minutes_str else 0
-                total_minutes += minutes
-            
-            if total_minutes <= 0:
-                raise ValueError("Durasi harus positif.")
-            
-            delay_seconds = total_minutes * 60
-            schedule_message = f"Live akan dihentikan secara otomatis dalam {total_minutes} menit."
-
-        elif ':' in input_text:
-            now = datetime.now()
-            time_parts = input_text.split(':')
-            if len(time_parts) != 2 or not all(part.isdigit() for part in time_parts):
-                 raise ValueError("Format waktu HH:MM tidak valid.")
-            
-            hours, minutes = map(int, time_parts)
-            
-            if not (0 <= hours <= 23 and 0 <= minutes <= 59):
-                raise ValueError("Jam atau menit di luar rentang valid (0-23, 0-59).")
-
-            scheduled_time = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
-            
-            if scheduled_time < now:
-                scheduled_time += timedelta(days=1)
-
-            delay_seconds = (scheduled_time - now).total_seconds()
-            schedule_message = f"Live akan dihentikan secara otomatis pada {scheduled_time.strftime('%H:%M:%S')}."
-
-        else:
+        tz = get_schedule_tz()
+        if live_scheduler.parse_duration(input_text) is None and ':' not in input_text:
             raise ValueError("Format waktu tidak valid. Gunakan '30m', '1h', '2h30m' atau 'HH:MM'.")
+        run_at = live_scheduler.resolve_time(input_text, tz)
 
-        if delay_seconds < 10:
+        if run_at - time.time() < 10:
             await update.message.reply_text("Waktu penjadwalan terlalu singkat (minimal 10 detik).")
             return SCHEDULE_STOP_STATE
 
-        job_name = f"scheduled_stop_live_{update.message.chat_id}_{int(time.time())}"
-        context.job_queue.run_once(scheduled_stop_callback, delay_seconds, chat_id=update.message.chat_id, name=job_name)
-        
-        BOT_STATE["scheduled_stop_job_name"] = job_name
-        save_bot_state()
-        await update.message.reply_text(schedule_message)
+        add_schedule(context.job_queue, live_scheduler.new_once(slot_id, "stop", run_at))
+        scheduled_dt = datetime.fromtimestamp(run_at, tz)
+        await update.message.reply_text(f"Live slot '{slot_id}' akan dihentikan secara otomatis pada "
+                                        f"{scheduled_dt.strftime('%Y-%m-%d %H:%M:%S %Z')} "
+                                        f"(dalam {timedelta(seconds=int(run_at - time.time()))}). Jadwal tetap berlaku jika bot di-restart.")
 
     except ValueError as e:
         await update.message.reply_text(f"Format waktu tidak valid: {e}. Silakan coba lagi.")
@@ -776,30 +1308,23 @@ async def show_config_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         else:
             config_str += f"{key}: {value}\n"
 
-    config_str += "\n--- STATUS BOT (bot_state.json) ---\n"
-    config_str += f"Video Terpilih: {os.path.basename(BOT_STATE['selected_video']) if BOT_STATE['selected_video'] else 'Belum dipilih'}\n"
-    config_str += f"Kunci Streaming Disetel: {'Ya ✅' if BOT_STATE['is_stream_key_set'] else 'Tidak ❌'}\n"
-    
-    running, pid = is_stream_running()
-    config_str += f"Status Streaming: {'Berjalan (PID: ' + str(pid) + ')' if running else 'Tidak Berjalan'}\n"
-
-    streamer_dir_for_config = os.path.dirname(CONFIG['STREAM_SCRIPT_PATH'])
-    streamer_config_path = os.path.join(streamer_dir_for_config, "config.json")
-    try:
-        with open(streamer_config_path, 'r') as f:
-            streamer_conf = json.load(f)
-        config_str += "\n--- KONFIGURASI STREAMER (config.json) ---\n"
-        for key, value in streamer_conf.items():
-            if key == "KEY_FILENAME":
-                continue
-            config_str += f"{key}: {value}\n"
-    except FileNotFoundError:
-        config_str += "\n[WARNING] config.json streamer tidak ditemukan."
-    except json.JSONDecodeError:
-        config_str += "\n[WARNING] Format config.json streamer salah."
-    except Exception as e:
-        logger.error(f"Gagal membaca config.json streamer: {e}", exc_info=True)
-        config_str += f"\n[ERROR] Gagal membaca config.json streamer: {e}"
+    config_str += "\n--- STATUS BOT (bot_state.db) ---\n"
+    config_str += f"Slot Aktif: {get_active_slot()}\n"
+    for slot_id in list_slots():
+        slot_state = get_slot_state(slot_id)
+        running, pid = is_stream_running(slot_id)
+        config_str += f"\n[{slot_id}]\n"
+        config_str += f"Video Terpilih: {os.path.basename(slot_state['selected_video']) if slot_state['selected_video'] else 'Belum dipilih'}\n"
+        config_str += f"Kunci Streaming Disetel: {'Ya ✅' if slot_state['is_stream_key_set'] else 'Tidak ❌'}\n"
+        config_str += f"Status Streaming: {'Berjalan (PID: ' + str(pid) + ')' if running else 'Tidak Berjalan'}\n"
+
+    if not await asyncio.to_thread(os.path.exists, get_streamer_config_path()):
+        config_str += "\n[WARNING] config.json streamer tidak ditemukan. Nilai default dipakai.\n"
+    config_str += "\n--- KONFIGURASI STREAMER (config.json) ---\n"
+    for key, value in read_streamer_config().items():
+        if key == "KEY_FILENAME":
+            continue
+        config_str += f"{key}: {value}\n"
 
     await message.reply_text(f"```json\n{config_str}\n```", parse_mode='MarkdownV2')
 
@@ -808,51 +1333,139 @@ async def check_status_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     message = update.message if update.message else update.callback_query.message
     if not await check_auth(update, context): return
 
-    running, pid = is_stream_running()
-    status_text = f"Streaming sedang berjalan dengan PID: `{pid}`" if running else "Streaming tidak sedang berjalan."
-    
-    status_text += f"\nVideo Terpilih: {os.path.basename(BOT_STATE['selected_video']) if BOT_STATE['selected_video'] else 'Belum dipilih'}"
-    status_text += f"\nKunci Streaming Disetel: {'Ya ✅' if BOT_STATE['is_stream_key_set'] else 'Tidak ❌'}"
-    
-    if BOT_STATE["scheduled_stop_job_name"]:
-        job_found = False
-        current_jobs = context.job_queue.get_jobs_by_name(BOT_STATE["scheduled_stop_job_name"])
-        if current_jobs:
-            job = current_jobs[0]
-            tz_info = job.tzinfo if job.tzinfo else datetime.now().astimezone().tzinfo 
-            
-            remaining_time_seconds = job.next_t - datetime.now(tz_info).timestamp()
-            remaining_td = timedelta(seconds=max(0, int(remaining_time_seconds)))
-            
-            scheduled_dt_local = datetime.fromtimestamp(job.next_t, tz_info)
-            
-            status_text += f"\nDijadwalkan Berhenti: Dalam {remaining_td} (pada {scheduled_dt_local.strftime('%Y-%m-%d %H:%M:%S %Z')})"
-            job_found = True
-        if not job_found: 
-            BOT_STATE["scheduled_stop_job_name"] = None
-            save_bot_state()
-            status_text += "\nAda jadwal yang dicatat sebelumnya, tetapi tidak aktif (mungkin bot baru di-restart)."
-    else:
-        status_text += "\nTidak ada jadwal penghentian live."
+    status_lines = [f"Slot aktif: {get_active_slot()}"]
+    for slot_id in list_slots():
+        slot_state = get_slot_state(slot_id)
+        running, pid = is_stream_running(slot_id)
+        status_text = f"\n[{slot_id}] " + (f"Streaming sedang berjalan dengan PID: {pid}" if running else "Streaming tidak sedang berjalan.")
+        status_text += f"\nVideo Terpilih: {os.path.basename(slot_state['selected_video']) if slot_state['selected_video'] else 'Belum dipilih'}"
+        status_text += f"\nKunci Streaming Disetel: {'Ya ✅' if slot_state['is_stream_key_set'] else 'Tidak ❌'}"
+        stream_status = STREAM_STATUS.get(slot_id)
+        if stream_status:
+            status_text += f"\nStatus Streamer: {stream_status.get('state') or '-'}"
+            if stream_status.get("reason"):
+                status_text += f" ({stream_status['reason']})"
+            if stream_status.get("failure"):
+                status_text += f"\nPenyebab Gagal Terakhir: {describe_failure(stream_status['failure'])}"
+            if stream_status.get("mode"):
+                status_text += f"\nMode: {stream_status['mode']}"
+                if stream_status.get("handover") == "rtmp_reconnect":
+                    status_text += "\n(Beralih dari encode ke cache: koneksi RTMP sempat disambung ulang.)"
+            if stream_status.get("retry"):
+                status_text += f"\nPercobaan Ulang: {stream_status['retry']}"
+                if stream_status.get("retry_reason"):
+                    status_text += f" (alasan: {stream_status['retry_reason']})"
+                if stream_status.get("resume_at"):
+                    status_text += f", dilanjutkan dari {timedelta(seconds=int(stream_status['resume_at']))}"
+            if stream_status.get("stall_count"):
+                last_stall = datetime.fromtimestamp(stream_status["last_stall_ts"]).strftime('%H:%M:%S')
+                status_text += f"\nRestart oleh Watchdog (macet): {stream_status['stall_count']}x, terakhir {last_stall}"
+            if stream_status.get("ffmpeg_exit_code") is not None:
+                status_text += f"\nKode Keluar FFmpeg Terakhir: {stream_status['ffmpeg_exit_code']}"
+            if running and stream_status.get("progress"):
+                # Target bitrate hanya berlaku jika video di-encode ulang.
+                mode_label = stream_status.get("mode") or ""
+                encodes_video = "ENCODE VIDEO" in mode_label or "RE-ENCODE" in mode_label
+                target_bitrate = (stream_status.get("target_bitrate_kbps") or read_streamer_config().get("VIDEO_BITRATE_KBPS")
+                                  if encodes_video else None)
+                if encodes_video and stream_status.get("target_bitrate_kbps"):
+                    status_text += f"\nBitrate Video (autotune): {stream_status['target_bitrate_kbps']} kbps"
+                    if stream_status.get("bitrate_reason") == "slow":
+                        status_text += " ⬇️ diturunkan karena siaran tidak realtime"
+                status_text += "\n" + format_progress(stream_status["progress"], target_bitrate)
+            if running and stream_status.get("metrics_port"):
+                status_text += f"\nMetrik: http://127.0.0.1:{stream_status['metrics_port']}/metrics"
+            if running and stream_status.get("relays"):
+                relay_labels = {"up": "🟢 tersambung", "down": "🔴 terputus"}
+                for name, relay in stream_status["relays"].items():
+                    status_text += f"\nTujuan {name}: {relay_labels.get(relay['state'], relay['state'])}"
+                    if relay["restarts"]:
+                        status_text += f" (disambung ulang {relay['restarts']}x)"
+            elif running and stream_status.get("destinations"):
+                status_text += f"\nTujuan: {', '.join(stream_status['destinations'])}"
+            for name, label in (stream_status.get("ingest") or {}).items():
+                if running and label != "utama":
+                    status_text += f"\n⚠️ Tujuan {name} memakai ingest {label} (ingest utama bermasalah)."
+
+        schedule_lines = format_schedules(slot_id)
+        if schedule_lines:
+            status_text += "\nJadwal Live:\n" + "\n".join(schedule_lines)
+        else:
+            status_text += "\nTidak ada jadwal live."
+        status_lines.append(status_text)
 
-    await message.reply_text(status_text, parse_mode='MarkdownV2')
+    await message.reply_text("\n".join(status_lines))
 
 
 async def view_ffmpeg_log_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     message = update.message if update.message else update.callback_query.message
     if not await check_auth(update, context): return
 
-    log_file_path = CONFIG['LOG_FILE']
-    
-    if os.path.exists(log_file_path):
-        try:
-            with open(log_file_path, 'rb') as f:
-                await message.reply_document(f, caption="Log FFmpeg terbaru:")
-        except Exception as e:
-            logger.error(f"Gagal membaca file log: {e}", exc_info=True)
-            await message.reply_text(f"Gagal membaca file log: {e}")
-    else:
+    slot_id = get_active_slot()
+
+    recent_events = get_recent_events(slot_id, limit=15, exclude_types=("progress",))
+    if recent_events:
+        events_text = "\n".join(format_stream_event(e) for e in recent_events)
+        await message.reply_text(f"Event streamer terbaru (slot: {slot_id}):\n{events_text[-3500:]}")
+
+    await send_log_tail(message, slot_id)
+
+async def log_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/log [error|warning] [kata kunci] - menampilkan baris log FFmpeg terakhir yang cocok dengan filter."""
+    if not await check_auth(update, context): return
+    args = list(context.args or [])
+    level = args.pop(0).lower() if args and args[0].lower() in LEVEL_TAGS else None
+    keyword = " ".join(args) or None
+    await send_log_tail(update.message, get_active_slot(), level=level, keyword=keyword)
+
+def build_log_view_keyboard():
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("Semua", callback_data="log_view_all"),
+         InlineKeyboardButton("⚠️ Warning+", callback_data="log_view_warning"),
+         InlineKeyboardButton("❌ Error", callback_data="log_view_error")],
+        [InlineKeyboardButton("📎 Unduh Log Lengkap", callback_data="log_download")],
+    ])
+
+async def send_log_tail(message, slot_id, level=None, keyword=None):
+    """Mengirim baris terakhir log FFmpeg slot (dibaca dari akhir file), opsional difilter level/kata kunci."""
+    log_file_path = get_log_file(slot_id)
+    if not await asyncio.to_thread(os.path.exists, log_file_path):
+        await message.reply_text("File log FFmpeg tidak ditemukan.")
+        return
+    try:
+        lines = await asyncio.to_thread(tail_lines, log_file_path, CONFIG["LOG_VIEW_LINES"], level, keyword)
+    except OSError as e:
+        logger.error(f"Gagal membaca file log: {e}", exc_info=True)
+        await message.reply_text(f"Gagal membaca file log: {e}")
+        return
+    filters_text = ", ".join(f for f in (level and f"level {level}", keyword and f"kata kunci '{keyword}'") if f)
+    header = f"Log FFmpeg (slot: {slot_id}){' - ' + filters_text if filters_text else ''}:"
+    body = "\n".join(lines)[-3500:] if lines else "(tidak ada baris yang cocok)"
+    await message.reply_text(f"{header}\n{body}", reply_markup=build_log_view_keyboard())
+
+def read_log_for_upload(path, max_bytes):
+    """Isi file log (paling banyak max_bytes dari akhir file) dan apakah isinya terpotong."""
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - max_bytes))
+        return f.read(), size > max_bytes
+
+async def send_full_log(message, slot_id):
+    """Mengirim file log FFmpeg aktif slot sebagai dokumen (hanya atas permintaan)."""
+    log_file_path = get_log_file(slot_id)
+    if not await asyncio.to_thread(os.path.exists, log_file_path):
         await message.reply_text("File log FFmpeg tidak ditemukan.")
+        return
+    try:
+        # Dibaca di thread terpisah: log bisa berukuran puluhan MB dan tidak boleh menahan event loop.
+        data, truncated = await asyncio.to_thread(read_log_for_upload, log_file_path, LOG_DOCUMENT_MAX_BYTES)
+        caption = f"Log FFmpeg lengkap (slot: {slot_id}). Segmen lama disimpan sebagai .1, .2, ... (.gz)."
+        if truncated:
+            caption = f"Log FFmpeg (slot: {slot_id}), {LOG_DOCUMENT_MAX_BYTES // (1024 * 1024)} MB terakhir. Segmen lama disimpan sebagai .1, .2, ... (.gz)."
+        await message.reply_document(data, filename=os.path.basename(log_file_path), caption=caption)
+    except Exception as e:
+        logger.error(f"Gagal membaca file log: {e}", exc_info=True)
+        await message.reply_text(f"Gagal membaca file log: {e}")
 
 async def handle_text_messages(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Menangani pesan teks yang berasal dari ReplyKeyboardMarkup."""
@@ -871,10 +1484,12 @@ async def handle_text_messages(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("Silakan kirim kunci streaming Anda. (Ini akan disimpan di keystream.txt)")
         return ENTER_KEY_STATE
     elif message_text == "⏰ Jadwal Hentikan Live":
-        await update.message.reply_text("Untuk menjadwalkan penghentian, balas dengan durasi (misal: '30m' untuk 30 menit, '1h' untuk 1 jam, '2h30m' untuk 2 jam 30 menit) atau waktu spesifik (misal: '23:00').")
+        await update.message.reply_text("Untuk menjadwalkan penghentian, balas dengan durasi (misal: '30m' untuk 30 menit, '1h' untuk 1 jam, '2h30m' untuk 2 jam 30 menit) atau waktu spesifik (misal: '23:00').\nUntuk jadwal mulai dan jendela live harian/mingguan, gunakan /jadwal.")
         return SCHEDULE_STOP_STATE
     elif message_text == "🗑️ Hapus Video":
         return await list_videos_for_deletion(update, context) 
+    elif message_text == "📺 Pilih Slot":
+        return await list_slots_for_selection(update, context)
     
     # Logika untuk aksi langsung (non-ConversationHandler)
     elif message_text == "🔴 Mulai Live":
@@ -913,8 +1528,22 @@ def main() -> None:
     """Menjalankan bot."""
     load_bot_config()
     load_bot_state()
-
-    application = Application.builder().token(CONFIG['TELEGRAM_BOT_TOKEN']).build()
+    init_transcoder(CONFIG.get("TRANSCODE_WORKERS", 1))
+    video_library.init_library(CONFIG["LIBRARY_DB"])
+    added, removed = video_library.sync_directory(
+        CONFIG["VIDEOS_DIR"], read_streamer_config()["VIDEO_EXTENSIONS"])
+    logger.info(f"Library video diselaraskan: {added} ditambah/diperbarui, {removed} dihapus.")
+    content_store.remove_stale_incoming(CONFIG["VIDEOS_DIR"], STALE_INCOMING_SECONDS)
+    adopt_orphan_streams()
+
+    builder = (Application.builder().token(CONFIG['TELEGRAM_BOT_TOKEN'])
+               .post_init(restore_schedules).post_shutdown(stop_all_streams))
+    if CONFIG["LOCAL_BOT_API_URL"]:
+        # Server Bot API sendiri (telegram-bot-api --local): tanpa batas unduhan 20 MB, file_path berupa path lokal.
+        local_api_url = CONFIG["LOCAL_BOT_API_URL"].rstrip("/")
+        builder = builder.base_url(f"{local_api_url}/bot").base_file_url(f"{local_api_url}/file/bot").local_mode(True)
+        logger.info(f"Memakai server Bot API lokal: {local_api_url} (serah-terima file: {CONFIG['LOCAL_FILE_HANDOFF']})")
+    application = builder.build()
 
     common_fallbacks = [
         CommandHandler("cancel", cancel_conversation), 
@@ -970,7 +1599,7 @@ def main() -> None:
             # Entry point for ReplyKeyboard handled by handle_text_messages
         ],
         states={
-            SELECT_VIDEO_STATE: [CallbackQueryHandler(button_callback_handler, pattern="^select_video_.*$")],
+            SELECT_VIDEO_STATE: [CallbackQueryHandler(button_callback_handler, pattern=r"^(select_video_\d+|video_page_select_\d+|video_clear_select)$")],
         },
         fallbacks=common_fallbacks,
         allow_reentry=True
@@ -983,15 +1612,30 @@ def main() -> None:
             # Entry point for ReplyKeyboard handled by handle_text_messages
         ],
         states={
-            DELETE_VIDEO_STATE: [CallbackQueryHandler(button_callback_handler, pattern="^delete_video_.*$")],
+            DELETE_VIDEO_STATE: [CallbackQueryHandler(button_callback_handler, pattern=r"^(delete_video_\d+|video_page_delete_\d+|video_clear_delete)$")],
         },
         fallbacks=common_fallbacks,
         allow_reentry=True
     )
     application.add_handler(delete_video_conv_handler)
 
+    slot_conv_handler = ConversationHandler(
+        entry_points=[
+            CallbackQueryHandler(new_slot_start, pattern="^new_slot_inline$"),
+        ],
+        states={
+            NEW_SLOT_STATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_new_slot)],
+        },
+        fallbacks=common_fallbacks,
+        allow_reentry=True
+    )
+    application.add_handler(slot_conv_handler)
+
     # Handler Perintah Telegram Umum
     application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("log", log_command))
+    application.add_handler(CommandHandler("cari", search_videos_command))
+    application.add_handler(CommandHandler("jadwal", schedule_command))
     
     # MessageHandler untuk tombol ReplyKeyboard.
     # Ini harus ditempatkan setelah semua ConversationHandler,
@@ -1012,6 +1656,7 @@ def main() -> None:
                                          filters.Regex("⚙️ Status & Konfigurasi") |
                                          filters.Regex("🟢 Cek Status Live") |
                                          filters.Regex("📄 Lihat Log FFmpeg") |
+                                         filters.Regex("📺 Pilih Slot") |
                                          filters.Regex("◀️ Kembali")), 
                                         handle_text_messages))
 
@@ -1027,7 +1672,11 @@ def main() -> None:
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, unknown))
 
     logger.info("Bot dimulai. Tekan Ctrl+C untuk menghentikan.")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    try:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
+    finally:
+        shutdown_transcoder()
+        state_store.flush_state()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul proyek berupa skrip datar di root repo; tambahkan root ke sys.path agar bisa di-import tes.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
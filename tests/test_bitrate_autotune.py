@@ -0,0 +1,137 @@
+import socket
+import threading
+
+import pytest
+
+import bitrate_autotune as bt
+
+LADDER = [6000, 4500, 3500, 2500, 1800, 1200, 800]
+T0 = 1_000_000.0
+
+
+def _tuner(ceiling=4500, index=0, probe_index=0, last_change=T0):
+    tuner = bt.new_tuner(LADDER, ceiling)
+    tuner.update(index=index, probe_index=probe_index, last_change=last_change, last_start=last_change)
+    return tuner
+
+
+def _samples(start, seconds, speed, step=5):
+    """Progres sintetis: out_time bertambah speed detik per detik dinding."""
+    return [{"ts": start + t, "out_time_s": t * speed} for t in range(0, seconds + 1, step)]
+
+
+def test_build_ladder_uses_ceiling_as_top_rung():
+    assert bt.build_ladder(LADDER, 4000) == [4000, 3500, 2500, 1800, 1200, 800]
+
+
+def test_pick_index_fits_probe_with_headroom_and_audio():
+    ladder = bt.build_ladder(LADDER, 6000)
+    # 5000 kbps * 0.7 - 128 kbps audio = 3372 kbps -> anak tangga 2500.
+    assert ladder[bt.pick_index(ladder, 5000, 128)] == 2500
+    assert bt.pick_index(ladder, None, 128) == 0
+    assert bt.pick_index(ladder, 100, 128) == len(ladder) - 1
+
+
+def test_realtime_speed_from_out_time_growth():
+    assert bt.realtime_speed(_samples(T0, 30, 0.8)) == pytest.approx(0.8)
+    assert bt.realtime_speed(_samples(T0, 0, 1.0)) is None
+
+
+def test_slow_window_steps_down_one_rung():
+    tuner = _tuner()
+    start = T0 + bt.GRACE_SEC
+    decision = bt.evaluate(tuner, _samples(start, bt.WINDOW_SEC, 0.8), now=start + bt.WINDOW_SEC)
+    assert decision is not None
+    assert decision[:2] == (1, "slow")
+    assert decision[2] == pytest.approx(0.8)
+
+
+def test_samples_inside_grace_period_are_ignored():
+    tuner = _tuner()
+    # Seluruh jendela jatuh dalam GRACE_SEC setelah restart: FFmpeg -re masih mengejar.
+    assert bt.evaluate(tuner, _samples(T0, bt.GRACE_SEC - 1, 0.5, step=1), now=T0 + bt.GRACE_SEC) is None
+
+
+def test_short_window_is_not_judged():
+    tuner = _tuner()
+    start = T0 + bt.GRACE_SEC
+    assert bt.evaluate(tuner, _samples(start, 10, 0.5), now=start + 10) is None
+
+
+def test_bottom_rung_does_not_step_further():
+    tuner = _tuner(index=len(bt.build_ladder(LADDER, 4500)) - 1)
+    start = T0 + bt.GRACE_SEC
+    assert bt.evaluate(tuner, _samples(start, bt.WINDOW_SEC, 0.5), now=start + bt.WINDOW_SEC) is None
+
+
+def test_speed_between_thresholds_keeps_rung():
+    tuner = _tuner(index=2)
+    start = T0 + bt.STEP_UP_AFTER_SEC
+    assert bt.evaluate(tuner, _samples(start, bt.WINDOW_SEC, 0.97), now=start + bt.WINDOW_SEC) is None
+
+
+def test_step_up_waits_for_stable_period():
+    tuner = _tuner(index=2)
+    start = T0 + bt.GRACE_SEC
+    assert bt.evaluate(tuner, _samples(start, bt.WINDOW_SEC, 1.0), now=start + bt.WINDOW_SEC) is None
+
+    start = T0 + bt.STEP_UP_AFTER_SEC
+    decision = bt.evaluate(tuner, _samples(start, bt.WINDOW_SEC, 1.0), now=start + bt.WINDOW_SEC)
+    assert decision[:2] == (1, "recovered")
+
+
+def test_step_up_stops_at_probe_result():
+    tuner = _tuner(index=2, probe_index=2)
+    start = T0 + bt.STEP_UP_AFTER_SEC * 2
+    assert bt.evaluate(tuner, _samples(start, bt.WINDOW_SEC, 1.0), now=start + bt.WINDOW_SEC) is None
+
+
+def test_drop_then_recovery_series():
+    """Uplink turun lalu pulih: satu langkah turun, tidak naik sebelum STEP_UP_AFTER_SEC, lalu naik lagi."""
+    tuner = _tuner()
+    now = T0 + bt.GRACE_SEC + bt.WINDOW_SEC
+    index, reason, _ = bt.evaluate(tuner, _samples(now - bt.WINDOW_SEC, bt.WINDOW_SEC, 0.7), now=now)
+    assert (index, reason) == (1, "slow")
+    tuner.update(index=index, last_change=now, last_start=now)
+
+    for elapsed in (bt.GRACE_SEC + bt.WINDOW_SEC, bt.STEP_UP_AFTER_SEC // 2, bt.STEP_UP_AFTER_SEC - 1):
+        check = now + elapsed
+        assert bt.evaluate(tuner, _samples(check - bt.WINDOW_SEC, bt.WINDOW_SEC, 1.0), now=check) is None
+
+    check = now + bt.STEP_UP_AFTER_SEC
+    assert bt.evaluate(tuner, _samples(check - bt.WINDOW_SEC, bt.WINDOW_SEC, 1.0), now=check)[:2] == (0, "recovered")
+
+
+def test_set_ceiling_keeps_current_rate_when_it_fits():
+    tuner = _tuner(ceiling=6000, index=2) # 3500 kbps
+    bt.set_ceiling(tuner, 4000, LADDER)
+    assert bt.current_kbps(tuner) == 3500
+    bt.set_ceiling(tuner, 3000, LADDER)
+    assert bt.current_kbps(tuner) == 3000
+
+
+def _start_sink():
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def drain():
+        conn, _ = server.accept()
+        with conn:
+            while conn.recv(1024 * 1024):
+                pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    return server
+
+
+def test_probe_uplink_against_local_sink():
+    server = _start_sink()
+    with server:
+        measured = bt.probe_uplink(f"127.0.0.1:{server.getsockname()[1]}", 0.5)
+    assert measured is not None and measured > 0
+
+
+def test_probe_uplink_unreachable_target():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        port = server.getsockname()[1]
+    assert bt.probe_uplink(f"127.0.0.1:{port}", 0.2) is None
+    assert bt.probe_uplink("bukan-target", 0.2) is None
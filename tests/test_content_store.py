@@ -0,0 +1,79 @@
+import hashlib
+import io
+import os
+import time
+
+import content_store
+
+
+def _incoming(videos_dir, data, key=None):
+    path = content_store.get_incoming_path(str(videos_dir), key)
+    with open(path, "wb") as f:
+        writer = content_store.HashingWriter(f)
+        writer.write(data)
+    return path, writer.hexdigest()
+
+
+def test_hashing_writer_counts_resumed_bytes():
+    out = io.BytesIO()
+    writer = content_store.HashingWriter(out)
+    writer.update_hash(b"sudah ada ")
+    writer.write(b"bagian baru")
+    assert writer.hexdigest() == hashlib.sha256(b"sudah ada bagian baru").hexdigest()
+    assert writer.bytes_written == 21 and out.getvalue() == b"bagian baru"
+
+
+def test_incoming_path_is_stable_only_for_safe_keys(tmp_path):
+    assert content_store.get_incoming_path(str(tmp_path), "AgAD_x-1") == content_store.get_incoming_path(str(tmp_path), "AgAD_x-1")
+    unsafe = content_store.get_incoming_path(str(tmp_path), "../luar")
+    assert os.path.dirname(unsafe) == str(tmp_path / ".objects") and "luar" not in unsafe
+
+
+def test_same_content_is_stored_once_and_aliased(tmp_path):
+    path, digest = _incoming(tmp_path, b"isi video")
+    object_path, duplicate = content_store.store_object(path, digest, ".MP4", str(tmp_path))
+    assert not duplicate and object_path.endswith(f"{digest}.mp4") and not os.path.exists(path)
+    first = content_store.create_alias(object_path, str(tmp_path), "acara.mp4")
+
+    path, digest = _incoming(tmp_path, b"isi video")
+    same_object, duplicate = content_store.store_object(path, digest, ".mkv", str(tmp_path))
+    assert duplicate and same_object == object_path and not os.path.exists(path)
+    second = content_store.create_alias(same_object, str(tmp_path), "ulang.mkv")
+
+    assert os.path.islink(first) and not os.path.isabs(os.readlink(first))
+    assert sorted(content_store.find_aliases(str(tmp_path), object_path)) == [first, second]
+    assert os.path.realpath(second) == os.path.realpath(object_path)
+
+
+def test_alias_names_do_not_collide(tmp_path):
+    (tmp_path / "acara.mp4").write_bytes(b"upload lama")
+    path, digest = _incoming(tmp_path, b"isi baru")
+    object_path, _ = content_store.store_object(path, digest, ".mp4", str(tmp_path))
+    alias = content_store.create_alias(object_path, str(tmp_path), "acara.mp4")
+    assert alias == str(tmp_path / "acara_1.mp4")
+    # Nama yang sudah menunjuk ke objek yang sama dipakai ulang.
+    assert content_store.create_alias(object_path, str(tmp_path), "acara_1.mp4") == alias
+
+
+def test_object_is_removed_with_its_last_alias(tmp_path):
+    path, digest = _incoming(tmp_path, b"isi video")
+    object_path, _ = content_store.store_object(path, digest, ".mp4", str(tmp_path))
+    first = content_store.create_alias(object_path, str(tmp_path), "a.mp4")
+    second = content_store.create_alias(object_path, str(tmp_path), "b.mp4")
+    assert content_store.remove_alias(first, str(tmp_path)) is None
+    assert os.path.exists(object_path)
+    assert content_store.remove_alias(second, str(tmp_path)) == object_path
+    assert not os.path.exists(object_path)
+
+    legacy = tmp_path / "lama.mp4"
+    legacy.write_bytes(b"upload lama")
+    assert content_store.remove_alias(str(legacy), str(tmp_path)) == str(legacy) and not legacy.exists()
+
+
+def test_stale_incoming_files_are_removed(tmp_path):
+    old, _ = _incoming(tmp_path, b"lama", key="lama")
+    fresh, _ = _incoming(tmp_path, b"baru", key="baru")
+    past = time.time() - 7200
+    os.utime(old, (past, past))
+    content_store.remove_stale_incoming(str(tmp_path), 3600)
+    assert not os.path.exists(old) and os.path.exists(fresh)
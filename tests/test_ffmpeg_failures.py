@@ -0,0 +1,46 @@
+import pytest
+
+import ffmpeg_failures as ff
+
+INPUT = "/srv/videos/intro.mp4"
+
+
+@pytest.mark.parametrize("log, category", [
+    (f"{INPUT}: No such file or directory", "input_missing"),
+    (f"{INPUT}: Permission denied", "input_missing"),
+    ("[in#0 @ 0x55] Error opening input: Permission denied\nError opening input file x.", "input_missing"),
+    ("[out#0/tee @ 0x55] encode_cache/intro.abc.mp4.part: Permission denied", "file_access"),
+    ("ffmpeg_log.txt: Permission denied", "file_access"),
+    ("[tcp @ 0x55] Connection to tcp://a.rtmp.youtube.com:1935 failed: Permission denied", "file_access"),
+    ("[rtmp @ 0x55] Server error: NetStream.Publish.BadName", "auth_rejected"),
+    ("[flv @ 0x55] Failed to update header with correct duration.\nConnection reset by peer", "network"),
+    ("[libx264 @ 0x55] Error while opening encoder for output stream", "encoder_error"),
+    ("[mov,mp4 @ 0x55] moov atom not found", "input_corrupt"),
+    ("No space left on device", "resource"),
+    ("something else went wrong", "unknown"),
+])
+def test_classify_failure(log, category):
+    assert ff.classify_failure(f"frame=100 fps=30\n{log}", INPUT)[0] == category
+
+
+def test_output_permission_errors_are_retried():
+    category, detail = ff.classify_failure("out.mp4: Permission denied", INPUT)
+    assert detail == "out.mp4: Permission denied"
+    assert ff.get_policy(category)["max_retries"] > 0
+    assert ff.get_policy(ff.classify_failure(f"{INPUT}: Permission denied", INPUT)[0])["max_retries"] == 0
+
+
+def test_last_matching_line_is_reported():
+    log = "Connection refused\nframe=1\nConnection timed out"
+    assert ff.classify_failure(log) == ("network", "Connection timed out")
+    assert ff.classify_failure("") == ("unknown", None)
+
+
+def test_every_category_has_a_policy_and_description():
+    for category, _ in ff.FAILURE_PATTERNS:
+        if category == "file_error":
+            continue
+        assert category in ff.FAILURE_POLICIES and category in ff.FAILURE_DESCRIPTIONS
+    for category in ("input_missing", "file_access", "stall", "unknown"):
+        assert category in ff.FAILURE_POLICIES and category in ff.FAILURE_DESCRIPTIONS
+    assert ff.get_policy("tidak-dikenal") == ff.FAILURE_POLICIES["unknown"]
@@ -0,0 +1,83 @@
+import gzip
+import io
+
+import pytest
+
+import ffmpeg_log
+
+
+@pytest.fixture
+def open_log():
+    logs = []
+
+    def opener(*args, **kwargs):
+        log = ffmpeg_log.open_rotating_log(*args, **kwargs)
+        logs.append(log)
+        return log
+
+    yield opener
+    for log in logs:
+        for handler in list(log.handlers):
+            handler.close()
+            log.removeHandler(handler)
+
+
+def test_rotation_keeps_backup_count_gzipped_segments(tmp_path, open_log):
+    path = tmp_path / "ffmpeg.log"
+    log = open_log(str(path), max_bytes=200, backup_count=2)
+    for i in range(40):
+        log.info(f"baris {i:02d} " + "x" * 20)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ffmpeg.log", "ffmpeg.log.1.gz", "ffmpeg.log.2.gz"]
+    assert path.stat().st_size <= 200
+    newest_backup = gzip.decompress((tmp_path / "ffmpeg.log.1.gz").read_bytes()).decode()
+    assert "baris" in newest_backup and newest_backup.endswith("\n")
+
+
+def test_rotation_without_compression(tmp_path, open_log):
+    log = open_log(str(tmp_path / "ffmpeg.log"), max_bytes=200, backup_count=1, compress=False)
+    for i in range(40):
+        log.info("x" * 30)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ffmpeg.log", "ffmpeg.log.1"]
+
+
+def test_same_path_reuses_the_logger(tmp_path, open_log):
+    first = open_log(str(tmp_path / "ffmpeg.log"), 1000, 1)
+    assert open_log(str(tmp_path / "ffmpeg.log"), 1000, 1) is first
+    assert len(first.handlers) == 1
+
+
+def test_stderr_pump_copies_lines_to_the_log_and_tail(tmp_path, open_log):
+    path = tmp_path / "ffmpeg.log"
+    log = open_log(str(path), 10000, 1)
+    tail = []
+    ffmpeg_log.start_stderr_pump(io.BytesIO(b"[info] satu\n\n[error] dua\n"), log, tail, prefix="[relay] ").join()
+    assert tail == ["[info] satu", "[error] dua"]
+    assert path.read_text().splitlines()[1].endswith("[relay] [error] dua")
+
+
+def _write_lines(path, count):
+    path.write_text("".join(f"[{'error' if i % 10 == 0 else 'info'}] baris {i}\n" for i in range(count)))
+
+
+def test_tail_returns_the_last_lines_across_block_boundaries(tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmpeg_log, "TAIL_BLOCK_SIZE", 7)
+    path = tmp_path / "ffmpeg.log"
+    _write_lines(path, 100)
+    assert ffmpeg_log.tail_lines(str(path), 3) == ["[info] baris 97", "[info] baris 98", "[info] baris 99"]
+    assert len(ffmpeg_log.tail_lines(str(path), 1000)) == 100
+
+
+def test_tail_filters_by_level_and_keyword(tmp_path):
+    path = tmp_path / "ffmpeg.log"
+    _write_lines(path, 100)
+    assert ffmpeg_log.tail_lines(str(path), 2, level="error") == ["[error] baris 80", "[error] baris 90"]
+    assert ffmpeg_log.tail_lines(str(path), 3, keyword="BARIS 5") == [
+        "[info] baris 57", "[info] baris 58", "[info] baris 59"]
+
+
+def test_tail_stops_after_max_scan_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(ffmpeg_log, "TAIL_BLOCK_SIZE", 64)
+    path = tmp_path / "ffmpeg.log"
+    _write_lines(path, 1000)
+    # Empat blok terakhir (256 byte) hanya memuat baris error 990; baris 980 dan yang lebih tua tidak dipindai.
+    assert ffmpeg_log.tail_lines(str(path), 10, level="error", max_scan_bytes=200) == ["[error] baris 990"]
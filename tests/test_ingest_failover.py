@@ -0,0 +1,61 @@
+import socket
+
+import ingest_failover as failover
+
+
+def _events():
+    events = []
+    return events, lambda event_type, **data: events.append((event_type, data))
+
+
+def test_join_key():
+    assert failover.join_key("rtmp://a.example/live2/", "KEY") == "rtmp://a.example/live2/KEY"
+    assert failover.join_key("rtmp://b.example/live2?backup=1&k={key}", "KEY") == "rtmp://b.example/live2?backup=1&k=KEY"
+
+
+def test_switches_after_consecutive_connect_failures():
+    pool = failover.new_pool(["rtmp://a.example/live2", "rtmp://b.example/live2"], "KEY", switch_after=2)
+    events, emit = _events()
+    assert failover.record_failure(pool, emit) is None
+    endpoint, free = failover.record_failure(pool, emit)
+    assert endpoint["label"] == "cadangan-1" and free
+    assert events == [("ingest", {"name": "utama", "active": "cadangan-1", "previous": "utama",
+                                  "reason": "connect_failures"})]
+
+
+def test_success_resets_the_failure_count():
+    pool = failover.new_pool(["rtmp://a.example/live2", "rtmp://b.example/live2"], "KEY", switch_after=2)
+    _, emit = _events()
+    failover.record_failure(pool, emit)
+    failover.record_success(pool)
+    assert failover.record_failure(pool, emit) is None
+
+
+def test_all_unhealthy_switch_is_not_free():
+    pool = failover.new_pool(["rtmp://a.example/live2", "rtmp://b.example/live2"], "KEY", switch_after=1)
+    _, emit = _events()
+    failover.record_failure(pool, emit)
+    endpoint, free = failover.record_failure(pool, emit)
+    assert endpoint["label"] == "utama" and not free
+
+
+def test_connect_failure_classification():
+    assert failover.is_connect_failure("network", 3)
+    assert not failover.is_connect_failure("network", failover.CONNECT_FAILURE_MAX_STREAMED_SEC + 1)
+    assert not failover.is_connect_failure("auth_rejected", 0)
+
+
+def test_ensure_reachable_skips_a_dead_primary():
+    with socket.create_server(("127.0.0.1", 0)) as dead:
+        dead_port = dead.getsockname()[1]
+    with socket.create_server(("127.0.0.1", 0)) as alive:
+        pool = failover.new_pool([f"rtmp://127.0.0.1:{dead_port}/live2",
+                                  f"rtmp://127.0.0.1:{alive.getsockname()[1]}/live2"], "KEY")
+        events, emit = _events()
+        endpoint = failover.ensure_reachable(pool, emit)
+    assert endpoint["label"] == "cadangan-1"
+    assert events[0][1]["reason"] == "unreachable"
+
+    _, emit = _events()
+    assert failover.return_to_primary(pool, emit)["label"] == "utama"
+    assert pool["endpoints"][0]["failures"] == 0
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import live_scheduler as ls
+
+TZ = timezone(timedelta(hours=8))
+
+
+def at(day, clock):
+    """Epoch untuk 2026-03-<day> jam clock di TZ (2026-03-02 adalah Senin)."""
+    hours, minutes = map(int, clock.split(":"))
+    return datetime(2026, 3, day, hours, minutes, tzinfo=TZ).timestamp()
+
+
+def _window(start, end, created_at, weekdays=None):
+    entry = ls.new_window("utama", start, end, weekdays)
+    entry["created_at"] = created_at
+    return entry
+
+
+def test_parse_helpers():
+    assert ls.parse_clock("9:05") == "09:05"
+    assert ls.parse_duration("2h30m") == 9000
+    assert ls.parse_duration("23:00") is None
+    assert ls.parse_weekdays("jum-sen") == [0, 4, 5, 6]
+    assert ls.parse_weekdays("sen,rab") == [0, 2]
+    for bad in ("24:00", "7:60", "abc"):
+        with pytest.raises(ValueError):
+            ls.parse_clock(bad)
+    with pytest.raises(ValueError):
+        ls.parse_weekdays("senin-xyz")
+    with pytest.raises(ValueError):
+        ls.new_window("utama", "20:00", "20:00")
+
+
+def test_resolve_time_rolls_over_to_tomorrow():
+    assert ls.resolve_time("08:00", TZ, now=at(2, "09:00")) == at(3, "08:00")
+    assert ls.resolve_time("30m", TZ, now=at(2, "09:00")) == at(2, "09:30")
+
+
+def test_window_next_run_and_overnight_end():
+    entry = _window("22:00", "02:00", at(2, "12:00"))
+    assert ls.next_run(entry, TZ, now=at(2, "12:00")) == (at(2, "22:00"), "start")
+    assert ls.next_run(entry, TZ, now=at(2, "23:00")) == (at(3, "02:00"), "stop")
+
+
+def test_weekly_window_skips_other_days():
+    entry = _window("20:00", "22:00", at(2, "12:00"), weekdays=[2]) # Rabu saja.
+    assert ls.next_run(entry, TZ, now=at(2, "12:00")) == (at(4, "20:00"), "start")
+
+
+def test_window_created_inside_the_window_starts_now():
+    entry = _window("18:00", "22:00", at(2, "19:00"))
+    assert ls.missed_action(entry, TZ, now=at(2, "19:00")) == (at(2, "18:00"), "start")
+    assert ls.next_run(entry, TZ, now=at(2, "19:00")) == (at(2, "22:00"), "stop")
+
+
+def test_window_created_outside_the_window_waits_for_start():
+    entry = _window("18:00", "22:00", at(2, "23:00"))
+    assert ls.missed_action(entry, TZ, now=at(2, "23:00")) is None
+
+
+def test_restore_inside_window_starts_once():
+    entry = _window("18:00", "22:00", at(2, "19:00"))
+    assert ls.missed_action(entry, TZ, now=at(2, "20:00")) == (at(2, "18:00"), "start")
+    entry["last_fired"] = at(2, "18:00") # Sudah dimulai; jangan mulai ulang (misal setelah stop manual).
+    assert ls.missed_action(entry, TZ, now=at(2, "21:00")) is None
+
+
+def test_restore_after_missed_stop():
+    entry = _window("18:00", "22:00", at(1, "12:00"))
+    entry["last_fired"] = at(2, "18:00")
+    assert ls.missed_action(entry, TZ, now=at(2, "23:00")) == (at(2, "22:00"), "stop")
+
+
+def test_once_catchup_grace():
+    start = ls.new_once("utama", "start", at(2, "18:00"))
+    stop = ls.new_once("utama", "stop", at(2, "18:00"))
+    assert ls.missed_action(start, TZ, now=at(2, "18:10")) == (at(2, "18:00"), "start")
+    assert ls.missed_action(start, TZ, now=at(2, "19:00")) is None
+    assert ls.missed_action(stop, TZ, now=at(3, "18:00")) == (at(2, "18:00"), "stop")
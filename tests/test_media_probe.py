@@ -0,0 +1,76 @@
+import json
+import threading
+
+import pytest
+
+import media_probe
+
+
+@pytest.fixture
+def probe_cache(tmp_path, monkeypatch):
+    path = tmp_path / "probe_cache.json"
+    monkeypatch.setattr(media_probe, "PROBE_CACHE_FILE", str(path))
+    monkeypatch.setattr(media_probe, "_memory_cache", None)
+    return path
+
+
+def test_concurrent_saves_never_leave_a_torn_cache(probe_cache):
+    # Tanpa _cache_lock, seperti dua proses yang menyimpan bersamaan: setiap penulis punya file sementara sendiri.
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(20):
+                media_probe._save_cache({f"/video/{n}-{i}|1|1": {"video_codec": "h264", "pad": "x" * 5000}})
+        except Exception as e: # pragma: no cover - hanya untuk melaporkan kegagalan thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(json.loads(probe_cache.read_text())) == 1
+    assert [p.name for p in probe_cache.parent.iterdir()] == [probe_cache.name]
+
+
+def test_probe_media_runs_ffprobe_once_per_file_version(probe_cache, tmp_path, monkeypatch):
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"1")
+    calls = []
+
+    def fake_ffprobe(path):
+        calls.append(path)
+        return {"video_codec": "h264", "size": len(calls)}
+
+    monkeypatch.setattr(media_probe, "_run_ffprobe", fake_ffprobe)
+    assert media_probe.probe_media(str(video))["size"] == 1
+    assert media_probe.probe_media(str(video))["size"] == 1
+    assert len(calls) == 1
+
+    video.write_bytes(b"22") # Ukuran berubah: entri lama basi dan diganti.
+    assert media_probe.probe_media(str(video))["size"] == 2
+    assert len(json.loads(probe_cache.read_text())) == 1
+
+    media_probe.forget_media(str(video))
+    assert json.loads(probe_cache.read_text()) == {}
+
+
+@pytest.mark.parametrize("info, video_ok, audio_ok", [
+    ({"video_codec": "h264", "pix_fmt": "yuv420p", "audio_codec": "aac", "audio_sample_rate": 48000}, True, True),
+    ({"video_codec": "h264", "pix_fmt": "yuv420p10le", "audio_codec": None}, False, True),
+    ({"video_codec": "hevc", "pix_fmt": "yuv420p", "audio_codec": "aac", "audio_sample_rate": 44100}, False, True),
+    ({"video_codec": "h264", "pix_fmt": "yuv420p", "audio_codec": "aac", "audio_sample_rate": 22050}, True, False),
+    ({"video_codec": "h264", "pix_fmt": "yuv420p", "audio_codec": "opus", "audio_sample_rate": 48000}, True, False),
+])
+def test_copy_eligibility(info, video_ok, audio_ok):
+    assert media_probe.is_video_copy_ok(info) is video_ok
+    assert media_probe.is_audio_copy_ok(info) is audio_ok
+    assert media_probe.is_copy_eligible(info) is (video_ok and audio_ok)
+
+
+def test_estimate_gop_from_keyframe_distance():
+    packets = [{"stream_index": 0, "flags": "K_" if i % 60 == 0 else "__"} for i in range(240)]
+    packets += [{"stream_index": 1, "flags": "K_"}] * 10
+    assert media_probe._estimate_gop(packets, 0) == 60
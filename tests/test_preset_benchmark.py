@@ -0,0 +1,55 @@
+import os
+import json
+
+import pytest
+
+import preset_benchmark
+
+
+@pytest.fixture
+def profile_file(tmp_path, monkeypatch):
+    path = tmp_path / "preset_profiles.json"
+    monkeypatch.setattr(preset_benchmark, "PROFILE_FILE", str(path))
+    return path
+
+
+BEST = {"preset": "fast", "threads": 4, "speed": 2.1, "cpu_percent": 80.0, "realtime": True}
+
+
+def test_record_and_lookup_exact(profile_file):
+    assert preset_benchmark.record_profile(1920, 1080, 30, BEST, 4500)
+    assert preset_benchmark.lookup_profile(1920, 1080, 30)["preset"] == "fast"
+    assert [p.name for p in profile_file.parent.iterdir()] == [profile_file.name]
+
+
+def test_lookup_picks_nearest_heavier_profile(profile_file):
+    preset_benchmark.record_profile(1920, 1080, 60, dict(BEST, preset="veryfast"), 4500)
+    preset_benchmark.record_profile(1920, 1080, 30, BEST, 4500)
+    assert preset_benchmark.lookup_profile(1280, 720, 30)["preset"] == "fast"
+    assert preset_benchmark.lookup_profile(3840, 2160, 30) is None
+
+
+def test_lookup_skips_malformed_entries(profile_file):
+    preset_benchmark.record_profile(1920, 1080, 30, BEST, 4500)
+    profiles = json.loads(profile_file.read_text())
+    host = profiles[preset_benchmark.host_key()]
+    host["1280x720@30"] = {"preset": "slow"} # Tanpa width/height.
+    host["2560x1440@30"] = {"preset": "slow", "width": "2560", "height": 1440}
+    host["rusak"] = "bukan profil"
+    profile_file.write_text(json.dumps(profiles))
+
+    assert preset_benchmark.lookup_profile(1280, 720, 30)["preset"] == "fast"
+
+
+def test_lookup_ignores_non_dict_host_entry(profile_file):
+    profile_file.write_text(json.dumps({preset_benchmark.host_key(): ["rusak"]}))
+    assert preset_benchmark.lookup_profile(1920, 1080, 30) is None
+
+
+def test_save_failure_is_reported_and_leaves_no_temp_file(profile_file, monkeypatch):
+    def failing_replace(src, dst):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(preset_benchmark.os, "replace", failing_replace)
+    assert preset_benchmark.record_profile(1920, 1080, 30, BEST, 4500) is False
+    assert os.listdir(profile_file.parent) == []
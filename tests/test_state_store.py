@@ -0,0 +1,82 @@
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+import state_store
+
+DEBOUNCE = 0.1
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "DEBOUNCE_SECONDS", DEBOUNCE)
+    monkeypatch.setattr(state_store, "_written", {})
+    monkeypatch.setattr(state_store, "_pending", None)
+    monkeypatch.setattr(state_store, "_db_path", None)
+    writes = []
+    real_write = state_store._write
+    monkeypatch.setattr(state_store, "_write", lambda snapshot: (writes.append(snapshot), real_write(snapshot)))
+    db_path = str(tmp_path / "bot_state.db")
+    state_store.init_store(db_path)
+    # Thread penulis dipakai bersama oleh semua test; tunggu sampai putaran sebelumnya selesai.
+    time.sleep(2 * DEBOUNCE)
+    writes.clear()
+    return writes
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_burst_of_saves_becomes_one_write(store):
+    state = {"selected": None, "streams": {"utama": {"state": "idle"}}}
+    for i in range(10):
+        state["selected"] = f"video-{i}.mp4"
+        state_store.save_state(state)
+    _wait_for(lambda: store)
+    time.sleep(2 * DEBOUNCE)
+    assert len(store) == 1
+    assert state_store.load_state()["selected"] == "video-9.mp4"
+
+
+def test_snapshot_is_taken_when_save_is_called(store):
+    state = {"selected": "a.mp4", "streams": {}}
+    state_store.save_state(state)
+    state["selected"] = "b.mp4" # diubah setelah save, sebelum thread penulis berjalan
+    state_store.flush_state()
+    assert state_store.load_state()["selected"] == "a.mp4"
+
+
+def test_only_changed_rows_are_written_and_missing_slots_are_deleted(store):
+    state_store.save_state({"selected": "a.mp4", "streams": {"utama": {"pid": 1}, "kedua": {"pid": 2}}})
+    state_store.flush_state()
+    state_store.save_state({"selected": "a.mp4", "streams": {"utama": {"pid": 1}}})
+    state_store.flush_state()
+    state_store.save_state({"selected": "a.mp4", "streams": {"utama": {"pid": 1}}})
+    state_store.flush_state()
+    assert state_store.load_state() == {"selected": "a.mp4", "streams": {"utama": {"pid": 1}}}
+    with sqlite3.connect(state_store._db_path) as conn:
+        assert conn.execute("SELECT slot_id FROM stream_state").fetchall() == [("utama",)]
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_legacy_json_is_imported_once(tmp_path, store):
+    legacy = tmp_path / "bot_state.json"
+    legacy.write_text(json.dumps({"selected": "lama.mp4", "streams": {"default": {"pid": 9}}}))
+    state_store.init_store(str(tmp_path / "baru.db"), str(legacy))
+    assert state_store.load_state() == {"selected": "lama.mp4", "streams": {"default": {"pid": 9}}}
+    assert not legacy.exists() and (tmp_path / "bot_state.json.migrated").exists()
+
+
+def test_corrupt_database_is_moved_aside(tmp_path, store):
+    db_path = tmp_path / "rusak.db"
+    db_path.write_bytes(b"bukan database sqlite" * 100)
+    state_store.init_store(str(db_path))
+    assert state_store.load_state() is None
+    assert [p for p in os.listdir(tmp_path) if p.startswith("rusak.db.corrupt-")]
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+import stream_config
+import streamer
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data))
+    # mtime_ns bisa sama untuk dua tulisan yang sangat berdekatan; ukuran pun bisa sama.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_invalid_values_fall_back_to_defaults():
+    config, problems = stream_config.validate_config({
+        "RETRY_LIMIT": 0, "FFMPEG_PRESET": "kilat", "ENCODE_CACHE": "ya", "VIDEO_FILTER": "scale={lebar}:-2",
+        "VIDEO_EXTENSIONS": ["MP4", ".MKV"], "STREAM_URL": " rtmp://a.example/live2/ ", "KUNCI_LAIN": 1,
+        "BITRATE_LADDER_KBPS": [4500, 50], "SLOTS": {"utama": {"VIDEO_BITRATE_KBPS": 99999, "FFMPEG_PRESET": "fast"}},
+    })
+    defaults = stream_config.DEFAULT_CONFIG
+    for key in ("RETRY_LIMIT", "FFMPEG_PRESET", "ENCODE_CACHE", "VIDEO_FILTER", "BITRATE_LADDER_KBPS"):
+        assert config[key] == defaults[key]
+        assert any(problem.startswith(key) for problem in problems)
+    assert config["VIDEO_EXTENSIONS"] == [".mp4", ".mkv"]
+    assert config["STREAM_URL"] == "rtmp://a.example/live2"
+    assert config["KUNCI_LAIN"] == 1
+    assert config["SLOTS"]["utama"] == {"FFMPEG_PRESET": "fast"}
+    assert any(problem.startswith("SLOTS.utama.VIDEO_BITRATE_KBPS") for problem in problems)
+
+
+def test_numbers_keep_their_type():
+    config, problems = stream_config.validate_config({"RETRY_LIMIT": 3.0, "BENCHMARK_MIN_SPEED": 2, "METRICS_PORT": True})
+    assert config["RETRY_LIMIT"] == 3 and isinstance(config["RETRY_LIMIT"], int)
+    assert config["BENCHMARK_MIN_SPEED"] == 2
+    assert config["METRICS_PORT"] == stream_config.DEFAULT_CONFIG["METRICS_PORT"] and problems
+
+
+def test_load_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    _write(path, {"RETRY_LIMIT": 7})
+    assert stream_config.load_config(str(path))["RETRY_LIMIT"] == 7
+
+    reads = []
+    real_load = json.load
+    monkeypatch.setattr(stream_config.json, "load", lambda f: reads.append(f) or real_load(f))
+    config = stream_config.load_config(str(path))
+    config["RETRY_LIMIT"] = 99 # salinan; tidak mengubah cache
+    assert stream_config.load_config(str(path))["RETRY_LIMIT"] == 7 and reads == []
+
+    _write(path, {"RETRY_LIMIT": 8})
+    assert stream_config.load_config(str(path))["RETRY_LIMIT"] == 8 and len(reads) == 1
+
+
+def test_broken_json_keeps_the_last_valid_config(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, {"RETRY_LIMIT": 7})
+    stream_config.load_config(str(path))
+    path.write_text("{ rusak")
+    assert stream_config.load_config(str(path))["RETRY_LIMIT"] == 7
+
+
+def test_missing_file_is_created_with_defaults(tmp_path):
+    path = tmp_path / "config.json"
+    assert stream_config.load_config(str(path), create_missing=True) == stream_config.DEFAULT_CONFIG
+    assert json.loads(path.read_text()) == stream_config.DEFAULT_CONFIG
+    assert [p.name for p in tmp_path.iterdir()] == ["config.json"]
+
+
+def test_changed_keys():
+    assert stream_config.changed_keys({"a": 1, "b": 2}, {"a": 1, "b": 3, "c": 4}) == ["b", "c"]
+
+
+def test_watch_reports_old_and_new_config(tmp_path):
+    path = tmp_path / "config.json"
+    _write(path, {"RETRY_LIMIT": 7})
+    changes = []
+    changed = threading.Event()
+    stop = stream_config.watch_config(str(path), lambda old, new: (changes.append((old, new)), changed.set()),
+                                      poll_interval=0.05)
+    try:
+        _write(path, {"RETRY_LIMIT": 8})
+        assert changed.wait(5)
+    finally:
+        stop.set()
+    old, new = changes[0]
+    assert (old["RETRY_LIMIT"], new["RETRY_LIMIT"]) == (7, 8)
+
+
+def test_hot_reload_diff_in_the_streamer(monkeypatch):
+    events = []
+    monkeypatch.setattr(streamer, "emit_event", lambda event_type, **data: events.append((event_type, data)))
+    monkeypatch.setattr(streamer, "CURRENT_SLOT", "utama")
+    monkeypatch.setattr(streamer, "CURRENT_PROFILE", None)
+    monkeypatch.setattr(streamer, "ENCODING_ACTIVE", True)
+    streamer.CONFIG_RESTART.clear()
+    old = dict(stream_config.DEFAULT_CONFIG, SLOTS={"utama": {"VIDEO_BITRATE_KBPS": 4500}})
+    monkeypatch.setattr(streamer, "CONFIG", dict(old, VIDEO_BITRATE_KBPS=4500))
+    new = dict(old, RETRY_LIMIT=9, STREAM_URL="rtmp://lain.example/live2", VIDEO_BITRATE_KBPS=1000,
+               FFMPEG_PRESET="fast")
+    try:
+        streamer.on_config_change(old, new)
+        # VIDEO_BITRATE_KBPS dari profil slot tetap menang atas nilai global.
+        assert streamer.CONFIG["VIDEO_BITRATE_KBPS"] == 4500
+        assert streamer.CONFIG["RETRY_LIMIT"] == 9 and streamer.CONFIG["FFMPEG_PRESET"] == "fast"
+        assert streamer.CONFIG["STREAM_URL"] == stream_config.DEFAULT_CONFIG["STREAM_URL"]
+        assert events == [("config_reload", {"applied": ["RETRY_LIMIT", "FFMPEG_PRESET"],
+                                             "pending": ["STREAM_URL"], "restart": True})]
+        assert streamer.CONFIG_RESTART.is_set()
+    finally:
+        streamer.CONFIG_RESTART.clear()
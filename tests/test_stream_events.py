@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import threading
+
+import pytest
+
+import streamer
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    telegram_bot = pytest.importorskip("telegram_bot", exc_type=ImportError)
+    monkeypatch.setattr(telegram_bot, "STREAM_EVENTS", {})
+    monkeypatch.setattr(telegram_bot, "STREAM_STATUS", {})
+    return telegram_bot
+
+
+def test_emit_event_writes_one_json_line(monkeypatch):
+    out = io.StringIO()
+    monkeypatch.setattr(streamer.sys, "stdout", out)
+    monkeypatch.setattr(streamer, "CURRENT_SLOT", "utama")
+    streamer.emit_event("retry", attempt=2, reason="network")
+    line, rest = out.getvalue().split("\n", 1)
+    assert rest == ""
+    event = json.loads(line)
+    assert (event["event"], event["slot"], event["attempt"], event["reason"]) == ("retry", "utama", 2, "network")
+
+
+def test_events_from_several_threads_never_interleave(monkeypatch):
+    class SlowStream(io.StringIO):
+        def write(self, text):
+            # Menulis per karakter memperbesar peluang dua thread saling menyisip tanpa lock.
+            for char in text:
+                super().write(char)
+            return len(text)
+
+    out = SlowStream()
+    monkeypatch.setattr(streamer.sys, "stdout", out)
+    threads = [threading.Thread(target=lambda n=n: [streamer.emit_event("progress", n=n, i=i) for i in range(50)])
+               for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 200
+    assert all(json.loads(line)["event"] == "progress" for line in lines)
+
+
+def test_pipe_safe_stdout_detaches_when_the_reader_is_gone():
+    read_fd, write_fd = os.pipe()
+    stream = os.fdopen(write_fd, "w")
+    safe = streamer.PipeSafeStdout(stream)
+    os.close(read_fd)
+    safe.write("x" * 100000)
+    safe.flush()
+    assert safe.detached
+    safe.write("masih bisa menulis\n")
+    safe.flush()
+    stream.close()
+
+
+def test_streamer_lines_become_events(bot):
+    line = json.dumps({"event": "state", "ts": 1.0, "state": "streaming"})
+    assert bot._parse_stream_output_line(line)["state"] == "streaming"
+    for text in ("frame=  100 fps=30", "{bukan json", '{"tanpa": "event"}'):
+        event = bot._parse_stream_output_line(text)
+        assert event["event"] == "output" and event["message"] == text
+
+
+def test_ring_buffer_is_bounded_and_keeps_the_summary(bot):
+    bot.record_stream_event("utama", {"event": "state", "ts": 1.0, "state": "streaming"})
+    for i in range(bot.EVENT_BUFFER_SIZE + 10):
+        bot.record_stream_event("utama", {"event": "output", "ts": 2.0, "message": str(i)})
+    events = bot.STREAM_EVENTS["utama"]
+    assert len(events) == bot.EVENT_BUFFER_SIZE
+    assert events[-1]["message"] == str(bot.EVENT_BUFFER_SIZE + 9)
+    assert bot.STREAM_STATUS["utama"]["state"] == "streaming"
+    assert [e["message"] for e in bot.get_recent_events("utama", limit=2)] == [
+        str(bot.EVENT_BUFFER_SIZE + 8), str(bot.EVENT_BUFFER_SIZE + 9)]
@@ -0,0 +1,253 @@
+import sys
+import time
+import shutil
+import socket
+import logging
+import threading
+import subprocess
+
+import pytest
+
+import stream_config
+import stream_fanout
+import streamer
+
+# Pengganti FFmpeg relay: tersambung ke listener TCP lokal (tujuan "RTMP"), mengirim nama tujuan,
+# lalu keluar segera untuk tujuan "flaky" atau bertahan sampai dihentikan untuk tujuan lain.
+FAKE_RELAY = """
+import sys, socket, time
+host, port, name = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+sock = socket.create_connection((host, port))
+sock.sendall(name.encode() + b"\\n")
+if name == "flaky":
+    sys.exit(1)
+while True:
+    time.sleep(1)
+"""
+
+
+class Listener:
+    """Listener TCP lokal yang mencatat nama setiap relay yang tersambung."""
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.connections = []
+        self.lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                name = conn.makefile().readline().strip()
+            with self.lock:
+                self.connections.append(name)
+
+    def count(self, name):
+        with self.lock:
+            return self.connections.count(name)
+
+    def close(self):
+        self.sock.close()
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def listener(monkeypatch):
+    server = Listener()
+
+    def fake_relay_command(port, destination_url):
+        return [sys.executable, "-c", FAKE_RELAY, "127.0.0.1", str(server.port), destination_url]
+
+    monkeypatch.setattr(stream_fanout, "build_relay_command", fake_relay_command)
+    monkeypatch.setattr(stream_fanout, "RELAY_BACKOFF_BASE_SEC", 0.1)
+    monkeypatch.setattr(stream_fanout, "RELAY_BACKOFF_MAX_SEC", 0.2)
+    yield server
+    server.close()
+
+
+def test_failed_relay_restarts_without_touching_others(listener):
+    events = []
+    handle = stream_fanout.start_relays(
+        [{"name": "steady", "url": "steady"}, {"name": "flaky", "url": "flaky"}],
+        logging.getLogger("test-relay"), lambda event_type, **data: events.append((event_type, data)))
+    try:
+        steady, flaky = handle["relays"]
+        assert _wait_for(lambda: listener.count("steady") == 1 and listener.count("flaky") >= 3)
+        steady_pid = steady["process"].pid
+
+        assert flaky["restarts"] >= 2
+        assert steady["restarts"] == 0
+        assert steady["process"].poll() is None
+        assert steady["process"].pid == steady_pid
+        assert listener.count("steady") == 1
+        assert not any(data["name"] == "steady" and data["state"] == "down" for _, data in events)
+        assert any(data["name"] == "flaky" and data["state"] == "down" for _, data in events)
+    finally:
+        stream_fanout.stop_relays(handle)
+
+    assert steady["process"].poll() is not None
+    assert not any(r["thread"].is_alive() for r in handle["relays"])
+
+
+def test_each_destination_gets_its_own_free_port(listener):
+    destinations = [{"name": f"tujuan-{i}", "url": f"tujuan-{i}"} for i in range(4)]
+    handle = stream_fanout.start_relays(destinations, logging.getLogger("test-relay"), lambda *a, **k: None)
+    try:
+        ports = [relay["port"] for relay in handle["relays"]]
+        assert len(set(ports)) == len(ports)
+        assert handle["outputs"] == [stream_fanout.relay_output_url(port) for port in ports]
+    finally:
+        stream_fanout.stop_relays(handle)
+
+
+def test_pick_local_port_is_bindable():
+    port = stream_fanout.pick_local_port()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", port))
+    assert 0 < port < 65536
+
+
+def test_pick_local_port_skips_taken_ports():
+    first = stream_fanout.pick_local_port()
+    assert stream_fanout.pick_local_port({first}) != first
+
+
+
+# --- Perintah encoder untuk fan-out ---
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setattr(streamer, "CONFIG", dict(stream_config.DEFAULT_CONFIG))
+    monkeypatch.setattr(streamer, "BITRATE_TUNER", None)
+    monkeypatch.setattr(streamer, "PRESET_PROFILE", None)
+    return streamer.CONFIG
+
+
+def _tee_targets(command):
+    assert command[command.index('-f') + 1] == 'tee'
+    return command[command.index('-f') + 2].split("|")
+
+
+ENCODE_MODE = {"video": "encode", "audio": "encode", "has_audio": True, "width": 1280, "height": 720, "fps": 30}
+
+
+def test_fanout_command_has_one_independent_udp_output_per_destination(config):
+    ports = []
+    for _ in range(3):
+        ports.append(stream_fanout.pick_local_port(set(ports)))
+    outputs = [stream_fanout.relay_output_url(port) for port in ports]
+    command = streamer.build_stream_command("in.mp4", outputs, ENCODE_MODE)
+
+    targets = _tee_targets(command)
+    assert targets == [f"[f=mpegts:onfail=ignore]udp://127.0.0.1:{port}?pkt_size={stream_fanout.UDP_PACKET_SIZE}"
+                       for port in ports]
+    assert len({t.split(":")[-1] for t in targets}) == 3
+    assert 'flv' not in command # Encoder tidak pernah menulis RTMP langsung saat fan-out.
+
+
+def test_fanout_encode_cache_pass_keeps_relays_optional(config, monkeypatch):
+    monkeypatch.setattr(streamer, "CURRENT_SLOT", "utama")
+    outputs = [stream_fanout.relay_output_url(port) for port in (40001, 40002)]
+    command = streamer.build_encode_cache_pass_command(
+        streamer.build_stream_command("in.mp4", outputs, ENCODE_MODE), "cache/in.mp4", outputs)
+    targets = _tee_targets(command)
+    assert targets[:2] == [f"[f=mpegts:onfail=ignore]{url}" for url in outputs]
+    assert targets[2].startswith("[f=mp4:movflags=+faststart:onfail=ignore]cache/in.mp4.")
+    assert '-stream_loop' not in command
+
+
+def test_single_destination_writes_flv_directly(config):
+    command = streamer.build_stream_command("in.mp4", "rtmp://a.example/live2/KEY", ENCODE_MODE)
+    assert command[-3:] == ['-f', 'flv', 'rtmp://a.example/live2/KEY']
+
+
+# --- Relay meneruskan data dari port UDP lokal ke tujuan (loopback) ---
+
+# Pengganti relay FFmpeg: membaca datagram dari port UDP relay dan meneruskannya ke tujuan TCP.
+FORWARD_RELAY = """
+import sys, socket
+port, host, dest_port = int(sys.argv[1]), sys.argv[2], int(sys.argv[3])
+udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+udp.bind(("127.0.0.1", port))
+out = socket.create_connection((host, dest_port))
+while True:
+    out.sendall(udp.recv(65536))
+"""
+
+
+class Sink:
+    """Listener TCP lokal yang mengumpulkan semua byte yang diterima (tujuan RTMP tiruan)."""
+    def __init__(self):
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.data = bytearray()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        try:
+            conn, _ = self.sock.accept()
+        except OSError:
+            return
+        with conn:
+            while chunk := conn.recv(65536):
+                self.data += chunk
+
+    def close(self):
+        self.sock.close()
+
+
+def test_each_relay_forwards_its_own_port_to_its_destination(monkeypatch):
+    sinks = {"a": Sink(), "b": Sink()}
+
+    def forward_relay_command(port, destination_url):
+        return [sys.executable, "-c", FORWARD_RELAY, str(port), "127.0.0.1", str(sinks[destination_url].port)]
+
+    monkeypatch.setattr(stream_fanout, "build_relay_command", forward_relay_command)
+    handle = stream_fanout.start_relays([{"name": name, "url": name} for name in sinks],
+                                        logging.getLogger("test-relay"), lambda *a, **k: None)
+    try:
+        assert _wait_for(lambda: all(r["process"] is not None for r in handle["relays"]))
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as encoder:
+            def send_all():
+                for relay in handle["relays"]:
+                    encoder.sendto(f"paket-{relay['name']};".encode(), ("127.0.0.1", relay["port"]))
+                return all(f"paket-{name};".encode() in sink.data for name, sink in sinks.items())
+            # UDP tanpa jaminan: kirim ulang sampai relay siap membaca.
+            assert _wait_for(send_all)
+        assert b"paket-b" not in sinks["a"].data and b"paket-a" not in sinks["b"].data
+    finally:
+        stream_fanout.stop_relays(handle)
+        for sink in sinks.values():
+            sink.close()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg tidak terpasang")
+def test_ffmpeg_relay_forwards_mpegts_as_flv():
+    sink = Sink()
+    port = stream_fanout.pick_local_port()
+    relay = subprocess.Popen(stream_fanout.build_relay_command(port, f"tcp://127.0.0.1:{sink.port}"),
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    encoder = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-re', '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=25', '-t', '4',
+         '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '25', '-f', 'mpegts',
+         stream_fanout.relay_output_url(port)], stdin=subprocess.DEVNULL)
+    try:
+        assert _wait_for(lambda: sink.data.startswith(b"FLV") and len(sink.data) > 10_000, timeout=15)
+    finally:
+        encoder.kill()
+        relay.kill()
+        encoder.wait()
+        relay.wait()
+        sink.close()
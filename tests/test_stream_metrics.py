@@ -0,0 +1,110 @@
+import io
+import urllib.error
+import urllib.request
+
+import pytest
+
+import stream_metrics
+
+PROGRESS_OUTPUT = b"""frame=120
+fps=29.97
+bitrate=2480.5kbits/s
+total_size=1240000
+out_time_us=4000000
+out_time=00:00:04.000000
+dup_frames=1
+drop_frames=0
+speed=1.01x
+progress=continue
+frame=150
+fps=30.00
+bitrate=N/A
+out_time_us=N/A
+speed=N/A
+progress=end
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(stream_metrics, "PROGRESS_SERIES", type(stream_metrics.PROGRESS_SERIES)(maxlen=5))
+    monkeypatch.setattr(stream_metrics, "_state", dict(stream_metrics._state, slot="utama", ffmpeg_up=0,
+                                                       ffmpeg_starts=0, stall_restarts=0, last_advance=None,
+                                                       last_frame=None, last_out_time=None))
+
+
+def test_read_progress_turns_each_block_into_a_sample():
+    samples = []
+    stream_metrics.read_progress(io.BytesIO(PROGRESS_OUTPUT), samples.append)
+    first, last = samples
+    assert (first["frame"], first["fps"], first["bitrate_kbps"], first["out_time_s"], first["speed"]) == (
+        120, 29.97, 2480.5, 4.0, 1.01)
+    assert (first["dup_frames"], first["drop_frames"], first["progress"]) == (1, 0, "continue")
+    # N/A menjadi None, dan field blok sebelumnya tidak terbawa.
+    assert (last["frame"], last["bitrate_kbps"], last["out_time_s"], last["speed"], last["dup_frames"]) == (
+        150, None, None, None, None)
+    assert stream_metrics.latest_sample()["progress"] == "end"
+
+
+def test_history_is_bounded():
+    for frame in range(8):
+        stream_metrics.record_sample({"ts": 1.0, "frame": frame})
+    assert len(stream_metrics.PROGRESS_SERIES) == 5
+    assert stream_metrics.latest_sample()["frame"] == 7
+
+
+def test_rolling_average_ignores_missing_and_old_values(monkeypatch):
+    monkeypatch.setattr(stream_metrics.time, "time", lambda: 1000.0)
+    for ts, speed in ((900.0, 0.1), (950.0, 1.0), (980.0, None), (990.0, 0.8)):
+        stream_metrics.record_sample({"ts": ts, "speed": speed})
+    assert stream_metrics.rolling_average("speed", seconds=60) == pytest.approx(0.9)
+    assert stream_metrics.rolling_average("fps", seconds=60) is None
+
+
+def test_prometheus_text():
+    stream_metrics.set_ffmpeg_running(True)
+    stream_metrics.read_progress(io.BytesIO(PROGRESS_OUTPUT.split(b"frame=150")[0]))
+    text = stream_metrics.render_prometheus()
+    assert text.endswith("\n")
+    assert 'streamer_ffmpeg_up{slot="utama"} 1\n' in text
+    assert 'streamer_ffmpeg_starts_total{slot="utama"} 1\n' in text
+    assert 'streamer_bitrate_kbps{slot="utama"} 2480.5\n' in text
+    assert "# TYPE streamer_frames_total counter\n" in text
+    # Setiap metrik punya tepat satu HELP, satu TYPE, dan satu nilai.
+    lines = text.splitlines()
+    assert len(lines) % 3 == 0
+    assert all(line.startswith("# HELP ") for line in lines[0::3])
+
+
+def test_prometheus_text_skips_metrics_without_a_value():
+    text = stream_metrics.render_prometheus()
+    assert "streamer_ffmpeg_up" in text
+    assert "streamer_speed" not in text and "streamer_fps" not in text
+
+
+def test_metrics_endpoint():
+    port = stream_metrics.start_metrics_server(0, "utama")
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert b'streamer_ffmpeg_up{slot="utama"} 0' in response.read()
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/lain", timeout=5)
+
+
+def test_advance_clock_only_moves_when_frame_or_out_time_grows(monkeypatch):
+    assert stream_metrics.seconds_since_advance() is None
+    now = [100.0]
+    monkeypatch.setattr(stream_metrics.time, "monotonic", lambda: now[0])
+    stream_metrics.set_ffmpeg_running(True)
+    stream_metrics.record_sample({"ts": 1.0, "frame": 10, "out_time_s": 0.3})
+    now[0] = 140.0
+    stream_metrics.record_sample({"ts": 2.0, "frame": 10, "out_time_s": 0.3})
+    stream_metrics.record_sample({"ts": 3.0, "frame": None, "out_time_s": None})
+    assert stream_metrics.seconds_since_advance() == 40.0
+    stream_metrics.record_sample({"ts": 4.0, "frame": 10, "out_time_s": 0.4})
+    assert stream_metrics.seconds_since_advance() == 0.0
+    # Proses baru mulai dari frame 0 lagi; itu bukan stall.
+    now[0] = 150.0
+    stream_metrics.set_ffmpeg_running(True)
+    stream_metrics.record_sample({"ts": 5.0, "frame": 1, "out_time_s": 0.0})
+    assert stream_metrics.seconds_since_advance() == 0.0
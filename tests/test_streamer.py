@@ -0,0 +1,270 @@
+import pytest
+
+import stream_config
+import streamer
+
+PRIMARY = "rtmp://a.rtmp.youtube.com/live2/KEY"
+BACKUP = "rtmp://b.rtmp.youtube.com/live2?backup=1/KEY"
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setattr(streamer, "CONFIG", dict(stream_config.DEFAULT_CONFIG))
+    monkeypatch.setattr(streamer, "BITRATE_TUNER", None)
+    monkeypatch.setattr(streamer, "PRESET_PROFILE", None)
+    monkeypatch.setattr(streamer, "CURRENT_SLOT", "utama")
+    return streamer.CONFIG
+
+
+COPY_MODE = {"video": "copy", "audio": "copy", "has_audio": True}
+
+
+# --- retarget_command ---
+
+def test_retarget_replaces_only_the_exact_output_url(config):
+    command = streamer.build_stream_command("in.mp4", PRIMARY, COPY_MODE)
+    assert streamer.retarget_command(command, PRIMARY, BACKUP) == command[:-1] + [BACKUP]
+
+
+def test_retarget_does_not_touch_urls_that_merely_share_a_prefix(config):
+    # Ingest utama adalah awalan dari ingest lain dan dari nama file input.
+    short = "rtmp://a.rtmp.youtube.com/live2"
+    longer = short + "?backup=1"
+    command = streamer.build_stream_command(short + ".mp4", longer, COPY_MODE)
+    assert streamer.retarget_command(command, short, "rtmp://c.example/live") == command
+
+    command = streamer.build_stream_command(short + ".mp4", short, COPY_MODE)
+    retargeted = streamer.retarget_command(command, short, "rtmp://c.example/live")
+    assert retargeted[-1] == "rtmp://c.example/live"
+    assert retargeted[retargeted.index('-i') + 1] == short + ".mp4"
+
+
+def test_retarget_rewrites_the_matching_tee_slave_only(config):
+    encode = dict(COPY_MODE, video="encode", width=1280, height=720, fps=30)
+    command = streamer.build_encode_cache_pass_command(
+        streamer.build_stream_command("in.mp4", PRIMARY, encode), f"cache/{PRIMARY.rsplit('/', 1)[-1]}.mp4", PRIMARY)
+    retargeted = streamer.retarget_command(command, PRIMARY, BACKUP)
+    flv, cache = retargeted[-1].split("|")
+    assert flv == f"[f=flv:onfail=abort]{BACKUP}"
+    assert cache == command[-1].split("|")[1]
+    assert retargeted[:-1] == command[:-1]
+
+
+# --- slot ---
+
+@pytest.mark.parametrize("slot", ["default", "utama", "slot_2", "A-b-9", "x" * 32])
+def test_valid_slot_names(slot):
+    assert streamer.SLOT_ID_PATTERN.fullmatch(slot)
+
+
+@pytest.mark.parametrize("slot", ["", "x" * 33, "../etc", "a/b", "slot 1", "slot.2", "utama\n"])
+def test_invalid_slot_names(slot):
+    assert not streamer.SLOT_ID_PATTERN.fullmatch(slot)
+
+
+def test_slot_dir():
+    assert streamer.get_slot_dir(streamer.DEFAULT_SLOT) == "."
+    assert streamer.get_slot_dir("utama") == f"{streamer.SLOTS_DIR}/utama"
+
+
+def test_profile_overrides_default_to_the_slot_name():
+    config = {"SLOTS": {"utama": {"VIDEO_BITRATE_KBPS": 4500, "SLOTS": {}}, "hemat": {"VIDEO_BITRATE_KBPS": 1200}}}
+    assert streamer.get_profile_overrides(config, "utama") == {"VIDEO_BITRATE_KBPS": 4500}
+    assert streamer.get_profile_overrides(config, "utama", "hemat") == {"VIDEO_BITRATE_KBPS": 1200}
+    assert streamer.get_profile_overrides(config, "lain") == {}
+
+
+def test_apply_slot_profile_moves_key_and_log_into_the_slot_dir(config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(streamer, "CURRENT_PROFILE", None)
+    config["SLOTS"] = {"utama": {"FFMPEG_PRESET": "fast"}}
+    streamer.apply_slot_profile("utama")
+    assert config["FFMPEG_PRESET"] == "fast"
+    assert config["KEY_FILENAME"] == f"slots/utama/{stream_config.DEFAULT_CONFIG['KEY_FILENAME']}"
+    assert config["LOG_FILE"] == f"slots/utama/{stream_config.DEFAULT_CONFIG['LOG_FILE']}"
+    assert (tmp_path / "slots" / "utama").is_dir()
+
+
+# --- keputusan per-track ---
+
+H264 = {"video_codec": "h264", "pix_fmt": "yuv420p", "width": 1280, "height": 720, "fps": 30,
+        "format_name": "mov,mp4,m4a,3gp,3g2,mj2"}
+AAC = {"audio_codec": "aac", "audio_sample_rate": 48000}
+
+
+@pytest.mark.parametrize("info, video, audio, label", [
+    (dict(H264, **AAC), "copy", "copy", "COPY STREAM"),
+    (dict(H264, format_name="matroska,webm", **AAC), "copy", "copy", "REMUX"),
+    (dict(H264, audio_codec="opus", audio_sample_rate=48000), "copy", "encode", "COPY VIDEO + ENCODE AUDIO"),
+    (dict(H264, video_codec="hevc", **AAC), "encode", "copy", "ENCODE VIDEO (H.264) + COPY AUDIO"),
+    (dict(H264, pix_fmt="yuv420p10le", audio_codec="aac", audio_sample_rate=22050), "encode", "encode", "RE-ENCODE"),
+])
+def test_decide_stream_mode_per_track(info, video, audio, label):
+    mode = streamer.decide_stream_mode(info)
+    assert (mode["video"], mode["audio"]) == (video, audio)
+    assert mode["label"].startswith(label)
+
+
+def test_stream_command_follows_the_per_track_decision(config):
+    mode = streamer.decide_stream_mode(dict(H264, audio_codec="mp3", audio_sample_rate=44100))
+    command = streamer.build_stream_command("in.mp4", PRIMARY, mode)
+    assert command[command.index('-c:v') + 1] == "copy"
+    assert command[command.index('-c:a') + 1] == "aac" and '-bsf:a' not in command
+
+    mode = streamer.decide_stream_mode(dict(H264))
+    assert not mode["has_audio"] and mode["audio"] == "copy"
+    assert '-bsf:a' not in streamer.build_stream_command("in.mp4", PRIMARY, mode)
+
+
+# --- watchdog stall ---
+
+class FakeProcess:
+    """Proses FFmpeg palsu: tetap hidup sampai terminate(), atau keluar sendiri setelah exit_after wait()."""
+    pid = 4242
+
+    def __init__(self, exit_after=None):
+        self.exit_after = exit_after
+        self.waits = 0
+        self.terminated = False
+
+    def wait(self, timeout=None):
+        self.waits += 1
+        if self.terminated or (self.exit_after is not None and self.waits > self.exit_after):
+            return 0
+        raise streamer.subprocess.TimeoutExpired("ffmpeg", timeout)
+
+    def terminate(self):
+        self.terminated = True
+
+    def kill(self):
+        self.terminated = True
+
+
+@pytest.fixture
+def watchdog(config, monkeypatch):
+    events = []
+    monkeypatch.setattr(streamer, "emit_event", lambda event_type, **data: events.append((event_type, data)))
+    for event in (streamer.CONFIG_RESTART, streamer.INGEST_RETURN, streamer.BITRATE_RESTART):
+        event.clear()
+    monkeypatch.setattr(streamer.stream_metrics, "_state", dict(streamer.stream_metrics._state, stall_restarts=0))
+    config["STALL_TIMEOUT_SEC"] = 30
+    return events
+
+
+def test_watchdog_stops_a_stalled_ffmpeg(watchdog, monkeypatch):
+    stalled = iter([5.0, 29.0, 31.0])
+    monkeypatch.setattr(streamer.stream_metrics, "seconds_since_advance", lambda: next(stalled))
+    process = FakeProcess()
+    assert streamer.wait_with_stall_watchdog(process, poll_interval=0) == 31.0
+    assert process.terminated
+    assert watchdog[0][0] == "stall" and watchdog[0][1]["stalled_for"] == 31.0
+    assert streamer.stream_metrics._state["stall_restarts"] == 1
+
+
+def test_watchdog_leaves_a_progressing_ffmpeg_alone(watchdog, monkeypatch):
+    monkeypatch.setattr(streamer.stream_metrics, "seconds_since_advance", lambda: 1.0)
+    process = FakeProcess(exit_after=3)
+    assert streamer.wait_with_stall_watchdog(process, poll_interval=0) is None
+    assert not process.terminated and watchdog == []
+
+
+def test_watchdog_is_off_when_the_timeout_is_zero(watchdog, config, monkeypatch):
+    config["STALL_TIMEOUT_SEC"] = 0
+    monkeypatch.setattr(streamer.stream_metrics, "seconds_since_advance", lambda: 999.0)
+    process = FakeProcess(exit_after=3)
+    assert streamer.wait_with_stall_watchdog(process, poll_interval=0) is None
+    assert not process.terminated
+
+
+def test_watchdog_stops_ffmpeg_for_a_requested_restart(watchdog, monkeypatch):
+    monkeypatch.setattr(streamer.stream_metrics, "seconds_since_advance", lambda: 1.0)
+    streamer.BITRATE_RESTART.set()
+    try:
+        process = FakeProcess()
+        assert streamer.wait_with_stall_watchdog(process, poll_interval=0) is None
+        assert process.terminated and watchdog == []
+    finally:
+        streamer.BITRATE_RESTART.clear()
+
+
+# --- resume & backoff ---
+
+def test_input_seek_goes_before_the_input(config):
+    command = streamer.build_stream_command("in.mp4", PRIMARY, COPY_MODE)
+    seeked = streamer.add_input_seek(command, 83.25)
+    index = seeked.index('-i')
+    assert seeked[index - 3:index] == ['-ss', "83.250", '-noaccurate_seek']
+    assert seeked[:index - 3] + seeked[index:] == command
+
+
+@pytest.mark.parametrize("previous, streamed, duration, expected", [
+    (0.0, 30.0, 100.0, 30.0),
+    (80.0, 30.0, 100.0, 10.0),     # melewati akhir file, lanjut di putaran berikutnya
+    (0.0, 250.0, 100.0, 50.0),
+    (0.0, 99.5, 100.0, 0.0),       # terlalu dekat dengan akhir: mulai dari awal
+    (10.0, 5.0, None, 0.0),        # durasi tidak diketahui
+    (10.0, 5.0, 0, 0.0),
+])
+def test_next_resume_position(previous, streamed, duration, expected):
+    assert streamer.next_resume_position(previous, streamed, duration) == pytest.approx(expected)
+
+
+def test_retry_delay_backs_off_with_jitter_and_a_cap(config):
+    config["RETRY_BACKOFF_BASE_SEC"] = 2
+    config["RETRY_BACKOFF_MAX_SEC"] = 30
+    for attempt, base in ((1, 2), (2, 4), (3, 8), (4, 16), (5, 30), (12, 30)):
+        delays = [streamer.compute_retry_delay(attempt) for _ in range(200)]
+        assert all(base / 2 <= delay <= base for delay in delays)
+        # Jitter: percobaan dari beberapa slot tidak jatuh di detik yang sama.
+        assert len(set(delays)) > 1
+
+
+# --- CLI & kunci streaming ---
+
+def test_cli_takes_input_key_source_and_profile():
+    args = streamer.parse_args(["--slot", "utama", "--input", "/data/a.mp4", "--key-env", "KUNCI", "--profile", "hemat"])
+    assert (args.slot, args.input, args.key_env, args.key_file, args.profile) == (
+        "utama", "/data/a.mp4", "KUNCI", None, "hemat")
+    assert streamer.parse_args([]).slot == streamer.DEFAULT_SLOT
+
+
+def test_cli_rejects_two_key_sources():
+    with pytest.raises(SystemExit):
+        streamer.parse_args(["--key-file", "k.txt", "--key-env", "KUNCI"])
+
+
+def test_read_stream_key_sources(config, tmp_path, monkeypatch):
+    monkeypatch.setenv("KUNCI", "  abcd-1234\n")
+    assert streamer.read_stream_key(key_env="KUNCI") == "abcd-1234"
+    monkeypatch.setenv("KOSONG", "")
+    assert streamer.read_stream_key(key_env="KOSONG") is None
+
+    key_file = tmp_path / "kunci.txt"
+    key_file.write_text("wxyz-5678\n")
+    assert streamer.read_stream_key(key_file=str(key_file)) == "wxyz-5678"
+    config["KEY_FILENAME"] = str(key_file)
+    assert streamer.read_stream_key() == "wxyz-5678"
+    key_file.write_text("   ")
+    assert streamer.read_stream_key() is None
+    assert streamer.read_stream_key(key_file=str(tmp_path / "tidak-ada.txt")) is None
+
+
+def test_main_uses_the_given_input_without_scanning(config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("guard_stdout", "install_signal_handlers", "clear_screen"):
+        monkeypatch.setattr(streamer, name, lambda: None)
+    monkeypatch.setattr(streamer, "find_video_file", lambda **kwargs: pytest.fail("folder slot tidak boleh dipindai"))
+    events, runs = [], []
+    monkeypatch.setattr(streamer, "emit_event", lambda event_type, **data: events.append((event_type, data)))
+    monkeypatch.setattr(streamer, "run_stream", lambda video_file, stream_key: runs.append((video_file, stream_key)))
+    monkeypatch.setenv("KUNCI", "abcd-1234")
+    video = tmp_path / "acara.mp4"
+    video.write_bytes(b"video")
+
+    monkeypatch.setattr(streamer.sys, "argv", ["streamer.py", "--input", str(video), "--key-env", "KUNCI"])
+    streamer.main()
+    assert runs == [(str(video), "abcd-1234")]
+
+    monkeypatch.setattr(streamer.sys, "argv", ["streamer.py", "--input", str(tmp_path / "hilang.mp4"), "--key-env", "KUNCI"])
+    streamer.main()
+    assert len(runs) == 1 and events[-1] == ("state", {"state": "error", "reason": "video_not_found"})
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+import transcoder
+
+SETTINGS = {"FFMPEG_PRESET": "veryfast", "VIDEO_BITRATE_KBPS": 2500, "AUDIO_BITRATE_KBPS": 128,
+            "RESOLUTION_NORMALIZE": True, "VIDEO_FILTER": ""}
+
+
+@pytest.fixture
+def videos_dir(tmp_path):
+    for folder in ("slot-a", "slot-b"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "intro.mp4").write_bytes(folder.encode())
+    return tmp_path
+
+
+def _finish(path):
+    with open(path, 'wb') as f:
+        f.write(b"mezzanine")
+    return path
+
+
+@pytest.mark.parametrize("key, value", [
+    ("FFMPEG_PRESET", "fast"), ("VIDEO_BITRATE_KBPS", 4500), ("AUDIO_BITRATE_KBPS", 160),
+    ("RESOLUTION_NORMALIZE", False), ("VIDEO_FILTER", "scale={width}:{height}"),
+])
+def test_encode_settings_change_the_mezzanine_name(videos_dir, key, value):
+    source = str(videos_dir / "slot-a" / "intro.mp4")
+    ready = _finish(transcoder.get_mezzanine_path(source, str(videos_dir), SETTINGS))
+    assert transcoder.find_ready_mezzanine(source, str(videos_dir), SETTINGS) == ready
+    assert transcoder.find_ready_mezzanine(source, str(videos_dir), dict(SETTINGS, **{key: value})) is None
+
+
+def test_missing_settings_use_the_same_defaults_as_the_command(videos_dir):
+    source = str(videos_dir / "slot-a" / "intro.mp4")
+    assert transcoder.get_mezzanine_path(source, str(videos_dir), {}) == \
+        transcoder.get_mezzanine_path(source, str(videos_dir), transcoder.TRANSCODE_DEFAULTS)
+
+
+def test_sources_with_the_same_name_keep_their_own_mezzanines(videos_dir):
+    source_a = str(videos_dir / "slot-a" / "intro.mp4")
+    source_b = str(videos_dir / "slot-b" / "intro.mp4")
+    mezzanine_a = _finish(transcoder.get_mezzanine_path(source_a, str(videos_dir), SETTINGS))
+    mezzanine_b = _finish(transcoder.get_mezzanine_path(source_b, str(videos_dir), SETTINGS))
+    assert mezzanine_a != mezzanine_b
+
+    transcoder.remove_mezzanines(source_a, str(videos_dir))
+    assert not os.path.exists(mezzanine_a)
+    assert os.path.exists(mezzanine_b)
+
+
+def test_alias_shares_the_mezzanine_of_its_object(videos_dir):
+    source = str(videos_dir / "slot-a" / "intro.mp4")
+    alias = videos_dir / "Video Intro.mp4"
+    alias.symlink_to(source)
+    assert transcoder.get_mezzanine_path(str(alias), str(videos_dir), SETTINGS) == \
+        transcoder.get_mezzanine_path(source, str(videos_dir), SETTINGS)
+
+
+def test_submit_sweeps_only_stale_mezzanines_of_the_same_source(videos_dir, monkeypatch):
+    source_a = str(videos_dir / "slot-a" / "intro.mp4")
+    source_b = str(videos_dir / "slot-b" / "intro.mp4")
+    old_a = _finish(transcoder.get_mezzanine_path(source_a, str(videos_dir), dict(SETTINGS, VIDEO_BITRATE_KBPS=1500)))
+    ready_b = _finish(transcoder.get_mezzanine_path(source_b, str(videos_dir), SETTINGS))
+
+    submitted = []
+
+    class Executor:
+        def submit(self, *args):
+            submitted.append(args)
+
+    monkeypatch.setattr(transcoder, "_executor", Executor())
+    monkeypatch.setattr(transcoder, "probe_media", lambda path: {"video_codec": "hevc", "audio_codec": "aac"})
+    monkeypatch.setattr(transcoder, "JOBS", {})
+
+    job = transcoder.submit_transcode(source_a, str(videos_dir), SETTINGS)
+    assert job["status"] == "queued"
+    assert len(submitted) == 1
+    assert not os.path.exists(old_a)
+    assert os.path.exists(ready_b)
@@ -0,0 +1,231 @@
+import os
+import errno
+import hashlib
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import upload_ingest
+from upload_ingest import DownloadError, DownloadRejected, handoff_local_file, map_local_path
+
+
+def _write(path, data=b"video-data" * 1000):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_hardlink_on_same_filesystem(tmp_path):
+    source = tmp_path / "server" / "video.mp4"
+    source.parent.mkdir()
+    digest = _write(source)
+    dest = tmp_path / "video.incoming"
+
+    assert handoff_local_file(str(source), str(dest), "hardlink") == digest
+    assert os.path.samefile(source, dest)
+    assert source.exists()
+
+
+def test_copy_fallback_across_devices(tmp_path, monkeypatch):
+    source = tmp_path / "video.mp4"
+    digest = _write(source)
+    dest = tmp_path / "video.incoming"
+
+    def cross_device_link(src, dst):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(upload_ingest.os, "link", cross_device_link)
+    assert handoff_local_file(str(source), str(dest), "hardlink") == digest
+    assert not os.path.samefile(source, dest)
+    assert dest.read_bytes() == source.read_bytes()
+
+
+def test_move_fallback_removes_source(tmp_path, monkeypatch):
+    source = tmp_path / "video.mp4"
+    digest = _write(source)
+    dest = tmp_path / "video.incoming"
+
+    def cross_device_replace(src, dst):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(upload_ingest.os, "replace", cross_device_replace)
+    assert handoff_local_file(str(source), str(dest), "move") == digest
+    assert not source.exists()
+    assert dest.exists()
+
+
+def test_other_link_errors_are_not_hidden(tmp_path, monkeypatch):
+    source = tmp_path / "video.mp4"
+    _write(source)
+
+    def denied_link(src, dst):
+        raise OSError(errno.EACCES, os.strerror(errno.EACCES))
+
+    monkeypatch.setattr(upload_ingest.os, "link", denied_link)
+    with pytest.raises(OSError):
+        handoff_local_file(str(source), str(tmp_path / "video.incoming"), "hardlink")
+
+
+def test_missing_source_file(tmp_path):
+    with pytest.raises(DownloadError):
+        handoff_local_file(str(tmp_path / "tidak-ada.mp4"), str(tmp_path / "video.incoming"))
+
+
+def test_map_local_path_inside_root():
+    dir_map = {"/var/lib/telegram-bot-api": "/srv/bot-api"}
+    assert map_local_path("/var/lib/telegram-bot-api/TOKEN/videos/a.mp4", dir_map) == \
+        "/srv/bot-api/TOKEN/videos/a.mp4"
+
+
+def test_map_local_path_without_map_is_unchanged():
+    assert map_local_path("/var/lib/telegram-bot-api/a.mp4", {}) == "/var/lib/telegram-bot-api/a.mp4"
+
+
+@pytest.mark.parametrize("server_path", [
+    "/var/lib/telegram-bot-api2/a.mp4", # Prefix yang sama secara string, tetapi direktori lain.
+    "/var/lib/telegram-bot-api/../../../etc/passwd",
+    "/etc/passwd",
+    "relative/a.mp4",
+])
+def test_map_local_path_rejects_paths_outside_root(server_path):
+    with pytest.raises(DownloadError):
+        map_local_path(server_path, {"/var/lib/telegram-bot-api": "/srv/bot-api"})
+
+
+# --- Unduhan bertahap terhadap server HTTP lokal pengganti Bot API ---
+
+CONTENT = bytes(range(256)) * 4096 # 1 MiB
+
+
+class StandInServer:
+    """
+    Server HTTP lokal yang menyajikan CONTENT. Perilaku bisa diatur per tes:
+    fail_with (daftar status yang dibalas lebih dulu), ignore_range, dan cut_after (byte sebelum
+    koneksi diputus di tengah body, sekali saja).
+    """
+    def __init__(self):
+        self.requests = []
+        self.fail_with = []
+        self.ignore_range = False
+        self.cut_after = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                range_header = self.headers.get("Range")
+                server.requests.append(range_header)
+                if server.fail_with:
+                    self.send_response(server.fail_with.pop(0))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                start = int(range_header[6:].rstrip("-")) if range_header and not server.ignore_range else 0
+                if start >= len(CONTENT):
+                    self.send_response(416)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = CONTENT[start:]
+                self.send_response(206 if start else 200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.cut_after is not None:
+                    self.wfile.write(body[:server.cut_after])
+                    server.cut_after = None
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/file/bot123/videos/a.mp4"
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    pytest.importorskip("httpx")
+    monkeypatch.setattr(upload_ingest, "RETRY_DELAY_SECONDS", 0)
+    stand_in = StandInServer()
+    yield stand_in
+    stand_in.close()
+
+
+def _download(server, dest, expected_size=len(CONTENT)):
+    return asyncio.run(upload_ingest.download_resumable(server.url, str(dest), expected_size))
+
+
+def test_full_download(server, tmp_path):
+    dest = tmp_path / "a.incoming"
+    assert _download(server, dest) == hashlib.sha256(CONTENT).hexdigest()
+    assert dest.read_bytes() == CONTENT
+    assert server.requests == [None]
+
+
+def test_resume_from_existing_partial_file(server, tmp_path):
+    dest = tmp_path / "a.incoming"
+    dest.write_bytes(CONTENT[:300_000])
+    assert _download(server, dest) == hashlib.sha256(CONTENT).hexdigest()
+    assert server.requests == ["bytes=300000-"]
+    assert dest.read_bytes() == CONTENT
+
+
+def test_resume_after_connection_drop(server, tmp_path):
+    server.cut_after = 400_000
+    dest = tmp_path / "a.incoming"
+    assert _download(server, dest) == hashlib.sha256(CONTENT).hexdigest()
+    assert server.requests[0] is None
+    assert server.requests[1].startswith("bytes=")
+    assert dest.read_bytes() == CONTENT
+
+
+def test_server_ignoring_range_restarts_from_zero(server, tmp_path):
+    server.ignore_range = True
+    dest = tmp_path / "a.incoming"
+    dest.write_bytes(CONTENT[:1000])
+    assert _download(server, dest) == hashlib.sha256(CONTENT).hexdigest()
+    assert dest.read_bytes() == CONTENT
+
+
+def test_416_when_already_complete(server, tmp_path):
+    dest = tmp_path / "a.incoming"
+    dest.write_bytes(CONTENT)
+    assert _download(server, dest) == hashlib.sha256(CONTENT).hexdigest()
+    assert server.requests == [f"bytes={len(CONTENT)}-"]
+
+
+def test_416_without_expected_size_restarts_from_zero(server, tmp_path):
+    dest = tmp_path / "a.incoming"
+    dest.write_bytes(b"x" * (len(CONTENT) + 10)) # Sisa unduhan lain yang lebih besar dari file di server.
+    assert _download(server, dest, expected_size=None) == hashlib.sha256(CONTENT).hexdigest()
+    assert server.requests == [f"bytes={len(CONTENT) + 10}-", None]
+
+
+def test_size_mismatch_is_a_download_error(server, tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(upload_ingest, "MAX_ATTEMPTS", 2)
+    with pytest.raises(DownloadError, match="gagal setelah 2 percobaan"):
+        _download(server, tmp_path / "a.incoming", expected_size=len(CONTENT) + 10)
+    assert "ukuran file tidak cocok" in caplog.text
+
+
+def test_transient_server_errors_are_retried(server, tmp_path):
+    server.fail_with = [503, 429]
+    dest = tmp_path / "a.incoming"
+    assert _download(server, dest) == hashlib.sha256(CONTENT).hexdigest()
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(server, tmp_path):
+    server.fail_with = [404]
+    with pytest.raises(DownloadRejected, match="HTTP 404"):
+        _download(server, tmp_path / "a.incoming")
+    assert len(server.requests) == 1
@@ -0,0 +1,71 @@
+import pytest
+
+import video_library
+
+COPY_OK = {"video_codec": "h264", "pix_fmt": "yuv420p", "audio_codec": "aac", "audio_sample_rate": 44100,
+           "duration": 60.0, "width": 1280, "height": 720, "fps": 30}
+NEEDS_ENCODE = dict(COPY_OK, video_codec="hevc")
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_library, "_db_path", None)
+    video_library.init_library(str(tmp_path / "library.db"))
+    videos_dir = tmp_path / "videos"
+    videos_dir.mkdir()
+    return videos_dir
+
+
+def _add(videos_dir, name, media_info=COPY_OK):
+    path = videos_dir / name
+    path.write_bytes(b"video")
+    return video_library.add_video(str(path), media_info)
+
+
+def test_pages_are_sorted_by_name_case_insensitively(library):
+    for name in ["b.mp4", "A.mp4", "d.mp4", "C.mp4", "e.mp4"]:
+        _add(library, name)
+    page, total = video_library.list_videos(offset=0, limit=2)
+    assert total == 5 and [v["name"] for v in page] == ["A.mp4", "b.mp4"]
+    page, _ = video_library.list_videos(offset=4, limit=2)
+    assert [v["name"] for v in page] == ["e.mp4"]
+    assert video_library.list_videos(offset=10, limit=2) == ([], 5)
+
+
+def test_query_matches_literally(library):
+    for name in ["promo_100%.mp4", "promoX100.mp4", "Promo_a.mp4", "lain.mp4"]:
+        _add(library, name)
+    page, total = video_library.list_videos(query="o_1")
+    assert total == 1 and page[0]["name"] == "promo_100%.mp4"
+    assert video_library.list_videos(query="100%")[1] == 1
+    assert video_library.list_videos(query="PROMO")[1] == 3
+
+
+def test_add_updates_an_existing_path_and_keeps_its_id(library):
+    first = _add(library, "a.mp4", NEEDS_ENCODE)
+    assert not first["copy_eligible"]
+    second = _add(library, "a.mp4", COPY_OK)
+    assert second["id"] == first["id"] and second["copy_eligible"]
+    assert video_library.get_video(first["id"])["copy_eligible"] is True
+    assert video_library.find_video_by_path(str(library / "a.mp4"))["id"] == first["id"]
+    video_library.remove_video(first["id"])
+    assert video_library.get_video(first["id"]) is None
+
+
+def test_sync_directory(library, monkeypatch):
+    infos = {"baru.mp4": COPY_OK, "lama.mp4": NEEDS_ENCODE, "tetap.mp4": NEEDS_ENCODE}
+    monkeypatch.setattr(video_library, "probe_media", lambda path: infos[path.rsplit("/", 1)[-1]])
+    _add(library, "tetap.mp4", NEEDS_ENCODE)
+    _add(library, "hilang.mp4")
+    (library / "hilang.mp4").unlink()
+    (library / "baru.mp4").write_bytes(b"video")
+    (library / "catatan.txt").write_text("bukan video")
+
+    assert video_library.sync_directory(str(library), [".MP4"]) == (1, 1)
+    names = [v["name"] for v in video_library.list_videos()[0]]
+    assert names == ["baru.mp4", "tetap.mp4"]
+
+    # File yang tidak berubah hanya diperbarui jika aturan kelayakan copy memberi hasil lain.
+    infos["tetap.mp4"] = COPY_OK
+    assert video_library.sync_directory(str(library), [".mp4"]) == (1, 0)
+    assert all(v["copy_eligible"] for v in video_library.list_videos()[0])
@@ -0,0 +1,57 @@
+import pytest
+
+import transcoder
+import video_normalize as vn
+
+
+@pytest.mark.parametrize("source, bitrate, expected", [
+    ((1920, 1080, 60), 6000, (1920, 1080, 60)),
+    ((1920, 1080, 60), 4500, (1920, 1080, 30)),
+    ((3840, 2160, 30), 2500, (1280, 720, 30)),
+    ((1080, 1920, 30), 2500, (720, 1280, 30)), # Portrait: batas pada sisi pendek.
+    ((1280, 720, 50), 1500, (1280, 720, 25)),
+    ((640, 360, 30), 6000, (640, 360, 30)), # Tidak pernah diperbesar.
+    ((1920, 1080, None), 800, (852, 480, 30)),
+])
+def test_pick_output_format(source, bitrate, expected):
+    assert vn.pick_output_format(*source, bitrate) == expected
+
+
+def test_build_video_filter_scales_and_drops_fps():
+    assert vn.build_video_filter(1920, 1080, 60, 2500) == ("scale=1280:720:flags=bicubic,fps=30", 30)
+    assert vn.build_video_filter(1280, 720, 30, 2500) == (None, 30)
+    assert vn.build_video_filter(1920, 1080, 60, 2500, normalize=False) == (None, 60)
+
+
+def test_custom_filter_uses_targets_and_forces_keyframes_by_time():
+    video_filter, out_fps = vn.build_video_filter(1920, 1080, 60, 2500, custom_filter="scale={width}:{height},fps=50")
+    assert video_filter == "scale=1280:720,fps=50"
+    assert vn.keyframe_args(out_fps, "scale={width}:{height},fps=50") == \
+        ['-force_key_frames', f"expr:gte(t,n_forced*{vn.KEYFRAME_INTERVAL_SEC})"]
+
+
+def test_gop_follows_output_fps():
+    assert vn.keyframe_args(30) == ['-g', '60', '-keyint_min', '60']
+    assert vn.keyframe_args(25) == ['-g', '50', '-keyint_min', '50']
+
+
+def _arg(command, flag):
+    return command[command.index(flag) + 1]
+
+
+def test_transcode_command_normalizes_like_the_stream():
+    media_info = {"video_codec": "hevc", "pix_fmt": "yuv420p", "width": 1920, "height": 1080, "fps": 60,
+                  "audio_codec": "aac", "audio_sample_rate": 44100}
+    settings = {"VIDEO_BITRATE_KBPS": 2500, "RESOLUTION_NORMALIZE": True, "VIDEO_FILTER": ""}
+    command = transcoder.build_transcode_command("in.mkv", "out.mp4", media_info, settings)
+    assert _arg(command, '-vf') == "scale=1280:720:flags=bicubic,fps=30"
+    assert _arg(command, '-g') == "60"
+    assert _arg(command, '-c:a') == "copy"
+
+    command = transcoder.build_transcode_command("in.mkv", "out.mp4", dict(media_info, audio_sample_rate=32000), settings)
+    assert _arg(command, '-c:a') == "aac" and _arg(command, '-ar') == "44100"
+
+    settings["VIDEO_FILTER"] = "scale={width}:{height}"
+    command = transcoder.build_transcode_command("in.mkv", "out.mp4", media_info, settings)
+    assert _arg(command, '-vf') == "scale=1280:720"
+    assert '-g' not in command and '-force_key_frames' in command
@@ -0,0 +1,245 @@
+import os
+import re
+import hashlib
+import logging
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from media_probe import probe_media, is_copy_eligible, is_video_copy_ok, is_audio_copy_ok
+import ffmpeg_log
+import video_normalize
+
+# --- ANTREAN PRE-TRANSCODE ---
+# Setelah video diunggah, file yang belum h264/aac dikonversi di latar belakang menjadi
+# file "mezzanine" yang siap di-stream (h264/aac, bitrate sesuai config, GOP tetap, resolusi/fps
+# dinormalisasi dengan aturan yang sama seperti RE-ENCODE streamer, lihat video_normalize),
+# sehingga streamer bisa berjalan dalam mode COPY. Jumlah proses ffmpeg yang berjalan
+# bersamaan dibatasi oleh ukuran pool (TRANSCODE_WORKERS).
+MEZZANINE_DIR_NAME = ".mezzanine"
+MEZZANINE_SUFFIX = ".stream.mp4"
+# Pengaturan encode yang dipakai build_transcode_command (dengan nilai bawaannya). Semuanya ikut
+# menentukan nama mezzanine, sehingga mengubah salah satunya membuat mezzanine lama basi.
+TRANSCODE_DEFAULTS = {"FFMPEG_PRESET": "veryfast", "VIDEO_BITRATE_KBPS": 2500, "AUDIO_BITRATE_KBPS": 128,
+                      "RESOLUTION_NORMALIZE": True, "VIDEO_FILTER": ""}
+# Baris stderr terakhir yang disimpan untuk pesan error job yang gagal.
+STDERR_TAIL_LINES = 20
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_jobs_lock = threading.Lock()
+JOBS = {}  # realpath sumber -> dict status job
+_processes = {}  # realpath sumber -> subprocess.Popen yang sedang berjalan
+
+
+def init_transcoder(max_workers=1):
+    """Menyiapkan pool transcode dengan jumlah worker maksimum tertentu."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="transcode")
+        logger.info(f"Antrean pre-transcode siap dengan {max(1, int(max_workers))} worker.")
+
+
+def shutdown_transcoder():
+    """Menghentikan semua proses ffmpeg transcode yang masih berjalan dan menutup pool."""
+    global _executor
+    with _jobs_lock:
+        for process in _processes.values():
+            if process.poll() is None:
+                process.terminate()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _is_mezzanine_of(filename, source_id):
+    """True jika filename adalah mezzanine (atau .part-nya) milik sumber dengan source_id tersebut."""
+    pattern = r".*\." + re.escape(source_id) + r"\.[0-9a-f]{12}" + re.escape(MEZZANINE_SUFFIX) + r"(\.part)?"
+    return re.fullmatch(pattern, filename) is not None
+
+
+def _source_stem(source_path):
+    """Stem dari file asli sumber (bukan alias), hanya agar nama mezzanine mudah dikenali."""
+    return os.path.splitext(os.path.basename(os.path.realpath(source_path)))[0]
+
+
+def _source_id(source_path):
+    """
+    Id sumber dari realpath file asli: alias dengan isi sama memakai mezzanine yang sama, sedangkan dua
+    sumber berbeda dengan nama file sama (misal 'intro.mp4' di folder lain) tidak saling menimpa.
+    """
+    return hashlib.sha1(os.path.realpath(source_path).encode("utf-8")).hexdigest()[:12]
+
+
+def _transcode_settings(settings):
+    """Pengaturan encode efektif untuk mezzanine (nilai yang tidak ada diisi TRANSCODE_DEFAULTS)."""
+    merged = {key: (settings or {}).get(key, default) for key, default in TRANSCODE_DEFAULTS.items()}
+    merged["VIDEO_BITRATE_KBPS"] = int(merged["VIDEO_BITRATE_KBPS"])
+    merged["AUDIO_BITRATE_KBPS"] = int(merged["AUDIO_BITRATE_KBPS"])
+    merged["RESOLUTION_NORMALIZE"] = bool(merged["RESOLUTION_NORMALIZE"])
+    merged["VIDEO_FILTER"] = merged["VIDEO_FILTER"] or ""
+    return merged
+
+
+def get_mezzanine_dir(videos_dir):
+    path = os.path.join(videos_dir, MEZZANINE_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_mezzanine_path(source_path, videos_dir, settings):
+    """
+    Path mezzanine untuk sumber: '{stem}.{id sumber}.{sidik}.stream.mp4'. Sidik memuat size, mtime, dan
+    pengaturan encode, agar mezzanine otomatis basi saat sumber atau pengaturan encode berubah.
+    """
+    real_path = os.path.realpath(source_path)
+    st = os.stat(real_path)
+    encode = "|".join(f"{k}={v}" for k, v in sorted(_transcode_settings(settings).items()))
+    fingerprint = hashlib.sha1(f"{st.st_size}|{st.st_mtime_ns}|{encode}".encode("utf-8")).hexdigest()[:12]
+    return os.path.join(get_mezzanine_dir(videos_dir),
+                        f"{_source_stem(source_path)}.{_source_id(source_path)}.{fingerprint}{MEZZANINE_SUFFIX}")
+
+
+def find_ready_mezzanine(source_path, videos_dir, settings):
+    """Mengembalikan path mezzanine yang sudah selesai untuk sumber dengan pengaturan encode saat ini, atau None."""
+    try:
+        mezzanine_path = get_mezzanine_path(source_path, videos_dir, settings)
+    except OSError:
+        return None
+    return mezzanine_path if os.path.isfile(mezzanine_path) else None
+
+
+def remove_mezzanines(source_path, videos_dir):
+    """Menghapus semua mezzanine (lama maupun baru) milik sumber ini."""
+    source_id = _source_id(source_path)
+    mezzanine_dir = get_mezzanine_dir(videos_dir)
+    for f in os.listdir(mezzanine_dir):
+        if _is_mezzanine_of(f, source_id):
+            try:
+                os.remove(os.path.join(mezzanine_dir, f))
+            except OSError as e:
+                logger.warning(f"Gagal menghapus mezzanine '{f}': {e}")
+
+
+def get_job(source_path):
+    with _jobs_lock:
+        job = JOBS.get(os.path.realpath(source_path))
+        return dict(job) if job else None
+
+
+def build_transcode_command(source_path, output_path, media_info, settings):
+    """Membangun perintah ffmpeg untuk membuat mezzanine h264/aac dengan GOP tetap."""
+    settings = _transcode_settings(settings)
+    video_bitrate = settings["VIDEO_BITRATE_KBPS"]
+    audio_bitrate = settings["AUDIO_BITRATE_KBPS"]
+
+    command = ['ffmpeg', '-y', '-nostdin', '-v', 'error', '-i', source_path,
+               '-map', '0:v:0', '-map', '0:a:0?']
+    if is_video_copy_ok(media_info):
+        # Video sudah layak stream; cukup audio yang dikonversi.
+        command += ['-c:v', 'copy']
+    else:
+        custom_filter = settings["VIDEO_FILTER"]
+        video_filter, out_fps = video_normalize.build_video_filter(
+            media_info.get("width"), media_info.get("height"), media_info.get("fps"), video_bitrate,
+            settings["RESOLUTION_NORMALIZE"], custom_filter)
+        if video_filter:
+            command += ['-vf', video_filter]
+        command += ['-c:v', 'libx264', '-preset', settings["FFMPEG_PRESET"],
+                    '-b:v', f"{video_bitrate}k", '-maxrate', f"{video_bitrate}k", '-bufsize', f"{video_bitrate * 2}k"]
+        command += video_normalize.keyframe_args(out_fps, custom_filter)
+        command += ['-sc_threshold', '0', '-pix_fmt', 'yuv420p']
+    if media_info.get("audio_codec") is not None and is_audio_copy_ok(media_info):
+        command += ['-c:a', 'copy']
+    else:
+        command += ['-c:a', 'aac', '-b:a', f"{audio_bitrate}k", '-ar', '44100']
+    command += ['-movflags', '+faststart', '-f', 'mp4',
+                '-progress', 'pipe:1', '-nostats', output_path]
+    return command
+
+
+def _run_job(real_path, source_path, output_path, media_info, settings):
+    tmp_path = f"{output_path}.part"
+    command = build_transcode_command(source_path, tmp_path, media_info, settings)
+    duration = media_info.get("duration") or 0
+    with _jobs_lock:
+        JOBS[real_path]["status"] = "running"
+    logger.info(f"Memulai pre-transcode '{source_path}' -> '{output_path}'")
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, text=True)
+        with _jobs_lock:
+            _processes[real_path] = process
+        # stderr dibaca di thread sendiri bersamaan dengan progres di stdout; jika tidak,
+        # pipe stderr yang penuh membuat ffmpeg (dan job ini) macet selamanya.
+        stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        stderr_thread = ffmpeg_log.start_stderr_pump(process.stderr, logger, stderr_tail,
+                                                     prefix=f"[transcode {os.path.basename(source_path)}] ")
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == "out_time_us" and duration > 0:
+                try:
+                    progress = min(1.0, int(value) / 1_000_000 / duration)
+                except ValueError:
+                    continue
+                with _jobs_lock:
+                    JOBS[real_path]["progress"] = progress
+        process.wait()
+        stderr_thread.join(timeout=5)
+        if process.returncode != 0:
+            raise RuntimeError("\n".join(stderr_tail)[-500:] or f"ffmpeg keluar dengan kode {process.returncode}")
+        os.replace(tmp_path, output_path)
+        with _jobs_lock:
+            JOBS[real_path].update(status="done", progress=1.0)
+        logger.info(f"Pre-transcode selesai: {output_path}")
+    except Exception as e:
+        logger.error(f"Pre-transcode '{source_path}' gagal: {e}")
+        with _jobs_lock:
+            JOBS[real_path].update(status="failed", error=str(e))
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    finally:
+        with _jobs_lock:
+            _processes.pop(real_path, None)
+
+
+def submit_transcode(source_path, videos_dir, settings):
+    """
+    Memasukkan sumber ke antrean pre-transcode jika perlu.
+    Mengembalikan dict status job, atau None jika file sudah siap COPY atau tidak bisa di-probe.
+    """
+    if _executor is None:
+        init_transcoder()
+    media_info = probe_media(source_path)
+    if not media_info or not media_info.get("video_codec") or is_copy_eligible(media_info):
+        return None
+
+    real_path = os.path.realpath(source_path)
+    output_path = get_mezzanine_path(source_path, videos_dir, settings)
+    with _jobs_lock:
+        existing = JOBS.get(real_path)
+        if existing and existing["status"] in ("queued", "running") and existing["output"] == output_path:
+            return dict(existing)
+        if os.path.isfile(output_path):
+            JOBS[real_path] = {"source": source_path, "output": output_path, "status": "done", "progress": 1.0, "error": None}
+            return dict(JOBS[real_path])
+        JOBS[real_path] = {"source": source_path, "output": output_path, "status": "queued", "progress": 0.0, "error": None}
+        job = dict(JOBS[real_path])
+
+    # Buang mezzanine basi milik sumber ini (versi sumber atau pengaturan encode sebelumnya).
+    mezzanine_dir = os.path.dirname(output_path)
+    source_id = _source_id(source_path)
+    for f in os.listdir(mezzanine_dir):
+        full_path = os.path.join(mezzanine_dir, f)
+        if _is_mezzanine_of(f, source_id) and not f.endswith(".part") and full_path != output_path:
+            try:
+                os.remove(full_path)
+            except OSError:
+                pass
+
+    _executor.submit(_run_job, real_path, source_path, output_path, media_info, dict(settings))
+    return job
@@ -0,0 +1,164 @@
+import os
+import errno
+import shutil
+import asyncio
+import logging
+
+try:
+    import httpx
+except ImportError: # Tanpa httpx hanya download_resumable yang tidak tersedia; serah-terima file lokal tetap jalan.
+    httpx = None
+
+from content_store import HashingWriter
+
+# --- UNDUHAN UPLOAD BERTAHAP (CHUNKED) DAN BISA DILANJUTKAN ---
+# File dari Telegram diunduh per potongan ke file sementara (.incoming) sambil di-hash.
+# Jika koneksi putus, unduhan dilanjutkan dari byte terakhir dengan header Range.
+# File sementara diberi nama dari file_unique_id Telegram, sehingga upload ulang file
+# yang sama setelah gagal (atau setelah bot restart) juga melanjutkan unduhan sebelumnya.
+CHUNK_SIZE = 1024 * 1024
+MAX_ATTEMPTS = 5
+RETRY_DELAY_SECONDS = 3
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0) if httpx else None
+# Status HTTP yang dianggap gangguan sementara dan dicoba ulang (selain 5xx).
+RETRY_STATUS_CODES = (408, 429)
+
+logger = logging.getLogger(__name__)
+
+
+# Cara memindahkan file yang sudah ditulis server Bot API lokal ke penyimpanan video.
+HANDOFF_METHODS = ("hardlink", "move", "copy")
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadRejected(DownloadError):
+    """Server menolak unduhan (4xx selain RETRY_STATUS_CODES); tidak dicoba ulang."""
+
+
+def _prime_writer(writer, path):
+    """Meng-hash ulang isi file sementara yang sudah ada agar hash tetap mencakup seluruh file."""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.update_hash(chunk)
+
+
+async def download_resumable(url, dest_path, expected_size=None, on_progress=None):
+    """
+    Mengunduh url ke dest_path per potongan, melanjutkan dari isi dest_path yang sudah ada.
+    on_progress(bytes_done, total) dipanggil (async) setiap potongan. Mengembalikan SHA-256 (hex) file.
+    """
+    if httpx is None:
+        raise DownloadError("modul httpx tidak terpasang; unduhan HTTP tidak tersedia")
+    attempt = 0
+    while True:
+        offset = os.path.getsize(dest_path) if os.path.exists(dest_path) else 0
+        if expected_size and offset > expected_size:
+            os.remove(dest_path)
+            offset = 0
+        try:
+            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, follow_redirects=True) as client:
+                headers = {"Range": f"bytes={offset}-"} if offset else {}
+                async with client.stream("GET", url, headers=headers) as response:
+                    status = response.status_code
+                    if status == 416 and expected_size and offset == expected_size:
+                        mode = 'ab' # Sudah lengkap dari percobaan sebelumnya.
+                    elif status == 416:
+                        # Isi file sementara tidak cocok dengan file di server (ukuran tidak diketahui atau
+                        # berbeda); dibuang dan diunduh ulang dari awal pada percobaan berikutnya.
+                        if os.path.exists(dest_path):
+                            os.remove(dest_path)
+                        raise DownloadError(f"server menolak lanjutan dari byte {offset} (HTTP 416)")
+                    elif status >= 500 or status in RETRY_STATUS_CODES:
+                        raise DownloadError(f"server sedang bermasalah (HTTP {status})")
+                    elif status >= 400:
+                        raise DownloadRejected(f"server menolak unduhan (HTTP {status})")
+                    elif offset and status == 200:
+                        # Server tidak mendukung Range; ulang dari awal.
+                        logger.info(f"Server tidak mendukung lanjutan unduhan untuk '{dest_path}', mengulang dari awal.")
+                        offset, mode = 0, 'wb'
+                    else:
+                        mode = 'ab' if offset else 'wb'
+                    total = expected_size or (offset + int(response.headers.get("content-length", 0))) or None
+                    with open(dest_path, mode) as f:
+                        writer = HashingWriter(f)
+                        if offset:
+                            await asyncio.to_thread(_prime_writer, writer, dest_path)
+                        if status != 416:
+                            # Tanpa chunk_size agar setiap potongan langsung ditulis; dengan chunk_size httpx
+                            # menahan data sampai terkumpul, dan data itu hilang jika koneksi putus.
+                            async for chunk in response.aiter_bytes():
+                                writer.write(chunk)
+                                offset += len(chunk)
+                                if on_progress:
+                                    await on_progress(offset, total)
+            if expected_size and offset != expected_size:
+                raise DownloadError(f"ukuran file tidak cocok ({offset} dari {expected_size} byte)")
+            return writer.hexdigest()
+        except DownloadRejected:
+            raise
+        except (httpx.TransportError, DownloadError) as e:
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                raise DownloadError(f"unduhan gagal setelah {attempt} percobaan: {e}") from e
+            logger.warning(f"Unduhan '{dest_path}' terputus di byte {offset} ({e}). Melanjutkan (percobaan {attempt + 1}/{MAX_ATTEMPTS})...")
+            await asyncio.sleep(RETRY_DELAY_SECONDS * attempt)
+
+
+def map_local_path(server_path, dir_map=None):
+    """
+    Menerjemahkan path file dari server Bot API lokal ke path di mesin bot, misal jika server berjalan
+    di container dengan volume yang di-mount di lokasi lain. dir_map: {prefix_server: prefix_lokal}.
+    Jika dir_map diisi, path harus berada di bawah salah satu prefix_server (dibandingkan per komponen
+    path, jadi '/data2' tidak cocok dengan '/data' dan '..' tidak bisa keluar dari prefix); jika tidak,
+    DownloadError dimunculkan agar bot tidak memindahkan file di luar direktori yang dipetakan.
+    """
+    if not dir_map:
+        return server_path
+    normalized = os.path.normpath(server_path)
+    for server_prefix, local_prefix in dir_map.items():
+        server_root = os.path.normpath(server_prefix)
+        if os.path.isabs(normalized) == os.path.isabs(server_root) and \
+                os.path.commonpath([normalized, server_root]) == server_root:
+            return os.path.join(local_prefix, os.path.relpath(normalized, server_root))
+    raise DownloadError(f"path dari server Bot API lokal berada di luar direktori yang dipetakan: {server_path}")
+
+
+def handoff_local_file(source_path, dest_path, method="hardlink"):
+    """
+    Memindahkan file yang sudah ada di disk (hasil unduhan server Bot API lokal) ke dest_path tanpa
+    mengunduh ulang: hardlink atau rename (zero-copy); jatuh ke salinan jika beda filesystem.
+    Mengembalikan SHA-256 (hex) file.
+    """
+    if method not in HANDOFF_METHODS:
+        raise ValueError(f"metode serah-terima tidak dikenal: {method}")
+    if not os.path.isfile(source_path):
+        raise DownloadError(f"file dari server Bot API lokal tidak ditemukan: {source_path}")
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if method != "copy":
+        try:
+            if method == "hardlink":
+                os.link(source_path, dest_path)
+            else:
+                os.replace(source_path, dest_path)
+            writer = HashingWriter(None) # Hanya meng-hash; file tidak ditulis ulang.
+            _prime_writer(writer, dest_path)
+            return writer.hexdigest()
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            logger.info(f"{method} '{source_path}' tidak bisa dipakai ({e}); menyalin file.")
+
+    with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        writer = HashingWriter(dst)
+        shutil.copyfileobj(src, writer, CHUNK_SIZE)
+    if method == "move":
+        os.remove(source_path)
+    return writer.hexdigest()
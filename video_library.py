@@ -0,0 +1,160 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from media_probe import probe_media, is_copy_eligible
+
+# --- INDEKS LIBRARY VIDEO (SQLITE) ---
+# Daftar video di VIDEOS_DIR disimpan di SQLite beserta metadata probe (durasi, codec,
+# resolusi) dan penanda apakah file bisa di-stream tanpa re-encode. Bot menambah/menghapus
+# entri saat upload/hapus, sehingga menu "Pilih Video" dan "Hapus Video" tidak perlu
+# memindai disk. Tombol inline memakai ID numerik entri, bukan nama file (batas 64 byte).
+_db_path = None
+_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime_ns INTEGER,
+    duration REAL,
+    video_codec TEXT,
+    audio_codec TEXT,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    copy_eligible INTEGER NOT NULL DEFAULT 0,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_name ON videos (name COLLATE NOCASE);
+"""
+
+
+@contextmanager
+def _connect():
+    """Koneksi singkat per operasi (aman dipanggil dari thread mana pun); commit otomatis lalu ditutup."""
+    conn = sqlite3.connect(_db_path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _row_to_dict(row):
+    if row is None:
+        return None
+    video = dict(row)
+    video["copy_eligible"] = bool(video["copy_eligible"])
+    return video
+
+
+def init_library(db_path):
+    """Membuka (atau membuat) database library di db_path."""
+    global _db_path
+    _db_path = db_path
+    with _lock, _connect() as conn:
+        conn.executescript(SCHEMA)
+
+
+def add_video(path, media_info=None):
+    """
+    Menambahkan atau memperbarui entri video untuk path (metadata dari media_info, atau di-probe
+    jika tidak diberikan). Mengembalikan dict entri.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    if media_info is None:
+        media_info = probe_media(path) or {}
+    values = {
+        "name": os.path.basename(path),
+        "path": path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "duration": media_info.get("duration"),
+        "video_codec": media_info.get("video_codec"),
+        "audio_codec": media_info.get("audio_codec"),
+        "width": media_info.get("width"),
+        "height": media_info.get("height"),
+        "fps": media_info.get("fps"),
+        "copy_eligible": 1 if is_copy_eligible(media_info) else 0,
+        "added_at": time.time(),
+    }
+    with _lock, _connect() as conn:
+        conn.execute(
+            f"INSERT INTO videos ({', '.join(values)}) VALUES ({', '.join('?' for _ in values)}) "
+            "ON CONFLICT(path) DO UPDATE SET "
+            + ", ".join(f"{k} = excluded.{k}" for k in values if k not in ("path", "added_at")),
+            list(values.values()))
+        row = conn.execute("SELECT * FROM videos WHERE path = ?", (path,)).fetchone()
+    return _row_to_dict(row)
+
+
+def remove_video(video_id):
+    with _lock, _connect() as conn:
+        conn.execute("DELETE FROM videos WHERE id = ?", (video_id,))
+
+
+def get_video(video_id):
+    with _connect() as conn:
+        return _row_to_dict(conn.execute("SELECT * FROM videos WHERE id = ?", (video_id,)).fetchone())
+
+
+def find_video_by_path(path):
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM videos WHERE path = ?", (os.path.abspath(path),)).fetchone()
+    return _row_to_dict(row)
+
+
+def list_videos(offset=0, limit=8, query=None):
+    """Mengembalikan (daftar entri, total) urut nama, opsional difilter nama yang memuat query."""
+    where, params = "", []
+    if query:
+        where = "WHERE name LIKE ? ESCAPE '\\' COLLATE NOCASE"
+        params.append("%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    with _connect() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM videos {where}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT * FROM videos {where} ORDER BY name COLLATE NOCASE LIMIT ? OFFSET ?",
+                            params + [limit, offset]).fetchall()
+    return [_row_to_dict(r) for r in rows], total
+
+
+def sync_directory(videos_dir, extensions):
+    """
+    Menyelaraskan indeks dengan isi videos_dir (dipanggil sekali saat bot mulai, untuk file yang
+    ditambah/dihapus manual). Hanya file baru atau yang berubah yang di-probe.
+    Mengembalikan (jumlah ditambah/diperbarui, jumlah dihapus).
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    on_disk = {}
+    for entry in os.scandir(videos_dir):
+        if entry.is_file() and entry.name.lower().endswith(extensions):
+            on_disk[os.path.abspath(entry.path)] = entry.stat()
+    with _connect() as conn:
+        indexed = {row["path"]: (row["id"], row["size"], row["mtime_ns"], row["copy_eligible"])
+                   for row in conn.execute("SELECT id, path, size, mtime_ns, copy_eligible FROM videos")}
+
+    removed = 0
+    for path, (video_id, _, _, _) in indexed.items():
+        if path not in on_disk:
+            remove_video(video_id)
+            removed += 1
+    updated = 0
+    for path, st in on_disk.items():
+        known = indexed.get(path)
+        if known and known[1] == st.st_size and known[2] == st.st_mtime_ns:
+            # Hitung ulang penanda copy dari cache probe agar ikut aturan kelayakan terbaru.
+            copy_eligible = 1 if is_copy_eligible(probe_media(path) or {}) else 0
+            if copy_eligible != known[3]:
+                with _lock, _connect() as conn:
+                    conn.execute("UPDATE videos SET copy_eligible = ? WHERE id = ?", (copy_eligible, known[0]))
+                updated += 1
+            continue
+        add_video(path)
+        updated += 1
+    return updated, removed
@@ -0,0 +1,65 @@
+# --- NORMALISASI RESOLUSI & FPS RE-ENCODE ---
+# Dipakai bersama oleh streamer.py (RE-ENCODE saat siaran) dan transcoder.py (mezzanine), agar video
+# yang di-encode memakai aturan yang sama di kedua jalur. Resolusi dan fps keluaran disesuaikan dengan
+# bitrate video (batas minimal bitrate kbps, tinggi, fps maksimum), mengikuti rekomendasi ingest
+# YouTube. Video tidak pernah diperbesar dan fps tidak pernah dinaikkan. VIDEO_FILTER (jika diisi)
+# menggantikan filter bawaan; placeholder {width}, {height}, dan {fps} diisi dengan target hasil
+# perhitungan ini.
+NORMALIZE_TARGETS = [(6000, 1080, 60), (4500, 1080, 30), (3000, 720, 60), (1500, 720, 30), (800, 480, 30), (0, 360, 30)]
+KEYFRAME_INTERVAL_SEC = 2
+DEFAULT_FPS = 30
+
+
+def pick_output_format(width, height, fps, bitrate_kbps):
+    """(lebar, tinggi, fps) keluaran untuk sumber width x height @ fps pada bitrate_kbps."""
+    fps = fps or DEFAULT_FPS
+    _, max_lines, max_fps = next(t for t in NORMALIZE_TARGETS if bitrate_kbps >= t[0])
+    # Batas berlaku untuk sisi pendek, agar video portrait diperlakukan sama dengan landscape.
+    scale = min(1.0, max_lines / min(width, height))
+    out_width, out_height = (max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2))
+    if fps > max_fps + 0.01:
+        # Bagi dengan bilangan bulat jika hasilnya masih layak (60 -> 30, 50 -> 25), agar frame tidak tersendat.
+        divisor = -(-fps // max_fps)
+        fps = round(fps / divisor, 3) if fps / divisor >= 23.9 else max_fps
+    return out_width, out_height, fps
+
+
+def build_video_filter(width, height, fps, bitrate_kbps, normalize=True, custom_filter=""):
+    """
+    (filter -vf atau None, fps keluaran) untuk video yang di-encode. Tanpa info resolusi sumber,
+    hanya custom_filter yang dipakai (placeholder diisi dengan resolusi/fps sumber apa adanya).
+    Dengan custom_filter, fps keluaran tidak diketahui pasti; pakai keyframe_args untuk GOP.
+    """
+    if width and height:
+        out_width, out_height, out_fps = pick_output_format(width, height, fps, bitrate_kbps)
+    else:
+        out_width, out_height, out_fps = width, height, fps or DEFAULT_FPS
+    if custom_filter:
+        return custom_filter.format(width=out_width, height=out_height, fps=out_fps), out_fps
+    if not normalize or not (width and height):
+        return None, fps or DEFAULT_FPS
+    filters = []
+    if (out_width, out_height) != (width, height):
+        filters.append(f"scale={out_width}:{out_height}:flags=bicubic")
+    if fps and out_fps < fps - 0.01:
+        filters.append(f"fps={out_fps:g}")
+    return (",".join(filters) or None), out_fps
+
+
+def keyframe_args(out_fps, custom_filter=""):
+    """
+    Argumen FFmpeg agar keyframe muncul setiap KEYFRAME_INTERVAL_SEC detik berapa pun fps-nya.
+    Filter bawaan menentukan fps keluaran sendiri, jadi GOP dihitung dari fps itu. custom_filter bisa
+    mengubah fps (misal fps=50 atau minterpolate), jadi keyframe dipaksa berdasarkan waktu.
+    """
+    if custom_filter:
+        return ['-force_key_frames', f"expr:gte(t,n_forced*{KEYFRAME_INTERVAL_SEC})"]
+    gop = str(max(1, round(out_fps * KEYFRAME_INTERVAL_SEC)))
+    return ['-g', gop, '-keyint_min', gop]
+
+
+def describe_keyframes(out_fps, custom_filter=""):
+    """Keterangan interval keyframe untuk ditampilkan di log."""
+    if custom_filter:
+        return f"keyframe dipaksa tiap {KEYFRAME_INTERVAL_SEC} detik"
+    return f"keyframe tiap {KEYFRAME_INTERVAL_SEC} detik = {round(out_fps * KEYFRAME_INTERVAL_SEC)} frame"